@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
-from .models import Dashboard, EmailFolder, UserData, LogEntry, Lead  # <-- import your new model
+from django.utils import timezone
+from .models import Dashboard, EmailFolder, UserData, LogEntry, Lead, UploadCounter, OutboundUpload, LeadNotification, SlowRequestSample, IdempotencyKey, DriveFolder, DocumentSequence, OcrResult, StoredBlob  # <-- import your new model
 
 User = get_user_model()
 
@@ -106,11 +107,21 @@ class UserDataAdmin(admin.ModelAdmin):
 class DashboardAdmin(admin.ModelAdmin):
     list_display = ['email', 'phone_number', 'type', 'created_date', 'user']
     list_filter = ['type', 'created_date']
-    search_fields = ['email', 'phone_number', 'user__email', 'user__username']
+    search_fields = ['email', 'phone_number', 'user__email', 'user__username', 'content_sha256']
     date_hierarchy = 'created_date'
     ordering = ['-created_date']
 
 
+# ---------- UploadCounter Admin ----------
+@admin.register(UploadCounter)
+class UploadCounterAdmin(admin.ModelAdmin):
+    list_display = ['day', 'company_name', 'type', 'count', 'user']
+    list_filter = ['type', 'day']
+    search_fields = ['company_name', 'user__email']
+    date_hierarchy = 'day'
+    ordering = ['-day']
+
+
 # ---------- EmailFolder Admin ----------
 @admin.register(EmailFolder)
 class EmailFolderAdmin(admin.ModelAdmin):
@@ -122,6 +133,26 @@ class EmailFolderAdmin(admin.ModelAdmin):
     date_hierarchy = 'folder_date'
 
 
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ['day', 'user', 'last_value']
+    list_select_related = ['user']
+    search_fields = ['user__email']
+    raw_id_fields = ['user']
+    ordering = ['-day']
+    date_hierarchy = 'day'
+
+
+@admin.register(DriveFolder)
+class DriveFolderAdmin(admin.ModelAdmin):
+    list_display = ['key', 'kind', 'folder_id', 'parent', 'created_at']
+    list_filter = ['kind']
+    search_fields = ['key', 'folder_id']
+    list_select_related = ['parent']
+    raw_id_fields = ['parent']
+    readonly_fields = ['created_at']
+
+
 @admin.register(LogEntry)
 class LogEntryAdmin(admin.ModelAdmin):
     list_display = ['created_at', 'level', 'event', 'user']
@@ -130,10 +161,70 @@ class LogEntryAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
     ordering = ['-created_at']
 
+@admin.register(OutboundUpload)
+class OutboundUploadAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'original_name', 'generated_filename', 'email', 'phone_number', 'size', 'bytes_saved', 'status', 'attempts', 'response_status', 'next_attempt_at']
+    list_filter = ['status', 'media_type', 'created_at']
+    search_fields = ['original_name', 'filename', 'generated_filename', 'email', 'phone_number', 'last_error']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['-created_at']
+    actions = ['requeue']
+
+    @admin.action(description='Re-queue selected uploads')
+    def requeue(self, request, queryset):
+        # rows in `sending` belong to a forwarder right now; run_make_forwarder releases them if it died
+        updated = queryset.filter(status__in=['pending', 'dead']).update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"Re-queued {updated} uploads.")
+
+
+@admin.register(OcrResult)
+class OcrResultAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'sha256', 'document_type', 'document_date', 'pages', 'seconds', 'engine']
+    list_filter = ['document_type', 'engine']
+    search_fields = ['sha256', 'text']
+    readonly_fields = [f.name for f in OcrResult._meta.fields]
+    ordering = ['-created_at']
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'size', 'ref_count', 'created_at', 'last_referenced_at']
+    search_fields = ['sha256']
+    readonly_fields = [f.name for f in StoredBlob._meta.fields]
+    ordering = ['-last_referenced_at']
+
+
 @admin.register(Lead)
 class LeadAdmin(admin.ModelAdmin):
     list_display = ('full_name', 'company_name', 'phone', 'email', 'status', 'created_at')
     list_filter = ('status', 'help_needed', 'created_at')
     search_fields = ('full_name', 'email', 'phone', 'company_name', 'mc_number')
     readonly_fields = ('created_at', 'updated_at')
-    ordering = ('-created_at',)    
+    ordering = ('-created_at',)
+
+
+@admin.register(LeadNotification)
+class LeadNotificationAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'lead', 'recipient', 'status', 'attempts', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('lead__full_name', 'lead__email', 'recipient', 'last_error')
+    readonly_fields = ('created_at', 'updated_at', 'sent_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(SlowRequestSample)
+class SlowRequestSampleAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'db_time_ms', 'query_count', 'instances')
+    list_filter = ('method', 'status_code', 'view_name')
+    search_fields = ('path', 'view_name')
+    readonly_fields = [f.name for f in SlowRequestSample._meta.fields]
+    ordering = ('-created_at',)
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'scope', 'key', 'status', 'response_status', 'expires_at')
+    list_filter = ('scope', 'status')
+    search_fields = ('key',)
+    readonly_fields = [f.name for f in IdempotencyKey._meta.fields]
+    ordering = ('-created_at',)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AutomationappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'automationApp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
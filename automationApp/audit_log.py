@@ -0,0 +1,184 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+LEVELS = {'DEBUG': 'info', 'INFO': 'info', 'WARNING': 'warning', 'ERROR': 'error', 'CRITICAL': 'error'}
+
+
+class LogEntryBuffer:
+    """
+    Collects LogEntry rows in memory and writes them with one bulk_create
+    every `flush_every` events or `flush_interval` seconds, whichever comes
+    first, so request handlers never wait on an audit-log INSERT.
+
+    With AUDIT_LOG_BACKGROUND_FLUSH off no thread is started: a full batch
+    is flushed by the caller that fills it, and the rest on flush()/stop().
+
+    A batch that fails to insert (e.g. "database table is locked") goes back
+    to the front of the buffer and is retried with exponential backoff; it is
+    dropped only after `max_retries` failures in a row. Events beyond
+    `max_pending` are dropped rather than growing without bound.
+    """
+
+    def __init__(self, flush_every=100, flush_interval=0.5, max_pending=10000, max_retries=5, max_backoff=30):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.flushed = 0
+        self.dropped = 0
+        self._pending = []
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def log(self, event, message='', level='info', user_id=None, related_model=None, related_id=None):
+        from .models import LogEntry
+
+        entry = LogEntry(
+            user_id=user_id,
+            event=event,
+            message=message,
+            level=level,
+            related_model=related_model,
+            related_id=None if related_id is None else str(related_id),
+        )
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(entry)
+            full = len(self._pending) >= self.flush_every
+
+        if settings.AUDIT_LOG_BACKGROUND_FLUSH:
+            self._ensure_thread()
+            if full:
+                self._wakeup.set()
+        elif full and time.monotonic() >= self._retry_at:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of rows written."""
+        from .models import LogEntry
+
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                LogEntry.objects.bulk_create(batch, batch_size=500)
+            except Exception as e:
+                self._requeue(batch, e)
+                return 0
+            with self._lock:
+                self.flushed += len(batch)
+                self._failures = 0
+                self._retry_at = 0.0
+            return len(batch)
+
+    def _requeue(self, batch, error):
+        with self._lock:
+            self._failures += 1
+            if self._failures > self.max_retries:
+                self.dropped += len(batch)
+                self._failures = 0
+                self._retry_at = 0.0
+                logger.error(f"Dropped {len(batch)} audit log entries after {self.max_retries} retries: {error}")
+                return
+            # keep the order: the failed batch goes in front of what was logged meanwhile
+            self._pending[:0] = batch
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[self.max_pending:]
+                self.dropped += overflow
+            delay = min(self.flush_interval * 2 ** (self._failures - 1), self.max_backoff)
+            self._retry_at = time.monotonic() + delay
+        logger.warning(
+            f"Audit log flush failed ({self._failures}/{self.max_retries}), retrying {len(batch)} entries in {delay:.1f}s: {error}"
+        )
+
+    def stop(self, timeout=5):
+        """Stop the background thread, if any, and write what is still buffered."""
+        self._stop.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {'pending': len(self._pending), 'flushed': self.flushed, 'dropped': self.dropped}
+
+    def _ensure_thread(self):
+        # after a fork (gunicorn --preload) the parent's thread does not exist here
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name='audit-log-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self, stop):
+        while True:
+            self._wakeup.wait(max(self.flush_interval, self._retry_at - time.monotonic()))
+            self._wakeup.clear()
+            # turning AUDIT_LOG_BACKGROUND_FLUSH off hands flushing back to the callers
+            if stop.is_set() or not settings.AUDIT_LOG_BACKGROUND_FLUSH:
+                break
+            if time.monotonic() < self._retry_at:
+                continue
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+        with self._lock:
+            if self._thread is threading.current_thread():
+                self._thread = None
+
+
+class LogEntryHandler(logging.Handler):
+    """
+    logging.Handler that stores records as LogEntry rows through the shared
+    buffer. `event`, `user_id`, `related_model` and `related_id` are taken
+    from the record's `extra`; the event defaults to the logger name.
+    """
+
+    def emit(self, record):
+        try:
+            audit_log.log(
+                event=getattr(record, 'event', record.name)[:100],
+                message=record.getMessage(),
+                level=LEVELS.get(record.levelname, 'info'),
+                user_id=getattr(record, 'user_id', None),
+                related_model=getattr(record, 'related_model', None),
+                related_id=getattr(record, 'related_id', None),
+            )
+        except Exception:
+            self.handleError(record)
+
+
+audit_log = LogEntryBuffer(
+    flush_every=settings.AUDIT_LOG_FLUSH_EVERY,
+    flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL_MS / 1000,
+    max_pending=settings.AUDIT_LOG_MAX_PENDING,
+    max_retries=settings.AUDIT_LOG_MAX_RETRIES,
+)
+atexit.register(audit_log.stop)
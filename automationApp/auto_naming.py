@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import mimetypes
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .folders import user_folder_records
+from .models import LogEntry, OcrResult
+from .ocr import DEFAULT_DOCUMENT_TYPE, ocr_file
+from .sequences import document_filename, reserve_document_numbers
+from .user_resolver import user_resolver
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_ocr_pool():
+    """Process-wide pool of OCR_WORKERS processes, so OCR never runs on a request or forwarder thread."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: forking this multithreaded process can copy a lock another thread holds
+            _pool = ProcessPoolExecutor(max_workers=settings.OCR_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_ocr_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _discard_ocr_pool(pool):
+    """
+    Replace `pool` and kill its workers: after a timeout the job (e.g. a hung
+    tesseract) would keep holding its worker, and after a crash the pool is
+    unusable. Other threads' jobs on it fail and are named without OCR.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return
+        _pool = None
+    # ProcessPoolExecutor has no public way to stop running workers before Python 3.14
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upload_content_type(upload):
+    # Make often sends attachments as application/octet-stream; go by the file name then
+    if upload.content_type and upload.content_type != 'application/octet-stream':
+        return upload.content_type
+    guessed, _ = mimetypes.guess_type(upload.original_name or '')
+    return guessed or 'application/octet-stream'
+
+
+def _wait(future, heartbeat):
+    """The job's result within OCR_TIMEOUT, calling `heartbeat` every MAKE_FORWARDER_TIMEOUT seconds meanwhile."""
+    deadline = time.monotonic() + settings.OCR_TIMEOUT
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            return future.result(timeout=max(min(remaining, settings.MAKE_FORWARDER_TIMEOUT) if heartbeat else remaining, 0))
+        except TimeoutError:
+            if time.monotonic() >= deadline:
+                raise
+            heartbeat()
+
+
+def run_ocr(jobs, heartbeat=None):
+    """
+    OCR each attachment in `jobs` ({sha256: (path, content_type)}) on the
+    worker pool. Returns {sha256: result dict, None if the engine does not
+    read that type, or the exception raised}. `heartbeat` is called while
+    waiting, so the forwarder can show its claimed upload is still alive.
+    """
+    engine, options = settings.OCR_ENGINE, settings.OCR_ENGINE_OPTIONS
+    results = {}
+    if settings.OCR_WORKERS <= 0:
+        for sha256, (path, content_type) in jobs.items():
+            try:
+                results[sha256] = ocr_file(engine, options, path, content_type)
+            except Exception as e:
+                results[sha256] = e
+        return results
+
+    pool = get_ocr_pool()
+    futures = {
+        sha256: pool.submit(ocr_file, engine, options, path, content_type)
+        for sha256, (path, content_type) in jobs.items()
+    }
+    for sha256, future in futures.items():
+        try:
+            results[sha256] = _wait(future, heartbeat)
+        except (TimeoutError, BrokenProcessPool) as e:
+            # a hung or dead worker (e.g. out of memory); start a fresh pool
+            _discard_ocr_pool(pool)
+            results[sha256] = e
+        except Exception as e:
+            results[sha256] = e
+    return results
+
+
+def _log_failure(upload, error):
+    LogEntry.objects.create(
+        level='error',
+        event='ocr_failed',
+        message=f"OCR failed for {upload.original_name}: {error.__class__.__name__}: {error}",
+        related_model='OutboundUpload',
+        related_id=str(upload.id),
+    )
+
+
+def generated_filename(upload, doc_type, doc_date):
+    """
+    `001_documentname_date.ext`; the number is reserved from the sender's
+    sequence for the day, which starts after the folder records filed that
+    day before it existed. A number the scenario put in `filename` (e.g.
+    search_email_records' length_of_today_records) is not reserved, so it
+    is ignored rather than risk two files with the same number.
+    """
+    extension = os.path.splitext(upload.original_name or '')[1].lower()
+    user = user_resolver.webhook_user(upload.email, upload.phone_number) or user_resolver.superuser()
+    if user is None:
+        return f"{doc_type}_{doc_date.isoformat()}{extension}"
+    day = timezone.localdate(upload.created_at)
+    number, _ = reserve_document_numbers(
+        user.id, day, 1,
+        lambda: user_folder_records(upload.email, upload.phone_number).filter(folder_date=day).count(),
+    )
+    return document_filename(number, doc_type, doc_date) + extension
+
+
+def name_uploads(uploads, heartbeat=None):
+    """
+    OCR the claimed uploads that have no generated name yet and save one.
+    Results are cached in OcrResult by content hash, so an attachment that
+    is sent again is not read again. Uploads the engine cannot read, or
+    whose OCR fails, are still named (as `document`, dated the day they came in).
+    """
+    pending = [upload for upload in uploads if not upload.generated_filename]
+    if not pending:
+        return []
+
+    for upload in pending:
+        if not upload.content_sha256:
+            upload.content_sha256 = file_sha256(upload.spool_path)
+
+    cached = {result.sha256: result for result in OcrResult.objects.filter(
+        sha256__in={upload.content_sha256 for upload in pending}
+    )}
+    jobs = {
+        upload.content_sha256: (upload.spool_path, upload_content_type(upload))
+        for upload in pending if upload.content_sha256 not in cached
+    }
+
+    failures = {}
+    for sha256, outcome in run_ocr(jobs, heartbeat).items():
+        if isinstance(outcome, Exception):
+            failures[sha256] = outcome
+        elif outcome is not None:
+            cached[sha256], _ = OcrResult.objects.get_or_create(sha256=sha256, defaults={
+                'engine': outcome['engine'],
+                'text': outcome['text'][:settings.OCR_TEXT_MAX_CHARS],
+                'pages': outcome['pages'],
+                'document_type': outcome['document_type'],
+                'document_date': parse_date(outcome['document_date']) if outcome['document_date'] else None,
+                'seconds': outcome['seconds'],
+            })
+
+    for upload in pending:
+        if upload.content_sha256 in failures:
+            _log_failure(upload, failures[upload.content_sha256])
+        result = cached.get(upload.content_sha256)
+        doc_type = result.document_type if result else DEFAULT_DOCUMENT_TYPE
+        doc_date = (result.document_date if result else None) or timezone.localdate(upload.created_at)
+        upload.generated_filename = generated_filename(upload, doc_type, doc_date)
+        upload.save(update_fields=['content_sha256', 'generated_filename', 'updated_at'])
+    return pending
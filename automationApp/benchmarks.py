@@ -0,0 +1,240 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+
+from .ocr import ocr_file
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(label, latencies, elapsed, statuses):
+    latencies = sorted(latencies)
+    return {
+        'label': label,
+        'requests': len(latencies),
+        'errors': sum(1 for status in statuses if status >= 500),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_wsgi(path, params, total, concurrency):
+    """Drive the WSGI handler (django.test.Client) from `concurrency` threads."""
+    def one(client):
+        started = time.perf_counter()
+        status = client.get(path, params).status_code
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        client = Client()
+        results = [one(client) for _ in range(total)]
+    else:
+        def worker(count):
+            client = Client()
+            try:
+                return [one(client) for _ in range(count)]
+            finally:
+                close_old_connections()
+
+        shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = [r for batch in pool.map(worker, shares) for r in batch]
+    elapsed = time.perf_counter() - started
+    return summarize('wsgi', [r[0] for r in results], elapsed, [r[1] for r in results])
+
+
+def run_asgi(path, params, total, concurrency):
+    """Drive the ASGI handler (django.test.AsyncClient) with `concurrency` tasks in flight."""
+    async def main():
+        client = AsyncClient()
+        gate = asyncio.Semaphore(max(concurrency, 1))
+
+        async def one():
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(path, params)
+                return time.perf_counter() - started, response.status_code
+
+        return await asyncio.gather(*(one() for _ in range(total)))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    return summarize('asgi', [r[0] for r in results], elapsed, [r[1] for r in results])
+
+
+# ---------------------------------------------------------------------------
+# Make.com webhook traffic replay (manage.py bench_webhooks)
+# ---------------------------------------------------------------------------
+
+# Share of calls per endpoint in one Make scenario run: look up the folders,
+# create a missing date folder now and then, record the document, log it.
+DEFAULT_MIX = {'search': 40, 'create_record': 35, 'create_folder': 10, 'log_entry': 15}
+
+# every webhook is a JSON POST
+WEBHOOK_ROUTES = {
+    'search': 'search_email_records',
+    'create_record': 'create_dashboard_record',
+    'create_folder': 'create_email_folder',
+    'log_entry': 'create_make_log_entry',
+}
+
+
+def parse_mix(value):
+    """'search=40,create_record=35' -> {'search': 40, 'create_record': 35}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in WEBHOOK_ROUTES:
+            raise ValueError(f"Unknown endpoint {name!r}; expected one of {', '.join(WEBHOOK_ROUTES)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def webhook_payload(endpoint, caller, rng, today):
+    """A request body shaped like the one the Make scenario sends."""
+    email, phone, company, mc_number = caller
+    if endpoint == 'search':
+        return {'email': email, 'phone_number': phone}
+    if endpoint == 'create_record':
+        return {
+            'email': email,
+            'phone_number': phone,
+            'type': rng.choice(['whatsapp', 'gmail', 'sms']),
+            'google_drive_link': f'https://drive.google.com/file/d/{rng.getrandbits(64):x}',
+        }
+    if endpoint == 'create_folder':
+        suffix = f'{rng.getrandbits(32):x}'
+        return {
+            'email': email,
+            'phone_number': phone,
+            'company_name_folder_id': f'c_{suffix}',
+            'company_name_mc_number': f'{company}_{mc_number}',
+            'year_folder_id': f'y_{suffix}',
+            'month_folder_id': f'm_{suffix}',
+            'date_folder_id': f'd_{suffix}',
+            'folder_year': today.year,
+            'folder_month': today.month,
+            'folder_date': today.isoformat(),
+        }
+    return {'event': 'make_scenario', 'message': f'Processed document for {email}', 'level': 'info'}
+
+
+def webhook_plan(callers, mix, total, rng, today):
+    """`total` (endpoint, payload) pairs drawn from `mix` over random callers."""
+    endpoints = list(mix)
+    weights = [mix[e] for e in endpoints]
+    plan = []
+    for endpoint in rng.choices(endpoints, weights, k=total):
+        plan.append((endpoint, webhook_payload(endpoint, rng.choice(callers), rng, today)))
+    return plan
+
+
+def endpoint_report(samples):
+    """samples: {endpoint: [(seconds, status, queries or None), ...]}"""
+    report = {}
+    for endpoint, rows in samples.items():
+        latencies = sorted(r[0] for r in rows)
+        queries = [r[2] for r in rows if r[2] is not None]
+        report[endpoint] = {
+            'requests': len(rows),
+            'errors': sum(1 for r in rows if r[1] >= 400),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+            'max_queries': max(queries) if queries else None,
+        }
+    return report
+
+
+# ---------------------------------------------------------------------------
+# OCR throughput (manage.py bench_ocr)
+# ---------------------------------------------------------------------------
+
+SAMPLE_DOCUMENT = (
+    "RATE CONFIRMATION\n"
+    "Load confirmation #{number}   Date: 11/{day:02d}/2025\n"
+    "Carrier: Acme Trucking LLC   MC 123456\n"
+    "Shipper: Midwest Foods, Chicago IL   Consignee: Fresh Market, Dallas TX\n"
+    "Rate: $2,450.00 all in   Equipment: 53' reefer\n"
+)
+
+
+def sample_pages(directory, count, engine):
+    """
+    `count` one-page sample documents in `directory` the engine can read:
+    rendered PNGs when Pillow is installed and the engine reads images,
+    otherwise plain text. Returns [(path, content_type), ...].
+    """
+    pages = []
+    use_images = engine.supports('image/png')
+    if use_images:
+        try:
+            from PIL import Image, ImageDraw
+        except ImportError:
+            use_images = False
+    if not use_images and not engine.supports('text/plain'):
+        raise ValueError(f"{engine.name} reads neither text nor PNG pages (is Pillow installed?)")
+
+    for number in range(count):
+        text = SAMPLE_DOCUMENT.format(number=1000 + number, day=number % 28 + 1)
+        if use_images:
+            path = os.path.join(directory, f'page{number}.png')
+            image = Image.new('L', (1700, 2200), 255)  # US letter at 200 dpi
+            draw = ImageDraw.Draw(image)
+            for line_number, line in enumerate(text.splitlines()):
+                draw.text((100, 100 + 60 * line_number), line, fill=0, font_size=36)
+            image.save(path)
+            pages.append((path, 'image/png'))
+        else:
+            path = os.path.join(directory, f'page{number}.txt')
+            with open(path, 'w') as fh:
+                fh.write(text)
+            pages.append((path, 'text/plain'))
+    return pages
+
+
+def run_ocr_benchmark(engine_path, options, files, workers):
+    """OCR `files` ([(path, content_type)]) on a pool of `workers` processes."""
+    paths = [path for path, _ in files]
+    content_types = [content_type for _, content_type in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # start every worker and load the engine before timing
+        list(pool.map(ocr_file, repeat(engine_path, workers), repeat(options), paths[:1] * workers, content_types[:1] * workers))
+        started = time.perf_counter()
+        results = list(pool.map(ocr_file, repeat(engine_path), repeat(options), paths, content_types))
+        elapsed = time.perf_counter() - started
+
+    results = [r for r in results if r is not None]
+    pages = sum(r['pages'] for r in results)
+    per_page = sorted(r['seconds'] / r['pages'] for r in results if r['pages'])
+    pages_per_second = pages / elapsed if elapsed else 0.0
+    return {
+        'workers': workers,
+        'files': len(results),
+        'pages': pages,
+        'seconds': round(elapsed, 3),
+        'pages_per_second': round(pages_per_second, 2),
+        'pages_per_second_per_core': round(pages_per_second / workers, 2),
+        'p50_ms_per_page': round(percentile(per_page, 50) * 1000, 2),
+        'p95_ms_per_page': round(percentile(per_page, 95) * 1000, 2),
+    }
+
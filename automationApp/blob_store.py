@@ -0,0 +1,179 @@
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Dashboard, OutboundUpload, StoredBlob
+
+# Attachments are stored once per distinct content under
+# BLOB_STORE_DIR/ab/cd/abcd...; StoredBlob.ref_count counts the queued
+# uploads that still need a file, and `manage.py gc_blobs` removes the rest.
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Hashes every uploaded file while Django parses the request body, so
+    the SHA-256 is known without reading the file again. Passes the data
+    on untouched to the next handler (memory or temporary file).
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_digests'):
+            self.request.upload_digests = {}
+        self.request.upload_digests.setdefault(self.field_name, []).append(self.digest.hexdigest())
+        return None
+
+
+def uploaded_file_sha256(request, field_name):
+    """SHA-256 of the file request.FILES.get(field_name) returns (the last one), if HashingUploadHandler saw it."""
+    digests = getattr(request, 'upload_digests', {}).get(field_name)
+    return digests[-1] if digests else None
+
+
+def blob_path(sha256):
+    return os.path.join(settings.BLOB_STORE_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def is_blob(sha256, path):
+    """Whether `path` is the store's copy of `sha256`; uploads spooled before the store existed are not."""
+    return bool(sha256) and os.path.abspath(path) == os.path.abspath(blob_path(sha256))
+
+
+def acquire_blob(sha256, size):
+    """Count one more reference to a blob, creating its row if needed (safe under concurrent writers)."""
+    blob = StoredBlob.objects.filter(sha256=sha256)
+    if blob.update(ref_count=F('ref_count') + 1, last_referenced_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            StoredBlob.objects.create(sha256=sha256, size=size, ref_count=1)
+    except IntegrityError:
+        # Another request created the row between our UPDATE and INSERT.
+        blob.update(ref_count=F('ref_count') + 1, last_referenced_at=timezone.now())
+
+
+def release_blob(sha256):
+    """Drop one reference; the file stays until gc_blobs finds it unreferenced."""
+    StoredBlob.objects.filter(sha256=sha256, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, last_referenced_at=timezone.now()
+    )
+
+
+def store_upload(file_obj, sha256=None):
+    """
+    Put an uploaded file into the store and take one reference to it.
+    Returns (sha256, size, path). Uploads Django already streamed to a
+    temporary file are moved, not copied; in-memory ones are written out
+    chunk by chunk, hashed on the way when `sha256` is not known yet.
+    If the content is already stored, the new copy is discarded.
+    """
+    tmp_dir = os.path.join(settings.BLOB_STORE_DIR, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    if hasattr(file_obj, 'temporary_file_path'):
+        file_obj.file.flush()
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(file_obj.temporary_file_path(), 'rb') as fh:
+                for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+        file_move_safe(file_obj.temporary_file_path(), tmp_path)
+    else:
+        digest = hashlib.sha256() if sha256 is None else None
+        with open(tmp_path, 'wb') as out:
+            for chunk in file_obj.chunks():
+                if digest is not None:
+                    digest.update(chunk)
+                out.write(chunk)
+        if digest is not None:
+            sha256 = digest.hexdigest()
+    size = os.path.getsize(tmp_path)
+
+    # Reference first: gc_blobs only removes files whose row has no references,
+    # so once this commits the file below cannot be collected from under us.
+    acquire_blob(sha256, size)
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    return sha256, size, path
+
+
+def find_stored_copy(user_id, sha256):
+    """The user's earliest Dashboard record for this content that already has a Drive link."""
+    return (
+        Dashboard.objects
+        .filter(user_id=user_id, content_sha256=sha256)
+        .exclude(google_drive_link__isnull=True)
+        .exclude(google_drive_link='')
+        .order_by('created_date')
+        .values('id', 'google_drive_link')
+        .first()
+    )
+
+
+def collect_garbage(grace_seconds=None, dry_run=False):
+    """
+    Delete blobs nobody has referenced for `grace_seconds`: the row, then the
+    file, one blob per transaction so a concurrent acquire_blob() either
+    lands first (and the blob is kept) or creates a fresh row afterwards.
+    Returns (blobs removed, bytes freed).
+    """
+    if grace_seconds is None:
+        grace_seconds = settings.BLOB_GC_GRACE_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    candidates = StoredBlob.objects.filter(ref_count=0, last_referenced_at__lt=cutoff).values_list('pk', 'sha256', 'size')
+
+    removed, freed = 0, 0
+    for pk, sha256, size in candidates.iterator():
+        if dry_run:
+            removed, freed = removed + 1, freed + size
+            continue
+        with transaction.atomic():
+            if not StoredBlob.objects.filter(pk=pk, ref_count=0, last_referenced_at__lt=cutoff).delete()[0]:
+                continue
+            try:
+                os.remove(blob_path(sha256))
+            except FileNotFoundError:
+                pass
+        removed, freed = removed + 1, freed + size
+    return removed, freed
+
+
+def recount_references():
+    """Recompute ref_count from the uploads still waiting for (or stuck on) delivery."""
+    live = {}
+    for sha256, spool_path in (
+        OutboundUpload.objects.exclude(status='delivered').exclude(content_sha256='')
+        .values_list('content_sha256', 'spool_path').iterator()
+    ):
+        if is_blob(sha256, spool_path):
+            live[sha256] = live.get(sha256, 0) + 1
+
+    fixed = 0
+    for pk, sha256, ref_count in StoredBlob.objects.values_list('pk', 'sha256', 'ref_count').iterator():
+        if live.get(sha256, 0) != ref_count:
+            StoredBlob.objects.filter(pk=pk).update(ref_count=live.get(sha256, 0), last_referenced_at=timezone.now())
+            fixed += 1
+    return fixed
@@ -0,0 +1,67 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import UploadCounter, UserData
+
+
+def upload_counters_for(user):
+    """UploadCounter buckets visible to `user`: everything for staff, own buckets otherwise."""
+    qs = UploadCounter.objects.all()
+    if not (user.is_staff or user.is_superuser):
+        qs = qs.filter(user=user)
+    return qs
+
+
+def increment_bucket(user_id, company_name, record_type, day, amount=1):
+    """Add `amount` to one bucket, creating it if needed (safe under concurrent writers)."""
+    bucket = UploadCounter.objects.filter(
+        user_id=user_id, company_name=company_name, type=record_type, day=day
+    )
+    if bucket.update(count=F('count') + amount):
+        return
+    try:
+        with transaction.atomic():
+            UploadCounter.objects.create(
+                user_id=user_id, company_name=company_name, type=record_type, day=day, count=amount
+            )
+    except IntegrityError:
+        # Another request created the bucket between our UPDATE and INSERT.
+        bucket.update(count=F('count') + amount)
+
+
+def record_uploads(records):
+    """Add newly created Dashboard records to their UploadCounter buckets."""
+    records = list(records)
+    if not records:
+        return
+
+    user_ids = {r.user_id for r in records}
+    companies = dict(
+        UserData.objects.filter(user_id__in=user_ids).values_list('user_id', 'company_name')
+    )
+
+    buckets = Counter(
+        (r.user_id, companies.get(r.user_id) or '', r.type, timezone.localdate(r.created_date))
+        for r in records
+    )
+    for (user_id, company_name, record_type, day), amount in buckets.items():
+        increment_bucket(user_id, company_name, record_type, day, amount)
+
+
+def forget_upload(record):
+    """
+    Take a deleted Dashboard record out of its UploadCounter bucket. The
+    bucket is found by the user's current company; if that changed since
+    the upload, run `manage.py rebuild_upload_counters` instead.
+    """
+    company_name = UserData.objects.filter(user_id=record.user_id).values_list('company_name', flat=True).first()
+    UploadCounter.objects.filter(
+        user_id=record.user_id,
+        company_name=company_name or '',
+        type=record.type,
+        day=timezone.localdate(record.created_date),
+        count__gt=0,
+    ).update(count=F('count') - 1)
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (queryset lookup, CSV header / NDJSON key)
+EXPORT_COLUMNS = [
+    ('email', 'email'),
+    ('user__user_data__company_name', 'company_name'),
+    ('user__user_data__mc_number', 'mc_number'),
+    ('user__user_data__number_of_trucks', 'number_of_trucks'),
+    ('phone_number', 'phone_number'),
+    ('google_drive_link', 'google_drive_link'),
+    ('created_date', 'created_date'),
+    ('type', 'type'),
+]
+
+
+def export_rows(qs, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterate Dashboard rows joined with UserData as plain tuples. The query is
+    consumed with .iterator() so memory stays flat however many rows match.
+    """
+    lookups = [lookup for lookup, _ in EXPORT_COLUMNS]
+    return qs.order_by('-created_date', '-id').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _serialize(row):
+    return [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+
+
+def stream_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the export as CSV text, one chunk of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # send the header straight away so the download starts before the query
+    writer.writerow([key for _, key in EXPORT_COLUMNS])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(_serialize(row))
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def stream_ndjson(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the export as newline-delimited JSON, one chunk of rows at a time."""
+    keys = [key for _, key in EXPORT_COLUMNS]
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(keys, _serialize(row)))))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
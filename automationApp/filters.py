@@ -0,0 +1,57 @@
+from django.db.models import Q
+
+from .models import Dashboard
+
+DASHBOARD_TYPES = [choice[0] for choice in Dashboard.TYPE_CHOICES]
+
+
+def parse_dashboard_filters(params):
+    """
+    Read the dashboard filters (year, month, type, q) from a QueryDict.
+    Invalid values are dropped so a bad query string just means "no filter".
+    """
+    filters = {}
+
+    year = (params.get('year') or '').strip()
+    if year.isdigit():
+        filters['year'] = int(year)
+
+    month = (params.get('month') or '').strip()
+    if month.isdigit() and 1 <= int(month) <= 12:
+        filters['month'] = int(month)
+
+    record_type = (params.get('type') or '').strip().lower()
+    if record_type in DASHBOARD_TYPES:
+        filters['type'] = record_type
+
+    q = (params.get('q') or '').strip()
+    if q:
+        filters['q'] = q
+
+    return filters
+
+
+def dashboard_records_for(user):
+    """Dashboard rows visible to `user`: everything for staff, own rows otherwise."""
+    qs = Dashboard.objects.all()
+    if not (user.is_staff or user.is_superuser):
+        qs = qs.filter(user=user)
+    return qs
+
+
+def apply_dashboard_filters(qs, filters):
+    """Apply parsed dashboard filters to a Dashboard queryset (in SQL)."""
+    if 'year' in filters:
+        qs = qs.filter(created_date__year=filters['year'])
+    if 'month' in filters:
+        qs = qs.filter(created_date__month=filters['month'])
+    if 'type' in filters:
+        qs = qs.filter(type=filters['type'])
+    if 'q' in filters:
+        q = filters['q']
+        qs = qs.filter(
+            Q(email__icontains=q)
+            | Q(phone_number__icontains=q)
+            | Q(user__user_data__company_name__icontains=q)
+        )
+    return qs
@@ -0,0 +1,143 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .folder_tree import company_key_for
+from .folders import current_year_folder_id, resolve_folder_state
+
+# The folder bundle search_email_records returns is cached in parts that are
+# read together with a single get_many():
+#   - whether the caller has folders, and today's folder count, keyed by
+#     (email or phone, date);
+#   - the company's folder path (company, year, month, day folder IDs),
+#     keyed by (company, date);
+#   - the shared fallback company folder.
+# New EmailFolder rows are written through (signals.py -> folder_created), so
+# once warm a Make scenario's lookups never reach the database.
+
+_PATH_FIELDS = ('matched_company_folder_id', 'year_folder_id', 'month_folder_id', 'date_folder_id')
+
+
+def get_folder_cache():
+    return caches[settings.FOLDER_CACHE_ALIAS]
+
+
+def _key(kind, *parts):
+    # hashed so emails/company names are always valid memcached keys
+    digest = hashlib.sha1(':'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+    return f'folders:{kind}:{digest}'
+
+
+def _identities(email, phone_number):
+    # same precedence as folders.user_folder_records: email first, then phone
+    return ('email', email) if email else ('phone', phone_number)
+
+
+def _keys(email, phone_number, day, company):
+    identity = _identities(email, phone_number)
+    return {
+        'identity': _key('identity', *identity, day.isoformat()),
+        'count': _key('count', *identity, day.isoformat()),
+        'path': _key('path', company, day.isoformat()),
+        'first_company': _key('first-company'),
+    }
+
+
+def cached_year_folder_id(today):
+    cache = get_folder_cache()
+    key = _key('year', today.year)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry['id']
+    year_folder_id = current_year_folder_id(today)
+    cache.set(key, {'id': year_folder_id}, settings.FOLDER_CACHE_TIMEOUT)
+    return year_folder_id
+
+
+def cached_folder_state(user, email, phone_number, today):
+    """resolve_folder_state(), answered from the cache when every part is present."""
+    cache = get_folder_cache()
+    keys = _keys(email, phone_number, today, f"{user.company_name}_{user.mc_number}")
+    cached = cache.get_many(keys.values())
+
+    if len(cached) < len(keys):
+        state = resolve_folder_state(user, email, phone_number, today)
+        cache.set_many({
+            keys['identity']: {'data_exists': state['data_exists']},
+            keys['count']: state['today_count'],
+            keys['path']: {field: state[field] for field in _PATH_FIELDS},
+            keys['first_company']: {'id': state['first_company_folder_id']},
+        }, settings.FOLDER_CACHE_TIMEOUT)
+        return state
+
+    path = cached[keys['path']]
+    matched = path['matched_company_folder_id']
+    first = cached[keys['first_company']]['id']
+    return {
+        'data_exists': cached[keys['identity']]['data_exists'],
+        'has_current_year': path['year_folder_id'] is not None,
+        'year_folder_id': path['year_folder_id'],
+        'has_current_month': path['month_folder_id'] is not None,
+        'month_folder_id': path['month_folder_id'],
+        'has_today': path['date_folder_id'] is not None,
+        'date_folder_id': path['date_folder_id'],
+        'has_company_name_mc_number_name': matched is not None,
+        'company_name_folder_id': matched if matched is not None else first,
+        'today_count': cached[keys['count']],
+        'matched_company_folder_id': matched,
+        'first_company_folder_id': first,
+    }
+
+
+def _fill(cache, key, value):
+    # shared entries hold the first matching folder; only an empty one changes
+    entry = cache.get(key)
+    if entry is not None and entry['id'] is None and value:
+        cache.set(key, {'id': value}, settings.FOLDER_CACHE_TIMEOUT)
+
+
+def folder_created(folder, today):
+    """Write a newly inserted EmailFolder through to the entries it affects."""
+    cache = get_folder_cache()
+    for identity in {('email', folder.email), ('phone', folder.phone_number)}:
+        if not identity[1]:
+            continue
+        key = _key('identity', *identity, today.isoformat())
+        if cache.get(key) is not None:
+            cache.set(key, {'data_exists': True}, settings.FOLDER_CACHE_TIMEOUT)
+        if folder.folder_date == today:
+            try:
+                cache.incr(_key('count', *identity, today.isoformat()))
+            except ValueError:
+                pass  # not cached yet; the next read computes it
+
+    # the tree keeps a node's first folder ID, so only empty levels change, and only
+    # the levels of this folder's path that lie on today's path
+    key = _key('path', company_key_for(folder.company_name_mc_number, folder.company_name_folder_id), today.isoformat())
+    path = cache.get(key)
+    if path is not None:
+        on_path = [True, folder.folder_year == today.year, folder.folder_month == today.month, folder.folder_date == today]
+        folder_ids = [folder.company_name_folder_id, folder.year_folder_id, folder.month_folder_id, folder.date_folder_id]
+        for field, matches, folder_id in zip(_PATH_FIELDS, on_path, folder_ids):
+            if not matches:
+                break
+            if path[field] is None:
+                path[field] = folder_id
+        cache.set(key, path, settings.FOLDER_CACHE_TIMEOUT)
+
+    _fill(cache, _key('year', folder.folder_year), folder.year_folder_id)
+    _fill(cache, _key('first-company'), folder.company_name_folder_id)
+
+
+def folder_changed(folder, today):
+    """Drop every entry an edited or deleted EmailFolder may appear in."""
+    keys = [
+        _key('year', folder.folder_year),
+        _key('path', company_key_for(folder.company_name_mc_number, folder.company_name_folder_id), today.isoformat()),
+        _key('first-company'),
+    ]
+    for identity in {('email', folder.email), ('phone', folder.phone_number)}:
+        if identity[1]:
+            keys += [_key('identity', *identity, today.isoformat()), _key('count', *identity, today.isoformat())]
+    get_folder_cache().delete_many(keys)
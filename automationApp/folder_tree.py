@@ -0,0 +1,188 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import DriveFolder, EmailFolder
+
+# DriveFolder levels, outermost first
+LEVELS = ('company', 'year', 'month', 'day')
+
+
+def company_key_for(company_name_mc_number, company_name_folder_id):
+    # older EmailFolder rows have no company_name_mc_number; fall back to the Drive ID
+    return company_name_mc_number or company_name_folder_id
+
+
+def path_keys(company_key, folder_year, folder_month, folder_date):
+    """The DriveFolder keys, company to day, for one dated folder."""
+    return [str(company_key), str(folder_year), str(folder_month), folder_date.isoformat()]
+
+
+def node_lookups(keys):
+    """
+    Field lookups matching the DriveFolder at the end of `keys` (company
+    first) by its whole path, for one indexed join per level.
+    """
+    lookups = {'key': keys[-1]}
+    prefix = ''
+    for key in reversed(keys[:-1]):
+        prefix += 'parent__'
+        lookups[prefix + 'key'] = key
+    lookups[prefix + 'parent__isnull'] = True
+    return lookups
+
+
+def _existing_nodes(keys):
+    # every node along `keys` that exists, as {level: node}, in one query; a UNION of
+    # one exact-path lookup per level, since OR-ing them makes SQLite scan the table
+    levels = [DriveFolder.objects.filter(**node_lookups(keys[:depth])) for depth in range(1, len(keys) + 1)]
+    return {node.kind: node for node in levels[0].union(*levels[1:], all=True)}
+
+
+def find_folder_path(keys):
+    """
+    The Drive folder IDs along `keys` as {level: folder_id or None}, with
+    one query. Every level below the first missing one is None.
+    """
+    nodes = _existing_nodes(keys)
+    path = dict.fromkeys(LEVELS)
+    for level in LEVELS[:len(keys)]:
+        if level not in nodes:
+            break
+        path[level] = nodes[level].folder_id
+    return path
+
+
+def ensure_folder_path(keys, folder_ids):
+    """
+    Get or create the DriveFolder nodes along `keys`, returning them
+    outermost first. `folder_ids` gives the Drive ID per level for nodes
+    that have to be created; existing nodes keep theirs. One query finds
+    the existing nodes, then each missing level is one insert.
+
+    Safe under concurrent webhooks: a node inserted by another request
+    between our lookup and insert fails the (parent, key) constraint, and
+    that row is used instead.
+    """
+    existing = _existing_nodes(keys)
+    nodes = []
+    parent = None
+    for level, key, folder_id in zip(LEVELS, keys, folder_ids):
+        node = existing.get(level)
+        if node is None:
+            try:
+                with transaction.atomic():
+                    node = DriveFolder.objects.create(parent=parent, key=key, kind=level, folder_id=folder_id)
+            except IntegrityError:
+                node = DriveFolder.objects.get(parent=parent, key=key)
+        nodes.append(node)
+        parent = node
+    return nodes
+
+
+def _email_folder_keys(folder):
+    return path_keys(
+        company_key_for(folder.company_name_mc_number, folder.company_name_folder_id),
+        folder.folder_year, folder.folder_month, folder.folder_date,
+    )
+
+
+def record_email_folder(folder):
+    """Add the path of a new EmailFolder row to the tree."""
+    folder_ids = [folder.company_name_folder_id, folder.year_folder_id, folder.month_folder_id, folder.date_folder_id]
+    return ensure_folder_path(_email_folder_keys(folder), folder_ids)
+
+
+def _company_email_folders(company_key):
+    # the EmailFolder rows company_key_for() files under `company_key`
+    return EmailFolder.objects.filter(
+        Q(company_name_mc_number=company_key)
+        | (Q(company_name_mc_number__isnull=True) | Q(company_name_mc_number=''))
+        & Q(company_name_folder_id=company_key)
+    )
+
+
+def forget_email_folder(folder):
+    """
+    Remove the nodes of a deleted EmailFolder row's path that no other row
+    is filed under any more, so the tree keeps matching a rebuild.
+    """
+    keys = _email_folder_keys(folder)
+    rows = _company_email_folders(keys[0])
+    remaining = [
+        rows,
+        rows.filter(folder_year=folder.folder_year),
+        rows.filter(folder_year=folder.folder_year, folder_month=folder.folder_month),
+        rows.filter(folder_date=folder.folder_date),
+    ]
+    depth = len(LEVELS)
+    while depth and not remaining[depth - 1].exists():
+        depth -= 1
+    if depth < len(LEVELS):
+        # deleting the shallowest unused node takes its children with it
+        DriveFolder.objects.filter(**node_lookups(keys[:depth + 1])).delete()
+
+
+def backfill_folder_tree(email_folder_model, drive_folder_model, batch_size=1000):
+    """
+    Add every EmailFolder path missing from the tree, with one bulk insert
+    per level per batch. Rows are read in pk order, so when EmailFolder rows
+    disagree about a folder's Drive ID the oldest one wins, as it does for
+    the `.first()` lookups in search_email_records.
+
+    Takes the model classes so the data migration can pass historical models.
+    Returns the number of nodes created.
+    """
+    nodes = {
+        (parent_id, key): pk
+        for pk, parent_id, key in drive_folder_model.objects.values_list('pk', 'parent_id', 'key').iterator()
+    }
+    rows = (
+        email_folder_model.objects
+        .order_by('pk')
+        .values_list(
+            'company_name_mc_number', 'company_name_folder_id', 'year_folder_id', 'month_folder_id',
+            'date_folder_id', 'folder_year', 'folder_month', 'folder_date',
+        )
+        .iterator(chunk_size=batch_size)
+    )
+
+    created = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            created += _backfill_batch(batch, nodes, drive_folder_model)
+            batch = []
+    if batch:
+        created += _backfill_batch(batch, nodes, drive_folder_model)
+    return created
+
+
+def _backfill_batch(rows, nodes, drive_folder_model):
+    paths = []
+    for company_key, company_id, year_id, month_id, date_id, year, month, day in rows:
+        keys = path_keys(company_key_for(company_key, company_id), year, month, day)
+        paths.append((keys, [company_id, year_id, month_id, date_id]))
+
+    created = 0
+    for depth, level in enumerate(LEVELS):
+        pending = {}
+        for keys, folder_ids in paths:
+            parent_id = nodes[(None, keys[0])] if depth else None
+            for ancestor in keys[1:depth]:
+                parent_id = nodes[(parent_id, ancestor)]
+            node_key = (parent_id, keys[depth])
+            if node_key not in nodes and node_key not in pending:
+                pending[node_key] = drive_folder_model(
+                    parent_id=parent_id, kind=level, key=keys[depth], folder_id=folder_ids[depth],
+                )
+        if not pending:
+            continue
+        inserted = drive_folder_model.objects.bulk_create(pending.values())
+        if any(node.pk is None for node in inserted):
+            # backends that cannot return IDs from a bulk insert
+            inserted = drive_folder_model.objects.filter(kind=level, key__in={k for _, k in pending})
+        for node in inserted:
+            nodes[(node.parent_id, node.key)] = node.pk
+        created += len(pending)
+    return created
@@ -0,0 +1,116 @@
+from django.db.models import Case, Count, Exists, IntegerField, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .folder_tree import node_lookups, path_keys
+from .models import DriveFolder, EmailFolder, User
+
+
+def find_webhook_user(email, phone_number):
+    """
+    The User a Make.com webhook refers to: matched by email first, then by
+    UserData.phone_number, in a single query with user_data loaded.
+    """
+    lookup = Q()
+    if email:
+        lookup |= Q(email=email)
+    if phone_number:
+        lookup |= Q(user_data__phone_number=phone_number)
+    if not lookup:
+        return None
+
+    qs = User.objects.filter(lookup).select_related('user_data')
+    if email:
+        qs = qs.order_by(
+            Case(When(email=email, then=Value(0)), default=Value(1), output_field=IntegerField()),
+            'pk',
+        )
+    return qs.first()
+
+
+def user_folder_records(email, phone_number):
+    """EmailFolder rows for a webhook caller: by email if given, else by phone."""
+    if email:
+        return EmailFolder.objects.filter(email=email)
+    if phone_number:
+        return EmailFolder.objects.filter(phone_number=phone_number)
+    return EmailFolder.objects.none()
+
+
+def current_year_folder_id(today):
+    return (
+        EmailFolder.objects
+        .filter(folder_year=today.year)
+        .order_by('pk')
+        .values_list('year_folder_id', flat=True)
+        .first()
+    )
+
+
+def _tree_folder_id(keys):
+    # the Drive ID of the DriveFolder at the end of `keys`
+    return Subquery(DriveFolder.objects.filter(**node_lookups(keys)).values('folder_id')[:1])
+
+
+def resolve_folder_state(user, email, phone_number, today):
+    """
+    Everything search_email_records needs to know about the caller's Drive
+    folders, fetched with one query: each flag/ID is a correlated subquery
+    on the caller's user row instead of a separate exists()/first() round-trip.
+    The folder IDs come from the company's path in the DriveFolder tree;
+    only data_exists and today's count read the caller's EmailFolder rows.
+    `user` is a ResolvedUser (see user_resolver.py).
+    """
+    user_records = user_folder_records(email, phone_number)
+    today_records = user_records.filter(folder_date=today)
+
+    keys = path_keys(f"{user.company_name}_{user.mc_number}", today.year, today.month, today)
+
+    today_count = (
+        today_records
+        .order_by()
+        .values('folder_date')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+
+    state = (
+        User.objects
+        .filter(pk=user.id)
+        .annotate(
+            data_exists=Exists(user_records),
+            matched_company_folder_id=_tree_folder_id(keys[:1]),
+            year_folder_id=_tree_folder_id(keys[:2]),
+            month_folder_id=_tree_folder_id(keys[:3]),
+            date_folder_id=_tree_folder_id(keys),
+            # the oldest company folder, for callers whose company has none yet
+            first_company_folder_id=Subquery(
+                DriveFolder.objects.filter(parent__isnull=True).order_by('pk').values('folder_id')[:1]
+            ),
+            today_count=Coalesce(Subquery(today_count, output_field=IntegerField()), 0),
+        )
+        .values(
+            'data_exists', 'year_folder_id', 'month_folder_id', 'date_folder_id',
+            'matched_company_folder_id', 'first_company_folder_id', 'today_count',
+        )
+        .get()
+    )
+
+    return {
+        'data_exists': state['data_exists'],
+        'has_current_year': state['year_folder_id'] is not None,
+        'year_folder_id': state['year_folder_id'],
+        'has_current_month': state['month_folder_id'] is not None,
+        'month_folder_id': state['month_folder_id'],
+        'has_today': state['date_folder_id'] is not None,
+        'date_folder_id': state['date_folder_id'],
+        'has_company_name_mc_number_name': state['matched_company_folder_id'] is not None,
+        'company_name_folder_id': (
+            state['matched_company_folder_id']
+            if state['matched_company_folder_id'] is not None
+            else state['first_company_folder_id']
+        ),
+        'today_count': state['today_count'],
+        # kept apart so callers can cache the two independently
+        'matched_company_folder_id': state['matched_company_folder_id'],
+        'first_company_folder_id': state['first_company_folder_id'],
+    }
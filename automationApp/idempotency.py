@@ -0,0 +1,185 @@
+import functools
+import hashlib
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def request_fingerprint(request):
+    """
+    The client's Idempotency-Key header, or else, for file uploads only, a
+    hash of the request content; None when neither applies. Two JSON bodies
+    that happen to be equal may well be two real records, so they are never
+    matched by content.
+
+    Multipart uploads are hashed from the parsed fields and the files'
+    SHA-256, taken from HashingUploadHandler when it saw the upload, else
+    read chunk by chunk, so large files are never read into memory.
+    """
+    client_key = request.headers.get(HEADER)
+    if client_key:
+        return f'key:{client_key}'
+    if request.content_type != 'multipart/form-data' or not request.FILES:
+        return None
+
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode('utf-8'))
+    for name in sorted(request.POST):
+        for value in request.POST.getlist(name):
+            digest.update(f'{name}={value}\n'.encode('utf-8'))
+    for name in sorted(request.FILES):
+        uploads = request.FILES.getlist(name)
+        known = getattr(request, 'upload_digests', {}).get(name, [])
+        for position, upload in enumerate(uploads):
+            digest.update(f'{name}:{upload.name}:{upload.size}\n'.encode('utf-8'))
+            if len(known) == len(uploads):
+                digest.update(known[position].encode('ascii'))
+                continue
+            for chunk in upload.chunks():
+                digest.update(chunk)
+            upload.seek(0)
+    return f'sha256:{digest.hexdigest()}'
+
+
+def _from_content(fingerprint):
+    return not fingerprint.startswith('key:')
+
+
+def _ttl(fingerprint):
+    # a content match is only trusted for as long as a client would keep retrying
+    return settings.IDEMPOTENCY_CONTENT_TTL if _from_content(fingerprint) else settings.IDEMPOTENCY_KEY_TTL
+
+
+def _storage_key(scope, fingerprint):
+    return hashlib.sha256(f'{scope}:{fingerprint}'.encode('utf-8')).hexdigest()
+
+
+def claim(scope, key, ttl=None):
+    """
+    Try to become the request that handles `key`, for `ttl` seconds
+    (IDEMPOTENCY_KEY_TTL by default). Returns None when claimed, otherwise
+    the existing IdempotencyKey (finished, or still processing). Expired
+    keys and abandoned claims are taken over.
+    """
+    ttl = settings.IDEMPOTENCY_KEY_TTL if ttl is None else ttl
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    key=key,
+                    scope=scope,
+                    expires_at=now + timedelta(seconds=ttl),
+                )
+            return None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(key=key).first()
+            if existing is None:
+                continue
+            abandoned = (
+                existing.status == 'processing'
+                and existing.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_PROCESSING_TIMEOUT)
+            )
+            if existing.expires_at > now and not abandoned:
+                return existing
+            # only one of several concurrent retries gets to delete and re-claim it
+            IdempotencyKey.objects.filter(pk=existing.pk, created_at=existing.created_at).delete()
+    return IdempotencyKey.objects.filter(key=key).first()
+
+
+def finish(key, response, store_client_errors=True):
+    """
+    Store the response for replay, or release the key if it should be
+    retried: after a 5xx, and after a 4xx unless `store_client_errors`
+    (a 4xx such as "No admin user found" may not hold on the next try).
+    """
+    if response.status_code >= 500 or response.streaming or (response.status_code >= 400 and not store_client_errors):
+        release(key)
+        return
+    IdempotencyKey.objects.filter(key=key).update(
+        status='done',
+        response_status=response.status_code,
+        response_body=response.content.decode(response.charset or 'utf-8'),
+        content_type=response.get('Content-Type', ''),
+    )
+
+
+def release(key):
+    IdempotencyKey.objects.filter(key=key, status='processing').delete()
+
+
+def replay(existing):
+    if existing.status != 'done':
+        return JsonResponse({
+            'status': 'error',
+            'message': 'A request with this idempotency key is still being processed'
+        }, status=409)
+    response = HttpResponse(existing.response_body, status=existing.response_status, content_type=existing.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """
+    Decorator for webhook views (sync or async): a retried request, matched by
+    its Idempotency-Key header or, for file uploads, its content, gets the
+    first response back instead of running the view again. 5xx responses are
+    not stored, nor are 4xx responses to requests matched by content.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                fingerprint = await sync_to_async(request_fingerprint)(request)
+                if fingerprint is None:
+                    return await view(request, *args, **kwargs)
+                key = _storage_key(scope, fingerprint)
+                existing = await sync_to_async(claim)(scope, key, _ttl(fingerprint))
+                if existing is not None:
+                    return replay(existing)
+                try:
+                    response = await view(request, *args, **kwargs)
+                except BaseException:
+                    await sync_to_async(release)(key)
+                    raise
+                await sync_to_async(finish)(key, response, not _from_content(fingerprint))
+                return response
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                fingerprint = request_fingerprint(request)
+                if fingerprint is None:
+                    return view(request, *args, **kwargs)
+                key = _storage_key(scope, fingerprint)
+                existing = claim(scope, key, _ttl(fingerprint))
+                if existing is not None:
+                    return replay(existing)
+                try:
+                    response = view(request, *args, **kwargs)
+                except BaseException:
+                    release(key)
+                    raise
+                finish(key, response, not _from_content(fingerprint))
+                return response
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys(batch_size=5000):
+    """Delete expired IdempotencyKey rows in batches; returns the number deleted."""
+    deleted = 0
+    while True:
+        pks = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,148 @@
+"""
+Shrinking photographed documents before they are relayed to Make.
+
+Kept free of Django model imports so ProcessPoolExecutor workers can import
+it under any start method; preprocessing.py decides what to process and
+puts the result in the blob store.
+"""
+import io
+import os
+import time
+
+# What Pillow reads without extra plugins; HEIC needs pillow-heif and is sent as it is
+IMAGE_TYPES = {'image/jpeg', 'image/jpg', 'image/pjpeg', 'image/png', 'image/webp', 'image/tiff', 'image/bmp', 'image/gif'}
+
+# JPEG segments that only carry metadata: APP1 (EXIF, XMP), APP13 (IPTC/Photoshop), COM
+JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME'}
+ORIENTATION = 0x0112
+
+
+def _read(source):
+    if isinstance(source, bytes):
+        return source
+    with open(source, 'rb') as fh:
+        return fh.read()
+
+
+def _orientation_segment(orientation):
+    from PIL import Image
+
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    payload = exif.tobytes()
+    return b'\xff\xe1' + (len(payload) + 2).to_bytes(2, 'big') + payload
+
+
+def _strip_jpeg(data, orientation):
+    segments = [data[:2]]
+    pos = 2
+    while pos < len(data):
+        if data[pos] != 0xFF:
+            raise ValueError('Corrupt JPEG segment')
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1  # fill byte
+            continue
+        if marker in (0xDA, 0xD9):
+            # start of scan (or end of image): the compressed pixels follow as they are
+            segments.append(data[pos:])
+            break
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            segments.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        end = pos + 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if marker not in JPEG_METADATA_MARKERS:
+            segments.append(data[pos:end])
+        pos = end
+    if orientation and orientation != 1:
+        # the only EXIF tag kept: without it the photo would show sideways; it goes after JFIF's APP0
+        at = 2 if len(segments) > 1 and segments[1][:2] == b'\xff\xe0' else 1
+        segments.insert(at, _orientation_segment(orientation))
+    return b''.join(segments)
+
+
+def _strip_png(data):
+    chunks = [data[:8]]
+    pos = 8
+    while pos < len(data):
+        length = int.from_bytes(data[pos:pos + 4], 'big')
+        kind = data[pos + 4:pos + 8]
+        if kind not in PNG_METADATA_CHUNKS:
+            chunks.append(data[pos:pos + 12 + length])
+        pos += 12 + length
+        if kind == b'IEND':
+            break
+    return b''.join(chunks)
+
+
+def strip_metadata(source, dest_path):
+    """
+    Copy a JPEG or PNG to `dest_path` without its metadata blocks, leaving
+    the compressed pixels untouched (a JPEG keeps only its orientation).
+    Returns the content type, or None for other formats.
+    """
+    from PIL import Image
+
+    data = _read(source)
+    if data[:2] == b'\xff\xd8':
+        with Image.open(io.BytesIO(data)) as image:
+            orientation = image.getexif().get(ORIENTATION)
+        stripped, content_type = _strip_jpeg(data, orientation), 'image/jpeg'
+    elif data[:8] == PNG_SIGNATURE:
+        stripped, content_type = _strip_png(data), 'image/png'
+    else:
+        return None
+    with open(dest_path, 'wb') as out:
+        out.write(stripped)
+    return content_type
+
+
+def _page(source, max_dimension):
+    """One upright RGB (or greyscale) page, at most `max_dimension` pixels on its longest side."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as original:
+        # phones store rotation as an EXIF tag; apply it before the tag is dropped
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            image = image.convert('RGBA')
+            flattened = Image.new('RGB', image.size, 'white')
+            flattened.paste(image, mask=image.getchannel('A'))
+            image = flattened
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    # re-encoding from pixels keeps none of the EXIF/XMP/comment blocks
+    image.info = {}
+    return image
+
+
+def normalize_images(sources, dest_path, max_dimension=2200, quality=80):
+    """
+    Re-encode `sources` (file paths or bytes) into `dest_path`: a single
+    photo as a progressive JPEG, several as one PDF with a page each.
+    A photo the re-encoding would not shrink keeps its pixels and only
+    loses its metadata (see strip_metadata).
+    Module-level so it can be sent to a ProcessPoolExecutor worker.
+    Returns {'content_type', 'size', 'pages', 'seconds'}.
+    """
+    started = time.perf_counter()
+    pages = [_page(source, max_dimension) for source in sources]
+    if len(pages) == 1:
+        pages[0].save(dest_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+        content_type = 'image/jpeg'
+        original = _read(sources[0])
+        if os.path.getsize(dest_path) >= len(original):
+            content_type = strip_metadata(original, dest_path) or content_type
+    else:
+        pages[0].save(dest_path, 'PDF', save_all=True, append_images=pages[1:], quality=quality, resolution=150)
+        content_type = 'application/pdf'
+    return {
+        'content_type': content_type,
+        'size': os.path.getsize(dest_path),
+        'pages': len(pages),
+        'seconds': time.perf_counter() - started,
+    }
@@ -0,0 +1,154 @@
+import json
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .audit_log import audit_log
+from .counters import record_uploads
+from .models import Dashboard, User
+
+RECORD_TYPES = ('whatsapp', 'gmail', 'sms')
+SHA256_HEX = re.compile(r'[0-9a-f]{64}')
+
+
+class BulkPayloadError(ValueError):
+    pass
+
+
+def parse_bulk_payload(body, content_type):
+    """
+    Decode a bulk request body into a list of record dicts. Accepts a JSON
+    array, a JSON object with a "records" array, or NDJSON (one object per line).
+    """
+    text = body.decode('utf-8') if isinstance(body, bytes) else body
+    if content_type in ('application/x-ndjson', 'application/jsonl'):
+        try:
+            items = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise BulkPayloadError(f'Invalid NDJSON: {e}')
+    else:
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError:
+            raise BulkPayloadError('Invalid JSON format')
+        if isinstance(items, dict):
+            items = items.get('records')
+
+    if not isinstance(items, list):
+        raise BulkPayloadError('Expected a JSON array of records')
+    if not items:
+        raise BulkPayloadError('No records supplied')
+    if len(items) > settings.BULK_INGEST_MAX_RECORDS:
+        raise BulkPayloadError(f'Too many records: at most {settings.BULK_INGEST_MAX_RECORDS} per request')
+    return items
+
+
+def validate_record(item):
+    """Return an error message for an invalid record, or None."""
+    if not isinstance(item, dict):
+        return 'Record must be a JSON object'
+    if not item.get('email') and not item.get('phone_number'):
+        return 'Missing required fields: email or phone_number'
+    for field in ('email', 'phone_number', 'google_drive_link', 'content_sha256'):
+        if item.get(field) is not None and not isinstance(item[field], str):
+            return f'Invalid {field}. Must be a string'
+    if item.get('type') not in RECORD_TYPES:
+        return 'Invalid type. Must be: whatsapp, gmail, or sms'
+    if item.get('content_sha256') and not SHA256_HEX.fullmatch(item['content_sha256'].lower()):
+        return 'Invalid content_sha256. Must be 64 hexadecimal characters'
+    return None
+
+
+def resolve_record_users(items):
+    """
+    Map each record to its owner with the same rules as /api/create-record/
+    (email match if an email is given, else phone match, else the first
+    superuser), using one IN query plus at most one fallback query for the
+    whole batch.
+    """
+    emails = {item['email'] for item in items if item.get('email')}
+    phones = {item['phone_number'] for item in items if not item.get('email') and item.get('phone_number')}
+    users = list(User.objects.filter(Q(email__in=emails) | Q(phone_number__in=phones)))
+    by_email = {u.email: u for u in users}
+    by_phone = {u.phone_number: u for u in users}
+
+    fallback = None
+    resolved = []
+    for item in items:
+        if item.get('email'):
+            user = by_email.get(item['email'])
+        else:
+            user = by_phone.get(item.get('phone_number'))
+        if user is None:
+            if fallback is None:
+                fallback = User.objects.filter(is_superuser=True).first()
+            user = fallback
+        resolved.append(user)
+    return resolved
+
+
+def create_dashboard_records(items):
+    """
+    Validate, resolve and insert a batch of dashboard records in one
+    transaction. Returns one result dict per input item, in order.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        error = validate_record(item)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'message': error}
+        else:
+            valid.append((index, item))
+
+    if not valid:
+        return results
+
+    users = resolve_record_users([item for _, item in valid])
+    pending = []
+    for (index, item), user in zip(valid, users):
+        if user is None:
+            results[index] = {
+                'index': index,
+                'status': 'error',
+                'message': 'No admin user found. Please create an admin user first.',
+            }
+            continue
+        record = Dashboard(
+            user=user,
+            email=item.get('email') or '',
+            phone_number=item.get('phone_number') or '',
+            type=item['type'],
+            google_drive_link=item.get('google_drive_link') or '',
+            content_sha256=(item.get('content_sha256') or '').lower() or None,
+        )
+        pending.append((index, record))
+
+    if not pending:
+        return results
+
+    with transaction.atomic():
+        records = Dashboard.objects.bulk_create([record for _, record in pending])
+        record_uploads(records)
+
+    for record in records:
+        audit_log.log(
+            user_id=record.user_id,
+            level='info',
+            event='dashboard_record_created',
+            message=f'Created {record.type} record for {record.email or record.phone_number}',
+            related_model='Dashboard',
+            related_id=record.id,
+        )
+
+    for (index, _), record in zip(pending, records):
+        results[index] = {
+            'index': index,
+            'status': 'created',
+            'id': record.id,
+            'user': record.user.email,
+            'created_date': record.created_date.isoformat(),
+        }
+    return results
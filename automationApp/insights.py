@@ -0,0 +1,84 @@
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncYear
+from django.utils import timezone
+
+from .counters import upload_counters_for
+from .filters import apply_dashboard_filters, dashboard_records_for
+
+MONTH_BUCKET_LIMIT = 12
+DAY_BUCKET_LIMIT = 15
+COMPANY_BUCKET_LIMIT = 50
+
+
+def _insight_source(user, filters):
+    """
+    Pick the table the buckets are grouped from.
+
+    The UploadCounter rollup answers year/month/type filters directly; the
+    free-text filter matches record emails and phone numbers, which only
+    exist on Dashboard rows, so those requests group the raw records.
+    """
+    if 'q' in filters:
+        qs = apply_dashboard_filters(dashboard_records_for(user), filters)
+        return {
+            'qs': qs.order_by(),
+            'count': Count('id'),
+            'day': TruncDate('created_date'),
+            'date_field': 'created_date',
+            'today': {'created_date__date': timezone.localdate()},
+            'company': F('user__user_data__company_name'),
+        }
+
+    qs = upload_counters_for(user)
+    if 'year' in filters:
+        qs = qs.filter(day__year=filters['year'])
+    if 'month' in filters:
+        qs = qs.filter(day__month=filters['month'])
+    if 'type' in filters:
+        qs = qs.filter(type=filters['type'])
+    return {
+        'qs': qs.order_by(),
+        'count': Sum('count'),
+        'day': TruncDay('day'),
+        'date_field': 'day',
+        'today': {'day': timezone.localdate()},
+        'company': F('company_name'),
+    }
+
+
+def _grouped(qs, count, limit=None, **group_by):
+    rows = qs.values(**group_by).annotate(count=count).order_by(f"-{next(iter(group_by))}")
+    return rows[:limit] if limit else rows
+
+
+def insight_buckets(user, filters):
+    """
+    Upload counts per year, month, day, company and type for the records
+    visible to `user`, grouped in the database. The result size depends on
+    the number of buckets, not on the number of uploads.
+    """
+    source = _insight_source(user, filters)
+    qs, count = source['qs'], source['count']
+
+    totals = qs.aggregate(total=count)
+    today = qs.filter(**source['today']).aggregate(total=count)
+
+    years = _grouped(qs, count, period=TruncYear(source['date_field']))
+    months = _grouped(qs, count, MONTH_BUCKET_LIMIT, period=TruncMonth(source['date_field']))
+    days = _grouped(qs, count, DAY_BUCKET_LIMIT, period=source['day'])
+    companies = (
+        qs.values(company=source['company'])
+        .annotate(count=count)
+        .order_by('-count')[:COMPANY_BUCKET_LIMIT]
+    )
+    types = qs.values('type').annotate(count=count).order_by('type')
+
+    return {
+        'total': totals['total'] or 0,
+        'today': today['total'] or 0,
+        'years': [{'year': b['period'].year, 'count': b['count']} for b in years],
+        'months': [{'month': b['period'].strftime('%Y-%m'), 'count': b['count']} for b in months],
+        'days': [{'date': b['period'].strftime('%Y-%m-%d'), 'count': b['count']} for b in days],
+        'companies': [{'name': b['company'] or None, 'count': b['count']} for b in companies],
+        'types': [{'type': b['type'], 'count': b['count']} for b in types],
+    }
@@ -0,0 +1,130 @@
+import glob
+import gzip
+import json
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import LogEntry
+
+ARCHIVE_FIELDS = ('id', 'user_id', 'event', 'message', 'level', 'related_model', 'related_id', 'created_at', 'updated_at')
+_ARCHIVE_NAME = re.compile(r'logentries-(\d{4})-(\d{2})\.ndjson\.gz$')
+
+
+def retention_days(level):
+    return settings.LOG_RETENTION_DAYS.get(level, settings.LOG_RETENTION_DEFAULT_DAYS)
+
+
+def expired_log_entries(now=None):
+    """LogEntry rows older than the retention window of their level."""
+    now = now or timezone.now()
+    levels = set(settings.LOG_RETENTION_DAYS)
+    expired = Q()
+    for level in levels:
+        expired |= Q(level=level, created_at__lt=now - timedelta(days=retention_days(level)))
+    expired |= ~Q(level__in=levels) & Q(created_at__lt=now - timedelta(days=settings.LOG_RETENTION_DEFAULT_DAYS))
+    return LogEntry.objects.filter(expired)
+
+
+def archive_path(year, month, archive_dir=None):
+    return os.path.join(archive_dir or settings.LOG_ARCHIVE_DIR, f'logentries-{year:04d}-{month:02d}.ndjson.gz')
+
+
+def _serialize(row):
+    row = dict(row)
+    row['created_at'] = row['created_at'].isoformat()
+    row['updated_at'] = row['updated_at'].isoformat()
+    return json.dumps(row, ensure_ascii=False)
+
+
+def archive_expired_logs(batch_size=1000, now=None, archive_dir=None, dry_run=False):
+    """
+    Move expired LogEntry rows into one gzip NDJSON file per month, then
+    delete them, batch by batch. Each batch is appended as its own gzip
+    member and synced before its rows are deleted, so an interrupted run can
+    at worst archive a batch twice (search_log_archive drops duplicates).
+    Returns {'archived': n, 'files': set of paths}.
+    """
+    archive_dir = archive_dir or settings.LOG_ARCHIVE_DIR
+    expired = expired_log_entries(now).order_by('pk').values(*ARCHIVE_FIELDS)
+    if dry_run:
+        return {'archived': expired.count(), 'files': set()}
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = 0
+    files = set()
+    last_pk = 0
+    while True:
+        batch = list(expired.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+
+        by_month = {}
+        for row in batch:
+            created = timezone.localtime(row['created_at'])
+            by_month.setdefault((created.year, created.month), []).append(row)
+
+        for (year, month), rows in by_month.items():
+            path = archive_path(year, month, archive_dir)
+            with open(path, 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as out:
+                    for row in rows:
+                        out.write(_serialize(row).encode('utf-8') + b'\n')
+                raw.flush()
+                os.fsync(raw.fileno())
+            files.add(path)
+
+        pks = [row['id'] for row in batch]
+        LogEntry.objects.filter(pk__in=pks).delete()
+        archived += len(batch)
+        last_pk = pks[-1]
+
+    return {'archived': archived, 'files': files}
+
+
+def archived_months(archive_dir=None):
+    """(year, month, path) for every archive file, oldest first."""
+    months = []
+    for path in glob.glob(os.path.join(archive_dir or settings.LOG_ARCHIVE_DIR, 'logentries-*.ndjson.gz')):
+        match = _ARCHIVE_NAME.search(path)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2)), path))
+    return sorted(months)
+
+
+def search_log_archive(since=None, until=None, level=None, event=None, contains=None, archive_dir=None):
+    """
+    Yield archived rows (dicts, created_at parsed back to datetimes) matching
+    the filters. `since`/`until` are (year, month) tuples and only select
+    which monthly files are opened.
+
+    A row archived twice by an interrupted run is written to the same
+    monthly file both times, so duplicates are dropped per file and memory
+    stays bounded by the largest month rather than the whole search.
+    """
+    for year, month, path in archived_months(archive_dir):
+        if since and (year, month) < since:
+            continue
+        if until and (year, month) > until:
+            continue
+        seen = set()
+        with gzip.open(path, 'rt', encoding='utf-8') as lines:
+            for line in lines:
+                row = json.loads(line)
+                if row['id'] in seen:
+                    continue
+                seen.add(row['id'])
+                if level and row['level'] != level:
+                    continue
+                if event and row['event'] != event:
+                    continue
+                if contains and contains.lower() not in (row['message'] or '').lower():
+                    continue
+                row['created_at'] = parse_datetime(row['created_at'])
+                row['updated_at'] = parse_datetime(row['updated_at'])
+                yield row
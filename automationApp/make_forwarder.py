@@ -0,0 +1,228 @@
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .auto_naming import name_uploads
+from .blob_store import is_blob, release_blob, store_upload
+from .models import LogEntry, OutboundUpload
+from .multipart import MultipartFileStream
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests.Session so forwarded uploads reuse pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=max(settings.MAKE_FORWARDER_CONCURRENCY, 1))
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def spool_upload(file_obj, email=None, phone_number=None, filename=None, media_type=None, sha256=None,
+                 original_size=None, source_sha256=''):
+    """
+    Put an uploaded file into the blob store and queue it for forwarding.
+    The upload holds a reference to the blob until it is delivered, so the
+    same attachment queued twice is kept on disk once. `original_size` and
+    `source_sha256` describe what the sender posted when `file_obj` is a
+    pre-processed replacement.
+    """
+    sha256, size, path = store_upload(file_obj, sha256=sha256)
+
+    return OutboundUpload.objects.create(
+        email=email,
+        phone_number=phone_number,
+        filename=filename,
+        media_type=media_type,
+        original_name=file_obj.name,
+        content_type=file_obj.content_type or 'application/octet-stream',
+        spool_path=path,
+        size=size,
+        original_size=size if original_size is None else original_size,
+        content_sha256=sha256,
+        source_sha256=source_sha256,
+    )
+
+
+def release_upload_file(upload):
+    """The upload no longer needs its file: drop its blob reference (gc_blobs deletes the file)."""
+    if is_blob(upload.content_sha256, upload.spool_path):
+        release_blob(upload.content_sha256)
+        return
+    # spooled before the blob store existed (auto-naming may still have hashed it)
+    try:
+        os.remove(upload.spool_path)
+    except OSError:
+        logger.warning(f"Could not remove spooled file {upload.spool_path}")
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number `attempts` (exponential, capped, with jitter)."""
+    delay = min(
+        settings.MAKE_FORWARDER_BACKOFF_BASE * (2 ** max(attempts - 1, 0)),
+        settings.MAKE_FORWARDER_BACKOFF_MAX,
+    )
+    return delay * random.uniform(0.9, 1.1)
+
+
+def claim_due_uploads(limit):
+    """
+    Move up to `limit` due uploads from pending to sending. Each row is claimed
+    with a conditional UPDATE, so two workers never claim the same upload.
+    A claimed row only returns to the queue through release_stale_uploads(),
+    so claim no more rows than can be sent right away (forward_due_uploads
+    claims one round of `concurrency` rows at a time).
+    """
+    now = timezone.now()
+    candidates = list(
+        OutboundUpload.objects
+        .filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in candidates
+        if OutboundUpload.objects.filter(pk=pk, status='pending').update(status='sending', updated_at=now)
+    ]
+    return list(OutboundUpload.objects.filter(pk__in=claimed).order_by('next_attempt_at'))
+
+
+def release_stale_uploads():
+    """
+    Return uploads stuck in `sending` (e.g. the worker was killed) to the queue.
+    A live worker sends every row it claims within one request timeout, so a
+    row untouched for four timeouts has been abandoned.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.MAKE_FORWARDER_TIMEOUT * 4)
+    return OutboundUpload.objects.filter(status='sending', updated_at__lt=cutoff).update(
+        status='pending', updated_at=timezone.now()
+    )
+
+
+def _log_attempt(upload, level, message):
+    LogEntry.objects.create(
+        level=level,
+        event='make_forward_attempt',
+        message=message,
+        related_model='OutboundUpload',
+        related_id=str(upload.id),
+    )
+
+
+def _post(upload, session):
+    payload = {
+        "email": upload.email,
+        "phone_number": upload.phone_number,
+        "filename": upload.generated_filename or upload.filename,
+        "type": upload.media_type,
+        # for the scenario to pass back to /api/create-record/, so re-sent copies are recognised
+        "content_sha256": upload.source_sha256 or upload.content_sha256,
+    }
+    # the body streams the spooled file from disk instead of loading it
+    with MultipartFileStream(payload, "file", upload.spool_path, upload.original_name, upload.content_type) as body:
+        return session.post(
+            settings.MAKE_WEBHOOK_URL,
+            data=body,
+            headers={'Content-Type': body.content_type},
+            timeout=settings.MAKE_FORWARDER_TIMEOUT,
+        )
+
+
+def touch(upload):
+    """Heartbeat for a claimed upload, so release_stale_uploads() leaves it alone."""
+    OutboundUpload.objects.filter(pk=upload.pk, status='sending').update(updated_at=timezone.now())
+
+
+def forward_upload(upload, session=None):
+    """Try to deliver one claimed upload; on failure schedule a retry or dead-letter it."""
+    session = session or get_session()
+    if settings.OCR_ENABLED:
+        # named right before its own send, so no claimed upload waits for others' OCR
+        try:
+            name_uploads([upload], heartbeat=lambda: touch(upload))
+        except Exception as e:
+            # naming is best effort; the upload still goes out under the name it came with
+            logger.exception(f"Auto-naming failed: {e}")
+    upload.attempts += 1
+
+    try:
+        response = _post(upload, session)
+        upload.response_status = response.status_code
+        upload.response_body = response.text[:2000]
+        if response.ok:
+            error = None
+        else:
+            error = f"Make responded with HTTP {response.status_code}"
+    except (requests.RequestException, OSError) as e:
+        error = f"{e.__class__.__name__}: {e}"
+
+    if error is None:
+        upload.status = 'delivered'
+        upload.last_error = ''
+        upload.save()
+        _log_attempt(upload, 'info', f"Forwarded {upload.original_name} to Make (attempt {upload.attempts})")
+        release_upload_file(upload)
+        return upload
+
+    upload.last_error = error
+    if upload.attempts >= settings.MAKE_FORWARDER_MAX_ATTEMPTS:
+        upload.status = 'dead'
+        upload.save()
+        _log_attempt(upload, 'error', f"Giving up on {upload.original_name} after {upload.attempts} attempts: {error}")
+    else:
+        upload.status = 'pending'
+        upload.next_attempt_at = timezone.now() + timedelta(seconds=backoff_delay(upload.attempts))
+        upload.save()
+        _log_attempt(upload, 'warning', f"Attempt {upload.attempts} for {upload.original_name} failed: {error}")
+    return upload
+
+
+def _forward_in_worker_thread(upload):
+    try:
+        return forward_upload(upload)
+    finally:
+        close_old_connections()
+
+
+def _forward_round(uploads, pool):
+    if pool is None or len(uploads) == 1:
+        return [forward_upload(upload) for upload in uploads]
+    return list(pool.map(_forward_in_worker_thread, uploads))
+
+
+def forward_due_uploads(limit=50, concurrency=None):
+    """
+    Forward up to `limit` due uploads with at most `concurrency` requests in
+    flight. Rows are claimed one round of `concurrency` at a time, so none
+    sits in `sending` waiting behind other rows' requests.
+    """
+    concurrency = max(concurrency or settings.MAKE_FORWARDER_CONCURRENCY, 1)
+    pool = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+    processed = []
+    try:
+        while len(processed) < limit:
+            uploads = claim_due_uploads(min(concurrency, limit - len(processed)))
+            if not uploads:
+                break
+            processed.extend(_forward_round(uploads, pool))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return processed
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from automationApp.log_retention import archive_expired_logs
+
+
+class Command(BaseCommand):
+    help = "Move LogEntry rows past their level's retention window into monthly gzip NDJSON archives"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows archived and deleted per batch')
+        parser.add_argument('--archive-dir', default=None, help='Archive directory (default: LOG_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        result = archive_expired_logs(
+            batch_size=options['batch_size'],
+            archive_dir=options['archive_dir'],
+            dry_run=options['dry_run'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f"{result['archived']} log entries are past retention.")
+            return
+        for path in sorted(result['files']):
+            self.stdout.write(f"Wrote {path}")
+        self.stdout.write(self.style.SUCCESS(f"Archived and deleted {result['archived']} log entries."))
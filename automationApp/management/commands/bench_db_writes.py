@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, transaction
+
+from automationApp.benchmarks import percentile
+from automationApp.models import LogEntry
+
+BENCH_EVENT = 'bench_db_write'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent single-row write throughput against the configured database. "
+        "Run it once per configuration (DB_ENGINE, DB_POOL, SQLITE_JOURNAL_MODE, ...) to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers')
+        parser.add_argument('--writes', type=int, default=200, help='Writes per writer')
+        parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+
+    def describe_database(self):
+        if connection.vendor != 'sqlite':
+            return {'vendor': connection.vendor, 'pool': 'pool' in connection.settings_dict['OPTIONS']}
+        with connection.cursor() as cursor:
+            pragmas = {}
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {pragma}')
+                pragmas[pragma] = cursor.fetchone()[0]
+        return {'vendor': 'sqlite', **pragmas}
+
+    def writer(self, count):
+        latencies, errors = [], 0
+        try:
+            for i in range(count):
+                started = time.perf_counter()
+                try:
+                    # one transaction per write, like one webhook call
+                    with transaction.atomic():
+                        LogEntry.objects.create(event=BENCH_EVENT, message=f'{threading.get_ident()}-{i}')
+                except OperationalError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+        finally:
+            close_old_connections()
+        return latencies, errors
+
+    def handle(self, *args, **options):
+        threads, writes = options['threads'], options['writes']
+        database = self.describe_database()
+
+        started = time.perf_counter()
+        if threads <= 1:
+            results = [self.writer(writes)]
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(self.writer, [writes] * threads))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(l for batch, _ in results for l in batch)
+        errors = sum(e for _, e in results)
+        LogEntry.objects.filter(event=BENCH_EVENT).delete()
+
+        result = {
+            'database': database,
+            'threads': threads,
+            'writes': len(latencies),
+            'errors': errors,
+            'seconds': round(elapsed, 3),
+            'writes_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+        else:
+            self.stdout.write(
+                f"{database}: {result['writes_per_second']} writes/s with {threads} writers, "
+                f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, {errors} lock errors"
+            )
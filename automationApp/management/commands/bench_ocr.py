@@ -0,0 +1,65 @@
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from automationApp.benchmarks import run_ocr_benchmark, sample_pages
+from automationApp.ocr import get_engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure OCR throughput (pages/sec, and per core) of the configured engine "
+        "on worker pools of different sizes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Documents to OCR (default: generated sample pages)')
+        parser.add_argument('--pages', type=int, default=24, help='Sample pages to generate when no files are given')
+        parser.add_argument(
+            '--workers', default=f'1,{os.cpu_count() or 1}', help='Comma-separated pool sizes to compare'
+        )
+        parser.add_argument('--engine', default=settings.OCR_ENGINE, help='Dotted path of the OCR engine class')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            pool_sizes = sorted({int(size) for size in options['workers'].split(',')})
+        except ValueError:
+            raise CommandError(f"Invalid --workers {options['workers']!r}")
+        if not pool_sizes or pool_sizes[0] < 1:
+            raise CommandError("Pool sizes must be at least 1")
+
+        engine_options = settings.OCR_ENGINE_OPTIONS
+        try:
+            engine = get_engine(options['engine'], engine_options)
+        except ImportError as e:
+            raise CommandError(f"Cannot load OCR engine {options['engine']}: {e}")
+
+        workdir = tempfile.mkdtemp(prefix='bench_ocr_')
+        try:
+            if options['files']:
+                files = [(path, mimetypes.guess_type(path)[0] or 'application/octet-stream') for path in options['files']]
+            else:
+                try:
+                    files = sample_pages(workdir, options['pages'], engine)
+                except ValueError as e:
+                    raise CommandError(str(e))
+            results = [run_ocr_benchmark(options['engine'], engine_options, files, size) for size in pool_sizes]
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'engine': engine.name, 'cpus': os.cpu_count(), 'results': results}, indent=2))
+            return
+        self.stdout.write(f"{engine.name} on {os.cpu_count()} CPUs")
+        for r in results:
+            self.stdout.write(
+                f"{r['workers']} workers: {r['pages']} pages in {r['seconds']} s, "
+                f"{r['pages_per_second']} pages/s ({r['pages_per_second_per_core']} per core), "
+                f"p50 {r['p50_ms_per_page']} ms/page, p95 {r['p95_ms_per_page']} ms/page"
+            )
@@ -0,0 +1,133 @@
+import json
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from automationApp.audit_log import audit_log
+from automationApp.benchmarks import DEFAULT_MIX, WEBHOOK_ROUTES, endpoint_report, parse_mix, webhook_plan
+from automationApp.models import Dashboard, EmailFolder, LogEntry, User
+
+WRITE_MODELS = (Dashboard, EmailFolder, LogEntry)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a Make.com traffic mix against the webhook endpoints and report p50/p95/p99 latency, "
+        "queries per request and rows written per second. Uses the Django test client in-process, "
+        "or a running server with --live-url."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Requests to replay')
+        parser.add_argument('--mix', default=None,
+                            help='Endpoint weights, e.g. "search=40,create_record=35,create_folder=10,log_entry=15"')
+        parser.add_argument('--users', type=int, default=50, help='Callers drawn from the existing users')
+        parser.add_argument('--seed-users', type=int, default=0,
+                            help='Run seed_data --count N first when fewer users exist')
+        parser.add_argument('--live-url', default=None, help='Base URL of a running server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel requests in --live-url mode')
+        parser.add_argument('--random-seed', type=int, default=1, help='Makes the replayed traffic repeatable')
+        parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the rows the run created afterwards')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix']) if options['mix'] else DEFAULT_MIX
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['seed_users'] and User.objects.count() < options['seed_users']:
+            call_command('seed_data', count=options['seed_users'] - User.objects.count(), stdout=self.stdout)
+
+        callers = list(
+            User.objects.filter(user_data__isnull=False)
+            .order_by('pk')
+            .values_list('email', 'user_data__phone_number', 'user_data__company_name', 'user_data__mc_number')
+            [:options['users']]
+        )
+        if not callers:
+            raise CommandError("No users with UserData to replay traffic for; use --seed-users N")
+
+        rng = random.Random(options['random_seed'])
+        plan = webhook_plan(callers, mix, options['requests'], rng, timezone.now().date())
+        high_water = {model: model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+                      for model in WRITE_MODELS}
+
+        started = time.perf_counter()
+        if options['live_url']:
+            samples = self.replay_live(plan, options['live_url'], options['concurrency'])
+        else:
+            samples = self.replay_in_process(plan)
+        elapsed = time.perf_counter() - started
+
+        audit_log.flush()
+        rows = {model.__name__: model.objects.filter(pk__gt=high_water[model]).count() for model in WRITE_MODELS}
+        report = {
+            'mode': 'live' if options['live_url'] else 'test-client',
+            'database': connection.vendor,
+            'requests': len(plan),
+            'callers': len(callers),
+            'mix': mix,
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(plan) / elapsed, 1) if elapsed else 0.0,
+            'rows_written': rows,
+            'rows_per_second': round(sum(rows.values()) / elapsed, 1) if elapsed else 0.0,
+            'endpoints': endpoint_report(samples),
+        }
+
+        if options['cleanup']:
+            for model in WRITE_MODELS:
+                model.objects.filter(pk__gt=high_water[model]).delete()
+            call_command('rebuild_upload_counters', stdout=self.stdout)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def replay_in_process(self, plan):
+        client = Client()
+        samples = defaultdict(list)
+        for endpoint, payload in plan:
+            url = reverse(WEBHOOK_ROUTES[endpoint])
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.post(url, json.dumps(payload), content_type='application/json')
+                seconds = time.perf_counter() - started
+            samples[endpoint].append((seconds, response.status_code, len(queries)))
+        return samples
+
+    def replay_live(self, plan, base_url, concurrency):
+        session = requests.Session()
+        session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+        def send(item):
+            endpoint, payload = item
+            url = urljoin(base_url, reverse(WEBHOOK_ROUTES[endpoint]))
+            started = time.perf_counter()
+            try:
+                status = session.post(url, json=payload, timeout=30).status_code
+            except requests.RequestException:
+                status = 599
+            return endpoint, (time.perf_counter() - started, status, None)
+
+        samples = defaultdict(list)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for endpoint, sample in pool.map(send, plan):
+                samples[endpoint].append(sample)
+        return samples
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from automationApp.benchmarks import run_asgi, run_wsgi
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the search-email webhook through Django's WSGI and ASGI handlers "
+        "in-process. For server-level numbers run the app under gunicorn and uvicorn "
+        "(automationProject.asgi:application) and point a load generator at both."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per handler')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight')
+        parser.add_argument('--email', default='bench@example.com', help='Email passed to /api/search-email/')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        path = reverse('search_email_records')
+        params = {'email': options['email']}
+        results = [
+            run_wsgi(path, params, options['requests'], options['concurrency']),
+            run_asgi(path, params, options['requests'], options['concurrency']),
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for r in results:
+            self.stdout.write(
+                f"{r['label']}: {r['requests_per_second']} req/s, "
+                f"p50 {r['p50_ms']} ms, p95 {r['p95_ms']} ms, p99 {r['p99_ms']} ms, "
+                f"{r['errors']} errors"
+            )
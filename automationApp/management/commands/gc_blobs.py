@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from automationApp.blob_store import collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = "Delete stored attachments no queued upload refers to any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=settings.BLOB_GC_GRACE_SECONDS,
+            help='Keep unreferenced blobs for this many seconds after their last use',
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Recompute reference counts from the outbound uploads first',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+
+    def handle(self, *args, **options):
+        if options['recount'] and not options['dry_run']:
+            fixed = recount_references()
+            self.stdout.write(f"Corrected {fixed} reference counts.")
+
+        removed, freed = collect_garbage(options['grace'], dry_run=options['dry_run'])
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} blobs ({freed} bytes)."))
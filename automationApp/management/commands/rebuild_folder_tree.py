@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from automationApp.folder_tree import backfill_folder_tree
+from automationApp.models import DriveFolder, EmailFolder
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DriveFolder tree from the EmailFolder records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, help='Number of EmailFolder rows read per batch'
+        )
+        parser.add_argument(
+            '--keep', action='store_true', help='Only add missing nodes instead of rebuilding from scratch'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        deleted = 0
+        if not options['keep']:
+            deleted, _ = DriveFolder.objects.all().delete()
+        created = backfill_folder_tree(EmailFolder, DriveFolder, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt folder tree: removed {deleted} nodes, created {created} nodes."
+        ))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+from automationApp.models import Dashboard, UploadCounter
+
+
+class Command(BaseCommand):
+    help = "Rebuild the UploadCounter rollup table from the Dashboard records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, help='Number of buckets inserted per query'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        buckets = (
+            Dashboard.objects
+            .order_by()
+            .values(
+                'user_id',
+                'type',
+                day=TruncDate('created_date'),
+                company=Coalesce(F('user__user_data__company_name'), Value('')),
+            )
+            .annotate(count=Count('id'))
+        )
+
+        deleted, _ = UploadCounter.objects.all().delete()
+
+        created = 0
+        batch = []
+        for bucket in buckets.iterator(chunk_size=batch_size):
+            batch.append(UploadCounter(
+                user_id=bucket['user_id'],
+                company_name=bucket['company'],
+                type=bucket['type'],
+                day=bucket['day'],
+                count=bucket['count'],
+            ))
+            if len(batch) >= batch_size:
+                UploadCounter.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            UploadCounter.objects.bulk_create(batch)
+            created += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt upload counters: removed {deleted} buckets, created {created} buckets."
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from automationApp.make_forwarder import forward_due_uploads, release_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Forward spooled uploads to the Make.com webhook, retrying with exponential backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the due uploads once and exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--batch-size', type=int, default=50, help='Uploads claimed per pass')
+        parser.add_argument('--concurrency', type=int, default=None, help='Parallel requests to Make (default: MAKE_FORWARDER_CONCURRENCY)')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_stale_uploads()
+            if released:
+                self.stdout.write(self.style.WARNING(f"Re-queued {released} stale uploads."))
+
+            processed = forward_due_uploads(limit=options['batch_size'], concurrency=options['concurrency'])
+            for upload in processed:
+                self.stdout.write(f"{upload.id} {upload.original_name}: {upload.status} (attempt {upload.attempts})")
+
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
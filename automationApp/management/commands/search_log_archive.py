@@ -0,0 +1,41 @@
+import json
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from automationApp.log_retention import search_log_archive
+
+
+def _month(value):
+    try:
+        year, month = value.split('-')
+        return int(year), int(month)
+    except ValueError:
+        raise CommandError(f"Invalid month {value!r}, expected YYYY-MM")
+
+
+class Command(BaseCommand):
+    help = "Search archived LogEntry rows; prints one JSON object per match"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First month to search (YYYY-MM)')
+        parser.add_argument('--until', help='Last month to search (YYYY-MM)')
+        parser.add_argument('--level', choices=['info', 'warning', 'error'])
+        parser.add_argument('--event')
+        parser.add_argument('--contains', help='Case-insensitive text to look for in the message')
+        parser.add_argument('--limit', type=int, default=100, help='Maximum rows to print (0 for all)')
+        parser.add_argument('--archive-dir', default=None, help='Archive directory (default: LOG_ARCHIVE_DIR)')
+
+    def handle(self, *args, **options):
+        rows = search_log_archive(
+            since=_month(options['since']) if options['since'] else None,
+            until=_month(options['until']) if options['until'] else None,
+            level=options['level'],
+            event=options['event'],
+            contains=options['contains'],
+            archive_dir=options['archive_dir'],
+        )
+        if options['limit']:
+            rows = islice(rows, options['limit'])
+        for row in rows:
+            self.stdout.write(json.dumps(row, default=str))
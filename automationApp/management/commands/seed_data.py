@@ -1,17 +1,23 @@
 # core/management/commands/seed_data.py
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from faker import Faker
+from concurrent.futures import ProcessPoolExecutor
 import random
 import uuid
 
 from automationApp.models import UserData, Dashboard, EmailFolder, LogEntry  # adjust import if your app name != core
+from automationApp.seeding import generate_chunk, parse_range
 
 User = get_user_model()
 fake = Faker()
 
+BULK_BATCH_SIZE = 500  # rows per INSERT; keeps SQLite under its bound-parameter limit
+
 
 class Command(BaseCommand):
     help = "Seed database with fake data (users, userdata, dashboards, emailfolders, logentries)"
@@ -20,10 +26,41 @@ class Command(BaseCommand):
         parser.add_argument(
             '--count', type=int, default=200, help='Number of users to create (and associated records)'
         )
+        parser.add_argument('--dashboards-per-user', default='1-5', help='Dashboard rows per user, e.g. "1-5" or "3"')
+        parser.add_argument('--folders-per-user', default='1', help='EmailFolder rows per user')
+        parser.add_argument('--logs-per-user', default='1-4', help='LogEntry rows per user')
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Fast mode: hash the password once and insert in chunks with bulk_create',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Users per chunk in --bulk mode')
+        parser.add_argument(
+            '--workers', type=int, default=1, help='Processes generating fake rows in --bulk mode'
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
-        count = options['count']
+        try:
+            volumes = {
+                'dashboards': parse_range(options['dashboards_per_user']),
+                'folders': parse_range(options['folders_per_user']),
+                'logs': parse_range(options['logs_per_user']),
+            }
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['bulk']:
+            created_users = self.seed_bulk(options['count'], volumes, options['batch_size'], options['workers'])
+        else:
+            created_users = self.seed_one_by_one(options['count'], volumes)
+
+        # rows were inserted directly, so refresh the metrics rollup and the folder tree
+        call_command('rebuild_upload_counters', stdout=self.stdout)
+        call_command('rebuild_folder_tree', keep=True, stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(f"Created {created_users} users and associated fake data."))
+
+    @transaction.atomic
+    def seed_one_by_one(self, count, volumes):
         created_users = 0
 
         TYPE_CHOICES = [choice[0] for choice in Dashboard.TYPE_CHOICES]
@@ -39,22 +76,16 @@ class Command(BaseCommand):
             user = User.objects.create_user(
                 username=username,
                 email=email,
+                phone_number=phone,
                 password="password123",  # change later if needed
                 first_name=fake.first_name(),
                 last_name=fake.last_name(),
             )
-            # set phone_number if your custom user model requires it
-            try:
-                user.phone_number = phone
-                user.save()
-            except Exception:
-                # If phone_number is required in User creation or different field name, ignore or adjust
-                pass
 
             created_users += 1
 
             # create UserData (one-to-one)
-            UserData.objects.create(
+            user_data = UserData.objects.create(
                 user=user,
                 company_name=fake.company(),
                 number_of_trucks=random.randint(0, 200),
@@ -62,8 +93,8 @@ class Command(BaseCommand):
                 phone_number=phone,
             )
 
-            # create several dashboard entries per user (1-5)
-            for _ in range(random.randint(1, 5)):
+            # create several dashboard entries per user (1-5 by default)
+            for _ in range(random.randint(*volumes['dashboards'])):
                 Dashboard.objects.create(
                     user=user,
                     email=email,
@@ -73,22 +104,24 @@ class Command(BaseCommand):
                     type=random.choice(TYPE_CHOICES),
                 )
 
-            # create one email folder per user
-            folder_date = fake.date_between(start_date='-2y', end_date='today')
-            EmailFolder.objects.create(
-                email=email,
-                phone_number=phone,
-                email_folder_id=f"ef_{uuid.uuid4().hex[:12]}",
-                year_folder_id=f"y_{folder_date.year}_{uuid.uuid4().hex[:6]}",
-                month_folder_id=f"m_{folder_date.month}_{uuid.uuid4().hex[:6]}",
-                date_folder_id=f"d_{folder_date.day}_{uuid.uuid4().hex[:6]}",
-                folder_year=folder_date.year,
-                folder_month=folder_date.month,
-                folder_date=folder_date,
-            )
+            # create email folders (one per user by default)
+            for _ in range(random.randint(*volumes['folders'])):
+                folder_date = fake.date_between(start_date='-2y', end_date='today')
+                EmailFolder.objects.create(
+                    email=email,
+                    phone_number=phone,
+                    company_name_folder_id=f"c_{uuid.uuid4().hex[:12]}",
+                    company_name_mc_number=f"{user_data.company_name}_{user_data.mc_number}",
+                    year_folder_id=f"y_{folder_date.year}_{uuid.uuid4().hex[:6]}",
+                    month_folder_id=f"m_{folder_date.month}_{uuid.uuid4().hex[:6]}",
+                    date_folder_id=f"d_{folder_date.day}_{uuid.uuid4().hex[:6]}",
+                    folder_year=folder_date.year,
+                    folder_month=folder_date.month,
+                    folder_date=folder_date,
+                )
 
             # create a few log entries
-            for _ in range(random.randint(1, 4)):
+            for _ in range(random.randint(*volumes['logs'])):
                 LogEntry.objects.create(
                     user=user,
                     event=random.choice(['import_email', 'upload_file', 'parse_error', 'login']),
@@ -99,4 +132,65 @@ class Command(BaseCommand):
                     created_at=fake.date_time_between(start_date='-2y', end_date='now', tzinfo=timezone.get_current_timezone()),
                 )
 
-        self.stdout.write(self.style.SUCCESS(f"Created {created_users} users and associated fake data."))
+        return created_users
+
+    def seed_bulk(self, count, volumes, batch_size, workers):
+        password = make_password("password123")  # hashed once, shared by every seeded user
+        # usernames/emails carry `run`, phone numbers `run_number`, so repeated runs don't collide
+        run = uuid.uuid4().hex[:6]
+        run_number = random.randint(0, 99999)
+        specs = [
+            {
+                'start': start,
+                'size': min(batch_size, count - start),
+                'seed': random.getrandbits(32),
+                'run': run,
+                'run_number': run_number,
+                'types': [choice[0] for choice in Dashboard.TYPE_CHOICES],
+                'levels': [choice[0] for choice in LogEntry.LEVEL_CHOICES],
+                **volumes,
+            }
+            for start in range(0, count, batch_size)
+        ]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                created = sum(self.insert_chunk(chunk, password) for chunk in pool.map(generate_chunk, specs))
+        else:
+            created = sum(self.insert_chunk(generate_chunk(spec), password) for spec in specs)
+        return created
+
+    @transaction.atomic
+    def insert_chunk(self, chunk, password):
+        users = User.objects.bulk_create([
+            User(username=username, email=email, phone_number=phone, first_name=first, last_name=last,
+                 password=password)
+            for username, email, phone, first, last in chunk['users']
+        ], batch_size=BULK_BATCH_SIZE)
+
+        UserData.objects.bulk_create([
+            UserData(user=users[i], company_name=company, number_of_trucks=trucks, mc_number=mc, phone_number=phone)
+            for i, company, trucks, mc, phone in chunk['user_data']
+        ], batch_size=BULK_BATCH_SIZE)
+        Dashboard.objects.bulk_create([
+            Dashboard(user=users[i], email=email, phone_number=phone, created_date=created,
+                      google_drive_link=link, type=record_type)
+            for i, email, phone, created, link, record_type in chunk['dashboards']
+        ], batch_size=BULK_BATCH_SIZE)
+        EmailFolder.objects.bulk_create([
+            EmailFolder(
+                email=email, phone_number=phone,
+                company_name_folder_id=company_folder, company_name_mc_number=company_key,
+                year_folder_id=year_folder, month_folder_id=month_folder, date_folder_id=date_folder,
+                folder_year=folder_year, folder_month=folder_month, folder_date=folder_date,
+            )
+            for (email, phone, company_folder, company_key, year_folder, month_folder, date_folder,
+                 folder_year, folder_month, folder_date) in chunk['folders']
+        ], batch_size=BULK_BATCH_SIZE)
+        LogEntry.objects.bulk_create([
+            LogEntry(user=users[i], event=event, message=message, level=level,
+                     related_model=related_model, related_id=related_id)
+            for i, event, message, level, related_model, related_id in chunk['logs']
+        ], batch_size=BULK_BATCH_SIZE)
+
+        self.stdout.write(f"Inserted users {users[0].username} .. {users[-1].username}")
+        return len(users)
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from automationApp.notifications import deliver_lead_notifications, release_stale_notifications
+
+
+class Command(BaseCommand):
+    help = "Send queued lead notification emails over one SMTP connection, retrying failures"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Send the due notifications once and exit')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between passes')
+        parser.add_argument('--batch-size', type=int, default=100, help='Notifications claimed per pass')
+        parser.add_argument(
+            '--digest-threshold', type=int, default=None,
+            help='Queued leads per recipient that are merged into one digest (default: LEAD_NOTIFICATION_DIGEST_THRESHOLD)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_stale_notifications()
+            if released:
+                self.stdout.write(self.style.WARNING(f"Re-queued {released} stale notifications."))
+
+            sent, failed = deliver_lead_notifications(
+                batch_size=options['batch_size'], digest_threshold=options['digest_threshold']
+            )
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} notifications, {failed} failed.")
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,151 @@
+import heapq
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('automationApp.requests')
+
+# The metrics of the request being handled. A context variable rather than a
+# thread-local: async views run their ORM calls in sync_to_async threads,
+# which inherit the request's context.
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'query_count', 'db_time', 'instances', 'slowest')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.instances = 0
+        self.slowest = []  # min-heap of (seconds, sql), at most REQUEST_METRICS_MAX_SQL long
+
+    def add_query(self, sql, seconds):
+        self.query_count += 1
+        self.db_time += seconds
+        item = (seconds, sql)
+        if len(self.slowest) < settings.REQUEST_METRICS_MAX_SQL:
+            heapq.heappush(self.slowest, item)
+        elif item > self.slowest[0]:
+            heapq.heapreplace(self.slowest, item)
+
+
+def record_query(execute, sql, params, many, context):
+    """connection.execute_wrappers hook; a no-op outside an instrumented request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+def count_instance(sender, **kwargs):
+    """post_init receiver: counts model instances built while handling a request."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.instances += 1
+
+
+def install_query_hook(db_connection):
+    if record_query not in db_connection.execute_wrappers:
+        db_connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures each request: wall time, query count and time spent in the
+    database, model instances built and response size. Adds a Server-Timing
+    header, logs one JSON line to the 'automationApp.requests' logger and
+    stores requests slower than REQUEST_METRICS_SLOW_MS as SlowRequestSample
+    rows (a REQUEST_METRICS_SAMPLE_RATE fraction of them).
+
+    Queries made while a streaming response is consumed are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        install_query_hook(connection)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        sample = self.finish(request, response, metrics)
+        if sample is not None:
+            self.store_sample(sample)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        sample = self.finish(request, response, metrics)
+        if sample is not None:
+            await sync_to_async(self.store_sample)(sample)
+        return response
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        response_bytes = None if response.streaming else len(response.content)
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path[:500],
+            'view_name': (match.view_name if match else '')[:200],
+            'status_code': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_time_ms': round(metrics.db_time * 1000, 2),
+            'query_count': metrics.query_count,
+            'instances': metrics.instances,
+            'response_bytes': response_bytes,
+        }
+
+        response['Server-Timing'] = (
+            f'app;dur={record["duration_ms"]}, '
+            f'db;dur={record["db_time_ms"]};desc="{metrics.query_count} queries", '
+            f'orm;desc="{metrics.instances} instances"'
+        )
+        logger.info(json.dumps(record), extra={'request_metrics': record})
+
+        if (
+            settings.REQUEST_METRICS_SLOW_MS
+            and record['duration_ms'] >= settings.REQUEST_METRICS_SLOW_MS
+            and random.random() < settings.REQUEST_METRICS_SAMPLE_RATE
+        ):
+            record['slowest_queries'] = [
+                {'ms': round(seconds * 1000, 2), 'sql': sql}
+                for seconds, sql in sorted(metrics.slowest, reverse=True)
+            ]
+            return record
+        return None
+
+    def store_sample(self, record):
+        from .models import SlowRequestSample
+
+        try:
+            SlowRequestSample.objects.create(**record)
+        except Exception as e:
+            logger.warning(f"Could not store slow request sample: {e}")
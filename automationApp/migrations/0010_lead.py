@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0009_emailfolder_company_name_mc_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=255)),
+                ('company_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('mc_number', models.CharField(blank=True, max_length=50, null=True)),
+                ('phone', models.CharField(max_length=20)),
+                ('email', models.EmailField(max_length=254)),
+                ('truck_count', models.CharField(blank=True, max_length=50, null=True)),
+                ('help_needed', models.CharField(choices=[('compliance', 'Compliance & Permits'), ('bookkeeping', 'Bookkeeping & Taxes'), ('growth', 'Business growth'), ('all', 'Everything')], default='all', help_text='Area where assistance is required', max_length=50)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('COMMUNICATED', 'Communicated'), ('COMPLETED', 'Completed')], default='PENDING', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Lead',
+                'verbose_name_plural': 'Leads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
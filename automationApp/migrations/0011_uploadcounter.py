@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0010_lead'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_name', models.CharField(blank=True, default='', max_length=255)),
+                ('type', models.CharField(choices=[('whatsapp', 'WhatsApp Message'), ('gmail', 'Gmail'), ('sms', 'SMS')], max_length=20)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'company_name', 'type', 'day'), name='unique_upload_counter_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0011_uploadcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dashboard',
+            index=models.Index(fields=['user', '-created_date'], name='dashboard_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dashboard',
+            index=models.Index(fields=['-created_date'], name='dashboard_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dashboard',
+            index=models.Index(fields=['type', '-created_date'], name='dashboard_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailfolder',
+            index=models.Index(fields=['email', 'folder_date'], name='emailfolder_email_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailfolder',
+            index=models.Index(fields=['phone_number', 'folder_date'], name='emailfolder_phone_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailfolder',
+            index=models.Index(fields=['folder_year'], name='emailfolder_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailfolder',
+            index=models.Index(fields=['company_name_mc_number'], name='emailfolder_company_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailfolder',
+            index=models.Index(fields=['-folder_date'], name='emailfolder_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['-created_at'], name='logentry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['level', '-created_at'], name='logentry_level_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userdata',
+            index=models.Index(fields=['phone_number'], name='userdata_phone_idx'),
+        ),
+    ]
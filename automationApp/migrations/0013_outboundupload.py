@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0012_webhook_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('phone_number', models.CharField(blank=True, max_length=15, null=True)),
+                ('filename', models.CharField(blank=True, max_length=255, null=True)),
+                ('media_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('original_name', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('spool_path', models.CharField(max_length=500)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('delivered', 'Delivered'), ('dead', 'Dead letter')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('response_status', models.IntegerField(blank=True, null=True)),
+                ('response_body', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbound_status_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0014_leadnotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowRequestSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('db_time_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField()),
+                ('instances', models.PositiveIntegerField()),
+                ('response_bytes', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('slowest_queries', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='slowrequest_created_idx')],
+            },
+        ),
+    ]
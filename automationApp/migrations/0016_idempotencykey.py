@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0015_slowrequestsample'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('scope', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('processing', 'Processing'), ('done', 'Done')], default='processing', max_length=20)),
+                ('response_status', models.PositiveIntegerField(blank=True, null=True)),
+                ('response_body', models.TextField(blank=True)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='idempotency_expires_idx')],
+            },
+        ),
+    ]
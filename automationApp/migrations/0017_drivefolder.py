@@ -0,0 +1,85 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A copy of folder_tree.backfill_folder_tree() as of this migration, so later
+# changes to the live code cannot change what the migration does.
+LEVELS = ('company', 'year', 'month', 'day')
+
+
+def _path(company_key, company_id, year, month, day):
+    return [str(company_key or company_id), str(year), str(month), day.isoformat()]
+
+
+def backfill(apps, schema_editor):
+    EmailFolder = apps.get_model('automationApp', 'EmailFolder')
+    DriveFolder = apps.get_model('automationApp', 'DriveFolder')
+    nodes = {}
+    rows = (
+        EmailFolder.objects
+        .order_by('pk')
+        .values_list(
+            'company_name_mc_number', 'company_name_folder_id', 'year_folder_id', 'month_folder_id',
+            'date_folder_id', 'folder_year', 'folder_month', 'folder_date',
+        )
+        .iterator(chunk_size=1000)
+    )
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= 1000:
+            _backfill_batch(batch, nodes, DriveFolder)
+            batch = []
+    if batch:
+        _backfill_batch(batch, nodes, DriveFolder)
+
+
+def _backfill_batch(rows, nodes, DriveFolder):
+    paths = [
+        (_path(company_key, company_id, year, month, day), [company_id, year_id, month_id, date_id])
+        for company_key, company_id, year_id, month_id, date_id, year, month, day in rows
+    ]
+    for depth, level in enumerate(LEVELS):
+        pending = {}
+        for keys, folder_ids in paths:
+            parent_id = nodes[(None, keys[0])] if depth else None
+            for ancestor in keys[1:depth]:
+                parent_id = nodes[(parent_id, ancestor)]
+            node_key = (parent_id, keys[depth])
+            if node_key not in nodes and node_key not in pending:
+                pending[node_key] = DriveFolder(
+                    parent_id=parent_id, kind=level, key=keys[depth], folder_id=folder_ids[depth],
+                )
+        if not pending:
+            continue
+        inserted = DriveFolder.objects.bulk_create(pending.values())
+        if any(node.pk is None for node in inserted):
+            inserted = DriveFolder.objects.filter(kind=level, key__in={k for _, k in pending})
+        for node in inserted:
+            nodes[(node.parent_id, node.key)] = node.pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0016_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriveFolder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('company', 'Company'), ('year', 'Year'), ('month', 'Month'), ('day', 'Day')], max_length=10)),
+                ('key', models.CharField(max_length=255)),
+                ('folder_id', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='automationApp.drivefolder')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('parent', 'key'), name='unique_drivefolder_parent_key'), models.UniqueConstraint(condition=models.Q(('parent__isnull', True)), fields=('key',), name='unique_drivefolder_root_key')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
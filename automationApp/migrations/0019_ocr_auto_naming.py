@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0018_documentsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcrResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('engine', models.CharField(max_length=50)),
+                ('text', models.TextField(blank=True)),
+                ('pages', models.PositiveIntegerField(default=0)),
+                ('document_type', models.CharField(max_length=50)),
+                ('document_date', models.DateField(blank=True, null=True)),
+                ('seconds', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='outboundupload',
+            name='content_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='outboundupload',
+            name='generated_filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
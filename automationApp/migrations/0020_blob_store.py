@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0019_ocr_auto_naming'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_referenced_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='dashboard',
+            name='content_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dashboard',
+            index=models.Index(fields=['user', 'content_sha256'], name='dashboard_user_content_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storedblob',
+            index=models.Index(fields=['ref_count', 'last_referenced_at'], name='storedblob_gc_idx'),
+        ),
+    ]
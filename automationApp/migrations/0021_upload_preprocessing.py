@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automationApp', '0020_blob_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundupload',
+            name='original_size',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='outboundupload',
+            name='source_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -28,6 +28,12 @@ class UserData(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # webhook user lookup by phone (user_data__phone_number)
+            models.Index(fields=['phone_number'], name='userdata_phone_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.email} - {self.company_name or 'No Company'}"
 
@@ -45,14 +51,69 @@ class Dashboard(models.Model):
     created_date = models.DateTimeField(default=timezone.now)
     google_drive_link = models.URLField(max_length=500, blank=True, null=True)
     type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    # SHA-256 of the attachment, echoed back by the Make scenario; finds re-sent copies
+    content_sha256 = models.CharField(max_length=64, blank=True, null=True)
     
     class Meta:
         ordering = ['-created_date']
+        indexes = [
+            models.Index(fields=['user', 'content_sha256'], name='dashboard_user_content_idx'),
+            # per-user dashboard listing, newest first
+            models.Index(fields=['user', '-created_date'], name='dashboard_user_created_idx'),
+            # admin/staff listing and the type filter
+            models.Index(fields=['-created_date'], name='dashboard_created_idx'),
+            models.Index(fields=['type', '-created_date'], name='dashboard_type_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.type} - {self.email} - {self.created_date.strftime('%Y-%m-%d')}"
 
 
+class UploadCounter(models.Model):
+    """
+    Rollup of Dashboard uploads per (user, company, type, day), so dashboard
+    metrics read a handful of buckets instead of scanning every record.
+    Kept current by counters.record_uploads() and, when a record is deleted,
+    counters.forget_upload(); rebuild it from scratch with
+    `manage.py rebuild_upload_counters`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_counters')
+    company_name = models.CharField(max_length=255, blank=True, default='')
+    type = models.CharField(max_length=20, choices=Dashboard.TYPE_CHOICES)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'company_name', 'type', 'day'],
+                name='unique_upload_counter_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.company_name or 'No Company'} - {self.type}: {self.count}"
+
+
+class DocumentSequence(models.Model):
+    """
+    Per-user, per-day document numbers: the `001` in `001_documentname_date`.
+    `last_value` is the last number handed out; sequences.reserve_document_numbers()
+    advances it with a single atomic UPDATE, however many documents arrived that day.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='document_sequences')
+    day = models.DateField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_document_sequence_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.day}: {self.last_value}"
+
+
 class EmailFolder(models.Model):
     email = models.EmailField()
     phone_number = models.CharField(max_length=15)
@@ -66,13 +127,55 @@ class EmailFolder(models.Model):
     folder_date = models.DateField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
-    
-    
+
+    class Meta:
+        indexes = [
+            # search_email_records: caller's folders by email or phone, then by day/month
+            models.Index(fields=['email', 'folder_date'], name='emailfolder_email_date_idx'),
+            models.Index(fields=['phone_number', 'folder_date'], name='emailfolder_phone_date_idx'),
+            models.Index(fields=['folder_year'], name='emailfolder_year_idx'),
+            models.Index(fields=['company_name_mc_number'], name='emailfolder_company_idx'),
+            # admin changelist ordering
+            models.Index(fields=['-folder_date'], name='emailfolder_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.email} - {self.folder_date}"
 
 
+class DriveFolder(models.Model):
+    """
+    One Google Drive folder in the company -> year -> month -> day tree the
+    Make scenario files documents into. `key` names the node within its
+    parent: the company_name_mc_number, the year, the month or the ISO date.
+    Maintained from EmailFolder rows by folder_tree.record_email_folder()
+    and forget_email_folder(); rebuild it with `manage.py rebuild_folder_tree`.
+    """
+    KIND_CHOICES = [
+        ('company', 'Company'),
+        ('year', 'Year'),
+        ('month', 'Month'),
+        ('day', 'Day'),
+    ]
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name='children', null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=255)
+    folder_id = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['parent', 'key'], name='unique_drivefolder_parent_key'),
+            # NULL parents never collide in the constraint above
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(parent__isnull=True), name='unique_drivefolder_root_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.key} ({self.folder_id})"
+
+
 class LogEntry(models.Model):
     LEVEL_CHOICES = [
         ('info', 'Info'),
@@ -90,11 +193,67 @@ class LogEntry(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='logentry_created_idx'),
+            models.Index(fields=['level', '-created_at'], name='logentry_level_created_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.level.upper()}] {self.event} ({self.created_at.strftime('%Y-%m-%d %H:%M:%S')})"
 
 
+class OutboundUpload(models.Model):
+    """
+    An attachment accepted by send_to_make_webhook, spooled to disk and
+    waiting to be forwarded to the Make.com hook by `manage.py run_make_forwarder`.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('delivered', 'Delivered'),
+        ('dead', 'Dead letter'),
+    ]
+
+    email = models.EmailField(blank=True, null=True)
+    phone_number = models.CharField(max_length=15, blank=True, null=True)
+    filename = models.CharField(max_length=255, blank=True, null=True)
+    media_type = models.CharField(max_length=50, blank=True, null=True)
+    original_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    spool_path = models.CharField(max_length=500)
+    size = models.PositiveBigIntegerField(default=0)
+    content_sha256 = models.CharField(max_length=64, blank=True)
+    # what the sender posted, when pre-processing replaced it with a smaller file
+    original_size = models.PositiveBigIntegerField(default=0)
+    source_sha256 = models.CharField(max_length=64, blank=True)
+    # `001_documentname_date` name chosen by auto_naming before forwarding
+    generated_filename = models.CharField(max_length=255, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    response_status = models.IntegerField(blank=True, null=True)
+    response_body = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.original_name} ({self.status}, {self.attempts} attempts)"
+
+    @property
+    def bytes_saved(self):
+        """Bytes pre-processing took off what the sender posted (0 if it was spooled as it came)."""
+        return self.original_size - self.size if self.original_size else 0
+
+
 class Lead(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -134,4 +293,133 @@ class Lead(models.Model):
         verbose_name_plural = "Leads"
 
     def __str__(self):
-        return f"{self.full_name} - {self.company_name or 'No Company'} - {self.status}"
\ No newline at end of file
+        return f"{self.full_name} - {self.company_name or 'No Company'} - {self.status}"
+
+
+class StoredBlob(models.Model):
+    """
+    An attachment in the content-addressed blob store (blob_store.py), one
+    file per distinct SHA-256. `ref_count` counts the OutboundUpload rows
+    that still need the file; `manage.py gc_blobs` deletes unreferenced blobs.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_referenced_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'last_referenced_at'], name='storedblob_gc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
+
+class OcrResult(models.Model):
+    """
+    OCR output per attachment content (sha256), so a file that is sent
+    again is named without being read a second time.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    engine = models.CharField(max_length=50)
+    text = models.TextField(blank=True)
+    pages = models.PositiveIntegerField(default=0)
+    document_type = models.CharField(max_length=50)
+    document_date = models.DateField(blank=True, null=True)
+    seconds = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} {self.document_type} ({self.pages} pages)"
+
+
+class LeadNotification(models.Model):
+    """
+    Outbox row for a new-lead email. create_lead_record only queues it;
+    `manage.py send_lead_notifications` delivers the queue over one SMTP
+    connection, folding bursts into a digest.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='notifications')
+    recipient = models.EmailField()
+    admin_url = models.URLField(max_length=500, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='leadnotif_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.lead.full_name} -> {self.recipient} ({self.status})"
+
+
+class SlowRequestSample(models.Model):
+    """
+    A request that took longer than REQUEST_METRICS_SLOW_MS, recorded by
+    RequestMetricsMiddleware together with its slowest SQL statements.
+    """
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveIntegerField()
+    duration_ms = models.FloatField()
+    db_time_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    instances = models.PositiveIntegerField()
+    response_bytes = models.PositiveBigIntegerField(blank=True, null=True)
+    slowest_queries = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='slowrequest_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.path} {self.duration_ms:.0f} ms"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Dedup record for webhook calls: the first request with a given key stores
+    its response here, retries within the TTL get that response back.
+    """
+    STATUS_CHOICES = [
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+    ]
+
+    key = models.CharField(max_length=64, unique=True)  # sha256 of scope + client key or body hash
+    scope = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing')
+    response_status = models.PositiveIntegerField(blank=True, null=True)
+    response_body = models.TextField(blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key[:12]} ({self.status})"
@@ -0,0 +1,74 @@
+import os
+import uuid
+
+
+def _quote(value):
+    # same escaping browsers apply to multipart names/filenames (HTML5)
+    return str(value).replace('\r', '%0D').replace('\n', '%0A').replace('"', '%22')
+
+
+class MultipartFileStream:
+    """
+    A multipart/form-data request body whose file part is read from disk on
+    demand. requests treats any object with read() as a streamed body and
+    takes Content-Length from len(), so the encoded body is never built in
+    memory: peak usage is one read block regardless of the file size.
+    """
+
+    def __init__(self, fields, file_field, file_path, filename, content_type, boundary=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+
+        head = []
+        for name, value in fields.items():
+            if value is None:
+                continue
+            head.append(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+                f'{value}\r\n'
+            )
+        head.append(
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{_quote(file_field)}"; filename="{_quote(filename)}"\r\n'
+            f'Content-Type: {content_type or "application/octet-stream"}\r\n\r\n'
+        )
+        head = ''.join(head).encode('utf-8')
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+        self._length = len(head) + os.path.getsize(file_path) + len(tail)
+        self._file = open(file_path, 'rb')
+        self._segments = [head, self._file, tail]
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length
+        out = bytearray()
+        while self._segments and len(out) < size:
+            segment = self._segments[0]
+            if isinstance(segment, bytes):
+                taken = segment[:size - len(out)]
+                out += taken
+                if len(taken) == len(segment):
+                    self._segments.pop(0)
+                else:
+                    self._segments[0] = segment[len(taken):]
+            else:
+                chunk = segment.read(size - len(out))
+                if chunk:
+                    out += chunk
+                else:
+                    self._segments.pop(0)
+        return bytes(out)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,143 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import LeadNotification
+
+logger = logging.getLogger(__name__)
+
+
+def queue_lead_notification(lead, admin_url=''):
+    """Queue the new-lead email; returns None when no recipient is configured."""
+    recipient = settings.LEAD_NOTIFICATION_RECIPIENT_EMAIL
+    if not recipient:
+        logger.warning("LEAD_NOTIFICATION_RECIPIENT_EMAIL not set in .env")
+        return None
+    return LeadNotification.objects.create(lead=lead, recipient=recipient, admin_url=admin_url)
+
+
+def lead_message(lead, admin_url):
+    subject = f"New Lead Received: {lead.full_name}"
+    message = (
+        f"A new lead has been submitted.\n\n"
+        f"Name: {lead.full_name}\n"
+        f"Company: {lead.company_name or 'N/A'}\n"
+        f"Phone: {lead.phone}\n"
+        f"Help Needed: {lead.help_needed}\n\n"
+        f"Click the link below to view all leads in the Admin Panel:\n"
+        f"{admin_url}"
+    )
+    return subject, message
+
+
+def digest_message(leads, admin_url):
+    subject = f"{len(leads)} New Leads Received"
+    lines = [f"{len(leads)} new leads have been submitted.\n"]
+    for lead in leads:
+        lines.append(
+            f"- {lead.full_name} | Company: {lead.company_name or 'N/A'} | "
+            f"Phone: {lead.phone} | Help Needed: {lead.help_needed}"
+        )
+    lines.append(f"\nClick the link below to view all leads in the Admin Panel:\n{admin_url}")
+    return subject, "\n".join(lines)
+
+
+def claim_due_notifications(limit):
+    now = timezone.now()
+    candidates = list(
+        LeadNotification.objects
+        .filter(status='pending', next_attempt_at__lte=now)
+        .order_by('created_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in candidates
+        if LeadNotification.objects.filter(pk=pk, status='pending').update(status='sending', updated_at=now)
+    ]
+    return list(
+        LeadNotification.objects.filter(pk__in=claimed).select_related('lead').order_by('created_at')
+    )
+
+
+def release_stale_notifications(max_age=300):
+    """Return notifications stuck in `sending` (e.g. the worker was killed) to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    return LeadNotification.objects.filter(status='sending', updated_at__lt=cutoff).update(
+        status='pending', updated_at=timezone.now()
+    )
+
+
+def _mark_sent(notifications):
+    LeadNotification.objects.filter(pk__in=[n.pk for n in notifications]).update(
+        status='sent', sent_at=timezone.now(), last_error='', updated_at=timezone.now()
+    )
+
+
+def _mark_failed(notifications, error):
+    for notification in notifications:
+        notification.attempts += 1
+        notification.last_error = error
+        if notification.attempts >= settings.LEAD_NOTIFICATION_MAX_ATTEMPTS:
+            notification.status = 'failed'
+        else:
+            notification.status = 'pending'
+            delay = settings.LEAD_NOTIFICATION_RETRY_DELAY * (2 ** (notification.attempts - 1))
+            notification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        notification.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at', 'updated_at'])
+    logger.error(f"Error sending lead notification email: {error}")
+
+
+def deliver_lead_notifications(batch_size=100, digest_threshold=None):
+    """
+    Send due notifications over a single SMTP connection. When at least
+    `digest_threshold` leads are waiting for the same recipient they go out
+    as one digest. Returns (sent, failed) notification counts.
+    """
+    if digest_threshold is None:
+        digest_threshold = settings.LEAD_NOTIFICATION_DIGEST_THRESHOLD
+
+    notifications = claim_due_notifications(batch_size)
+    if not notifications:
+        return 0, 0
+
+    by_recipient = defaultdict(list)
+    for notification in notifications:
+        by_recipient[notification.recipient].append(notification)
+
+    batches = []
+    for recipient, pending in by_recipient.items():
+        if digest_threshold and len(pending) >= digest_threshold:
+            subject, body = digest_message([n.lead for n in pending], pending[-1].admin_url)
+            batches.append((EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient]), pending))
+        else:
+            for notification in pending:
+                subject, body = lead_message(notification.lead, notification.admin_url)
+                batches.append((EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient]), [notification]))
+
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        _mark_failed(notifications, f"{e.__class__.__name__}: {e}")
+        return 0, len(notifications)
+
+    try:
+        for message, covered in batches:
+            message.connection = connection
+            try:
+                message.send()
+            except Exception as e:
+                _mark_failed(covered, f"{e.__class__.__name__}: {e}")
+                failed += len(covered)
+            else:
+                _mark_sent(covered)
+                sent += len(covered)
+    finally:
+        connection.close()
+
+    return sent, failed
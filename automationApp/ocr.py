@@ -0,0 +1,180 @@
+"""
+OCR engines and keyword extraction for auto-naming forwarded uploads.
+
+Kept free of Django model imports so ProcessPoolExecutor workers can import
+it under any start method; auto_naming.py does the database side (result
+cache, document numbers, file names) in the forwarder process.
+"""
+import importlib.util
+import re
+import time
+from datetime import date
+
+from django.utils.module_loading import import_string
+
+# (document type, keywords) in priority order; a type scores one point per keyword hit
+DOCUMENT_TYPES = [
+    ('rate_confirmation', ['rate confirmation', 'rate con', 'load confirmation', 'carrier confirmation']),
+    ('bill_of_lading', ['bill of lading', 'b/l', 'bol', 'shipper', 'consignee']),
+    ('proof_of_delivery', ['proof of delivery', 'pod', 'delivery receipt', 'received in good condition']),
+    ('lumper_receipt', ['lumper', 'unloading fee']),
+    ('fuel_receipt', ['fuel', 'diesel', 'gallons', 'pump']),
+    ('invoice', ['invoice', 'amount due', 'bill to', 'remit to']),
+    ('receipt', ['receipt', 'subtotal', 'total paid']),
+]
+DEFAULT_DOCUMENT_TYPE = 'document'
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'), ('may',),
+        ('jun', 'june'), ('jul', 'july'), ('aug', 'august'), ('sep', 'sept', 'september'),
+        ('oct', 'october'), ('nov', 'november'), ('dec', 'december'),
+    ], start=1)
+    for name in names
+}
+_MONTH = '|'.join(sorted(MONTHS, key=len, reverse=True))
+DATE_PATTERNS = [
+    # 2025-11-06, 2025/11/06
+    (re.compile(r'\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b'), ('year', 'month', 'day')),
+    # 11/06/2025, 11-06-2025 (US order, as on rate confirmations and BOLs)
+    (re.compile(r'\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})\b'), ('month', 'day', 'year')),
+    # Nov 6, 2025 / November 6 2025
+    (re.compile(rf'\b({_MONTH})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})\b', re.I), ('month', 'day', 'year')),
+    # 6 Nov 2025 / 6th November, 2025
+    (re.compile(rf'\b(\d{{1,2}})(?:st|nd|rd|th)?\s+({_MONTH})\.?,?\s+(\d{{4}})\b', re.I), ('day', 'month', 'year')),
+]
+
+
+def _keyword_pattern(keyword):
+    return re.compile(r'(?<![a-z0-9])' + re.escape(keyword) + r'(?![a-z0-9])')
+
+
+_TYPE_PATTERNS = [(doc_type, [_keyword_pattern(k) for k in keywords]) for doc_type, keywords in DOCUMENT_TYPES]
+
+
+def document_type(text):
+    """The DOCUMENT_TYPES entry with the most keyword hits, earliest on ties."""
+    text = text.lower()
+    best, best_score = DEFAULT_DOCUMENT_TYPE, 0
+    for doc_type, patterns in _TYPE_PATTERNS:
+        score = sum(1 for pattern in patterns if pattern.search(text))
+        if score > best_score:
+            best, best_score = doc_type, score
+    return best
+
+
+def document_date(text):
+    """The first plausible date in `text`, or None."""
+    found = []
+    for pattern, order in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            parts = dict(zip(order, match.groups()))
+            month = parts['month']
+            month = MONTHS.get(month.lower().rstrip('.')) if not month.isdigit() else int(month)
+            try:
+                found.append((match.start(), date(int(parts['year']), month, int(parts['day']))))
+            except (TypeError, ValueError):
+                continue
+    found = [(position, value) for position, value in found if 2000 <= value.year <= 2100]
+    return min(found)[1] if found else None
+
+
+def extract_keywords(text):
+    found = document_date(text)
+    return {
+        'document_type': document_type(text),
+        'document_date': found.isoformat() if found else None,
+    }
+
+
+class TesseractEngine:
+    """
+    Tesseract through pytesseract and Pillow (both optional dependencies,
+    imported on first use). PDFs are rasterised with pdf2image, which needs
+    poppler; without it only image attachments are read. A page that takes
+    longer than `timeout` seconds has its tesseract process killed.
+    """
+    name = 'tesseract'
+
+    def __init__(self, languages='eng', max_pages=20, dpi=300, timeout=60):
+        self.languages = languages
+        self.max_pages = max_pages
+        self.dpi = dpi
+        self.timeout = timeout
+
+    def supports(self, content_type):
+        if content_type == 'application/pdf':
+            return importlib.util.find_spec('pdf2image') is not None
+        return content_type.startswith('image/')
+
+    def pages(self, path, content_type):
+        if content_type == 'application/pdf':
+            from pdf2image import convert_from_path
+
+            yield from convert_from_path(path, dpi=self.dpi, last_page=self.max_pages)
+            return
+
+        from PIL import Image, ImageSequence
+
+        with Image.open(path) as image:
+            # multi-page TIFFs and similar hold one frame per page
+            for number, frame in enumerate(ImageSequence.Iterator(image)):
+                if number >= self.max_pages:
+                    break
+                yield frame.convert('RGB')
+
+    def extract(self, path, content_type):
+        import pytesseract
+
+        return [
+            pytesseract.image_to_string(page, lang=self.languages, timeout=self.timeout)
+            for page in self.pages(path, content_type)
+        ]
+
+
+class PlainTextEngine:
+    """Reads text attachments (e-mail bodies, SMS exports) as they are."""
+    name = 'plain_text'
+
+    def __init__(self, max_bytes=1_000_000):
+        self.max_bytes = max_bytes
+
+    def supports(self, content_type):
+        return content_type.startswith('text/')
+
+    def extract(self, path, content_type):
+        with open(path, 'rb') as fh:
+            return [fh.read(self.max_bytes).decode('utf-8', errors='replace')]
+
+
+_engines = {}
+
+
+def get_engine(engine_path, options):
+    """One engine instance per (path, options) per process."""
+    key = (engine_path, tuple(sorted(options.items())))
+    if key not in _engines:
+        _engines[key] = import_string(engine_path)(**options)
+    return _engines[key]
+
+
+def ocr_file(engine_path, options, path, content_type):
+    """
+    Run one attachment through the engine and extract its keywords.
+    Module-level so it can be sent to a ProcessPoolExecutor worker.
+    Returns None when the engine does not read this content type.
+    """
+    engine = get_engine(engine_path, options)
+    if not engine.supports(content_type):
+        return None
+    started = time.perf_counter()
+    pages = engine.extract(path, content_type)
+    text = '\n\f'.join(pages)
+    return {
+        'engine': engine.name,
+        'text': text,
+        'pages': len(pages),
+        'seconds': time.perf_counter() - started,
+        **extract_keywords(text),
+    }
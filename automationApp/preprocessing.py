@@ -0,0 +1,145 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import mimetypes
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+from .images import IMAGE_TYPES, normalize_images
+from .models import LogEntry
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_preprocess_pool():
+    """Process-wide pool of PREPROCESS_WORKERS processes, so image work never runs on the event loop."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: forking this multithreaded process can copy a lock another thread holds
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PREPROCESS_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def shutdown_preprocess_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+class ProcessedFile(UploadedFile):
+    """
+    The re-encoded attachment, written to the blob store's tmp directory.
+    Exposes temporary_file_path() like Django's TemporaryUploadedFile, so
+    store_upload() moves it into place instead of copying it.
+    """
+
+    def __init__(self, path, name, content_type, original_size, pages):
+        super().__init__(open(path, 'rb'), name=name, content_type=content_type, size=os.path.getsize(path))
+        self.path = path
+        self.original_size = original_size
+        self.pages = pages
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        super().close()
+        # still here if it was never spooled
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def file_content_type(file_obj):
+    # Make often sends attachments as application/octet-stream; go by the file name then
+    if file_obj.content_type and file_obj.content_type != 'application/octet-stream':
+        return file_obj.content_type
+    guessed, _ = mimetypes.guess_type(file_obj.name or '')
+    return guessed or 'application/octet-stream'
+
+
+def _processed_name(files, content_type):
+    if len(files) == 1 and file_content_type(files[0]) == content_type:
+        return files[0].name
+    stem = os.path.splitext(files[0].name or 'attachment')[0]
+    return stem + ('.pdf' if content_type == 'application/pdf' else '.jpg')
+
+
+async def preprocess_files(files):
+    """
+    Downscale, recompress and strip the metadata of the photos posted in one
+    request, on the worker pool; several photos become one PDF. Returns a
+    ProcessedFile to spool in their place, or None to spool the upload as it
+    came: not all images, Pillow missing, or processing failed.
+    """
+    if not files or any(file_content_type(f) not in IMAGE_TYPES for f in files):
+        return None
+    if importlib.util.find_spec('PIL') is None:
+        logger.warning("PREPROCESS_ENABLED is set but Pillow is not installed; sending attachments as they are")
+        return None
+
+    sources = []
+    for f in files:
+        if hasattr(f, 'temporary_file_path'):
+            sources.append(f.temporary_file_path())
+        else:
+            f.seek(0)
+            sources.append(f.read())
+    tmp_dir = os.path.join(settings.BLOB_STORE_DIR, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    dest_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    args = (sources, dest_path, settings.PREPROCESS_MAX_DIMENSION, settings.PREPROCESS_JPEG_QUALITY)
+
+    try:
+        if settings.PREPROCESS_WORKERS <= 0:
+            result = await sync_to_async(normalize_images, thread_sensitive=False)(*args)
+        else:
+            future = get_preprocess_pool().submit(normalize_images, *args)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), settings.PREPROCESS_TIMEOUT)
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            # a worker died (e.g. out of memory); start a fresh pool next time
+            shutdown_preprocess_pool()
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        await LogEntry.objects.acreate(
+            level='warning',
+            event='preprocess_failed',
+            message=f"Pre-processing {', '.join(f.name for f in files)} failed: {e.__class__.__name__}: {e}",
+        )
+        return None
+
+    return ProcessedFile(
+        dest_path, _processed_name(files, result['content_type']), result['content_type'],
+        sum(f.size for f in files), result['pages'],
+    )
+
+
+def log_savings(upload, processed):
+    """One structured log line per processed upload, for shipping to the metrics pipeline."""
+    record = {
+        'upload_id': upload.id,
+        'pages': processed.pages,
+        'original_bytes': processed.original_size,
+        'bytes': upload.size,
+        'bytes_saved': upload.bytes_saved,
+    }
+    logger.info(json.dumps(record), extra={'attachment_preprocessing': record})
@@ -0,0 +1,82 @@
+"""
+Fake-data generation for `manage.py seed_data --bulk`.
+
+Kept free of Django model imports so ProcessPoolExecutor workers can import
+it under any start method; the command turns the plain tuples returned here
+into model instances and bulk-inserts them.
+"""
+import random
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from faker import Faker
+
+EVENTS = ['import_email', 'upload_file', 'parse_error', 'login']
+RELATED_MODELS = ['Dashboard', 'EmailFolder', 'UserData', 'None']
+
+
+def parse_range(value):
+    """'1-5' -> (1, 5); '3' -> (3, 3)"""
+    low, _, high = str(value).partition('-')
+    low = int(low)
+    high = int(high) if high else low
+    if low < 0 or high < low:
+        raise ValueError(f"Invalid range {value!r}")
+    return low, high
+
+
+def generate_chunk(spec):
+    """
+    Generate users [start, start + size) and their related rows. Returns a
+    dict of lists of tuples; related rows refer to users by their index
+    within the chunk.
+    """
+    rng = random.Random(spec['seed'])
+    fake = Faker()
+    fake.seed_instance(spec['seed'])
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    two_years = 730
+
+    chunk = {'users': [], 'user_data': [], 'dashboards': [], 'folders': [], 'logs': []}
+    for offset in range(spec['size']):
+        i = spec['start'] + offset
+        username = f"user{i}_{spec['run']}"
+        email = f"{username}@example.com"
+        phone = f"9{spec['run_number']:05d}{i:08d}"
+        company = fake.company()
+        mc_number = f"MC{rng.randint(10000, 99999)}"
+
+        chunk['users'].append((username, email, phone, fake.first_name(), fake.last_name()))
+        chunk['user_data'].append((offset, company, rng.randint(0, 200), mc_number, phone))
+
+        for _ in range(rng.randint(*spec['dashboards'])):
+            chunk['dashboards'].append((
+                offset, email, phone,
+                now - timedelta(seconds=rng.randint(0, two_years * 86400)),
+                f"https://drive.google.com/file/d/{uuid.UUID(int=rng.getrandbits(128)).hex}",
+                rng.choice(spec['types']),
+            ))
+
+        for _ in range(rng.randint(*spec['folders'])):
+            folder_date = today - timedelta(days=rng.randint(0, two_years))
+            token = f"{rng.getrandbits(48):012x}"
+            chunk['folders'].append((
+                email, phone,
+                f"c_{token}", f"{company}_{mc_number}",
+                f"y_{folder_date.year}_{token[:6]}",
+                f"m_{folder_date.month}_{token[:6]}",
+                f"d_{folder_date.day}_{token[:6]}",
+                folder_date.year, folder_date.month, folder_date,
+            ))
+
+        for _ in range(rng.randint(*spec['logs'])):
+            chunk['logs'].append((
+                offset,
+                rng.choice(EVENTS),
+                fake.sentence(nb_words=12),
+                rng.choice(spec['levels']),
+                rng.choice(RELATED_MODELS),
+                str(rng.randint(1, 1000)),
+            ))
+    return chunk
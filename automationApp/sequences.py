@@ -0,0 +1,65 @@
+import sqlite3
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .models import DocumentSequence
+
+
+def document_filename(number, name, day):
+    """The `001_documentname_date` file name from the ToDo."""
+    return f"{number:03d}_{name}_{day.isoformat()}"
+
+
+def _supports_update_returning():
+    # by vendor, not can_return_columns_from_insert: MariaDB has that flag but no
+    # UPDATE ... RETURNING, and Oracle only knows RETURNING ... INTO
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and sqlite3.sqlite_version_info >= (3, 35)
+
+
+def _advance(user_id, day, count):
+    """Add `count` to an existing sequence; returns the new last_value, or None if there is no row."""
+    if _supports_update_returning():
+        # increment and read back in one statement
+        qn = connection.ops.quote_name
+        opts = DocumentSequence._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {qn(opts.db_table)} SET {qn('last_value')} = {qn('last_value')} + %s "
+                f"WHERE {qn(opts.get_field('user').column)} = %s AND {qn('day')} = %s "
+                f"RETURNING {qn('last_value')}",
+                [count, user_id, opts.get_field('day').get_db_prep_value(day, connection)],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    with transaction.atomic():
+        sequence = DocumentSequence.objects.filter(user_id=user_id, day=day)
+        if not sequence.update(last_value=F('last_value') + count):
+            return None
+        # the UPDATE holds the row lock until the transaction ends
+        return sequence.values_list('last_value', flat=True).get()
+
+
+def reserve_document_numbers(user_id, day, count=1, start_after=None):
+    """
+    Hand out `count` consecutive document numbers for (user, day) and
+    return (first, last). Concurrent callers never get the same number.
+
+    The day's sequence is created on first use, starting after
+    `start_after()` (e.g. the number of documents filed before sequences
+    existed), or after 0.
+    """
+    last = _advance(user_id, day, count)
+    if last is None:
+        initial = start_after() if start_after else 0
+        try:
+            with transaction.atomic():
+                DocumentSequence.objects.create(user_id=user_id, day=day, last_value=initial + count)
+            last = initial + count
+        except IntegrityError:
+            # Another request created the sequence between our UPDATE and INSERT.
+            last = _advance(user_id, day, count)
+    return last - count + 1, last
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import forget_upload
+from .folder_cache import folder_changed, folder_created
+from .folder_tree import forget_email_folder, record_email_folder
+from .blob_store import is_blob, release_blob
+from .middleware import count_instance, install_query_hook
+from .models import Dashboard, EmailFolder, OutboundUpload, User, UserData
+from .user_resolver import user_resolver
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=UserData)
+def invalidate_user_resolver(sender, update_fields=None, **kwargs):
+    # login() only touches last_login, which the resolver does not cache
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    user_resolver.clear()
+
+
+@receiver(post_save, sender=EmailFolder)
+def write_through_folder_cache(sender, instance, created, **kwargs):
+    if created:
+        folder_created(instance, timezone.now().date())
+    else:
+        folder_changed(instance, timezone.now().date())
+
+
+@receiver(post_save, sender=EmailFolder)
+def add_to_folder_tree(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_email_folder(instance)
+
+
+@receiver(post_delete, sender=EmailFolder)
+def invalidate_folder_cache(sender, instance, **kwargs):
+    folder_changed(instance, timezone.now().date())
+
+
+@receiver(post_delete, sender=EmailFolder)
+def remove_from_folder_tree(sender, instance, **kwargs):
+    forget_email_folder(instance)
+
+
+@receiver(post_delete, sender=Dashboard)
+def uncount_upload(sender, instance, **kwargs):
+    forget_upload(instance)
+
+
+@receiver(post_delete, sender=OutboundUpload)
+def release_upload_blob(sender, instance, **kwargs):
+    # delivered uploads released their blob already
+    if instance.status != 'delivered' and is_blob(instance.content_sha256, instance.spool_path):
+        release_blob(instance.content_sha256)
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    install_query_hook(connection)
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+if settings.REQUEST_METRICS_COUNT_INSTANCES:
+    post_init.connect(count_instance, dispatch_uid='request_metrics_count_instance')
@@ -1,3 +1,1723 @@
-from django.test import TestCase
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import tempfile
+import re
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.move import file_move_safe
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.models import Sum
+from django.conf import settings
+from django.contrib.admin import AdminSite
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .counters import record_uploads
+from .make_forwarder import forward_due_uploads, release_upload_file
+from .audit_log import LogEntryBuffer, audit_log
+from .log_retention import archive_expired_logs, search_log_archive
+from .folder_tree import LEVELS, ensure_folder_path, node_lookups, path_keys
+from .sequences import document_filename, reserve_document_numbers
+from .auto_naming import run_ocr, shutdown_ocr_pool
+from .blob_store import release_blob
+from .preprocessing import shutdown_preprocess_pool
+from .ocr import extract_keywords, ocr_file
+from .notifications import deliver_lead_notifications
+from .admin import OutboundUploadAdmin
+from .idempotency import idempotent
+from .user_resolver import UserResolver, user_resolver
+from .multipart import MultipartFileStream
+from .models import (
+    User, UserData, Dashboard, EmailFolder, LogEntry, OutboundUpload, UploadCounter, LeadNotification,
+    SlowRequestSample, IdempotencyKey, DriveFolder, DocumentSequence, OcrResult, StoredBlob,
+)
+
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def make_user(email, phone_number, company_name=None, mc_number=None, **extra):
+    user = User.objects.create_user(
+        username=email.split('@')[0],
+        email=email,
+        password='password123',
+        phone_number=phone_number,
+        **extra
+    )
+    UserData.objects.create(
+        user=user,
+        company_name=company_name,
+        mc_number=mc_number,
+        phone_number=phone_number,
+    )
+    return user
+
+
+def make_record(user, record_type='whatsapp', created_date=None, **extra):
+    record = Dashboard.objects.create(
+        user=user,
+        email=extra.pop('email', user.email),
+        phone_number=extra.pop('phone_number', user.phone_number),
+        type=record_type,
+        created_date=created_date or datetime(2025, 3, 10, 12, tzinfo=dt_timezone.utc),
+        **extra
+    )
+    record_uploads([record])
+    return record
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class DashboardViewTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', '1000', is_staff=True, is_superuser=True)
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme Freight', mc_number='MC-1')
+        self.zeta = make_user('zeta@example.com', '3000', company_name='Zeta Haulers', mc_number='MC-2')
+        for day in range(1, 13):
+            make_record(self.acme, 'whatsapp', datetime(2025, 1, day, tzinfo=dt_timezone.utc))
+        make_record(self.acme, 'gmail', datetime(2024, 6, 1, tzinfo=dt_timezone.utc))
+        make_record(self.zeta, 'sms', datetime(2025, 2, 1, tzinfo=dt_timezone.utc))
+
+    def get_dashboard(self, user, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse('dashboard'), params)
+
+    def test_only_current_page_is_materialized(self):
+        response = self.get_dashboard(self.admin, per_page=10)
+        page = response.context['page_obj']
+        self.assertEqual(len(page.object_list), 10)
+        self.assertEqual(page.paginator.count, 14)
+        self.assertNotIn('all_records', response.context)
+        self.assertEqual(response.context['total_records'], 14)
+        self.assertEqual(response.context['whatsapp_count'], 12)
+
+    def test_filters_are_applied_in_sql(self):
+        response = self.get_dashboard(self.admin, year='2025', month='02')
+        records = list(response.context['page_obj'])
+        self.assertEqual([r.type for r in records], ['sms'])
+        self.assertEqual(records[0].company_name, 'Zeta Haulers')
+
+        response = self.get_dashboard(self.admin, type='gmail')
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+
+        response = self.get_dashboard(self.admin, q='acme')
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+
+    def test_invalid_filters_are_ignored(self):
+        response = self.get_dashboard(self.admin, year='abc', month='13', type='fax', per_page='x')
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+        self.assertEqual(response.context['per_page'], 50)
+
+    def test_non_admin_only_sees_own_records(self):
+        response = self.get_dashboard(self.zeta)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        self.assertEqual(response.context['total_records'], 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class InsightsApiTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', '1000', is_staff=True, is_superuser=True)
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme Freight')
+        self.zeta = make_user('zeta@example.com', '3000', company_name='Zeta Haulers')
+        make_record(self.acme, 'whatsapp', datetime(2025, 1, 5, 8, tzinfo=dt_timezone.utc))
+        make_record(self.acme, 'whatsapp', datetime(2025, 1, 5, 9, tzinfo=dt_timezone.utc))
+        make_record(self.acme, 'gmail', datetime(2025, 2, 1, tzinfo=dt_timezone.utc))
+        make_record(self.zeta, 'sms', datetime(2024, 12, 31, tzinfo=dt_timezone.utc), email='dispatch@zeta.test')
+
+    def get_insights(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('insights_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_buckets_for_admin(self):
+        data = self.get_insights(self.admin)
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(data['years'], [{'year': 2025, 'count': 3}, {'year': 2024, 'count': 1}])
+        self.assertEqual(data['months'][0], {'month': '2025-02', 'count': 1})
+        self.assertIn({'date': '2025-01-05', 'count': 2}, data['days'])
+        self.assertEqual(data['companies'][0], {'name': 'Acme Freight', 'count': 3})
+        self.assertEqual(data['types'], [
+            {'type': 'gmail', 'count': 1}, {'type': 'sms', 'count': 1}, {'type': 'whatsapp', 'count': 2},
+        ])
+
+    def test_filters_use_rollup_and_raw_records(self):
+        data = self.get_insights(self.admin, year='2025', type='whatsapp')
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['days'], [{'date': '2025-01-05', 'count': 2}])
+
+        data = self.get_insights(self.admin, q='dispatch@zeta')
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['companies'], [{'name': 'Zeta Haulers', 'count': 1}])
+        self.assertEqual(data['days'], [{'date': '2024-12-31', 'count': 1}])
+
+    def test_non_admin_is_scoped_to_own_uploads(self):
+        data = self.get_insights(self.zeta)
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['types'], [{'type': 'sms', 'count': 1}])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', '1000', is_staff=True, is_superuser=True)
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme, Freight', mc_number='MC-1')
+        make_record(self.acme, 'gmail', datetime(2025, 1, 2, tzinfo=dt_timezone.utc), google_drive_link='https://drive.example/a')
+        make_record(self.acme, 'sms', datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        self.client.force_login(self.admin)
+
+    def test_csv_export_streams_filtered_rows(self):
+        response = self.client.get(reverse('export_dashboard_records'), {'type': 'gmail'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'email,company_name,mc_number,number_of_trucks,phone_number,google_drive_link,created_date,type')
+        self.assertEqual(lines[1:], [
+            'acme@example.com,"Acme, Freight",MC-1,0,2000,https://drive.example/a,2025-01-02T00:00:00+00:00,gmail',
+        ])
+
+    def test_ndjson_export(self):
+        response = self.client.get(reverse('export_dashboard_records'), {'format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([r['type'] for r in rows], ['gmail', 'sms'])
+        self.assertEqual(rows[1]['company_name'], 'Acme, Freight')
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('export_dashboard_records'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+
+
+def make_folder(email, phone_number, folder_date, company_key=None, suffix=''):
+    return EmailFolder.objects.create(
+        email=email,
+        phone_number=phone_number,
+        company_name_folder_id=f'company{suffix}',
+        company_name_mc_number=company_key,
+        year_folder_id=f'year{suffix}',
+        month_folder_id=f'month{suffix}',
+        date_folder_id=f'date{suffix}',
+        folder_year=folder_date.year,
+        folder_month=folder_date.month,
+        folder_date=folder_date,
+    )
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SearchEmailRecordsTests(TestCase):
+    def setUp(self):
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+        self.today = timezone.now().date()
+        caches['default'].clear()
+
+    def search(self, **payload):
+        response = self.client.post(
+            reverse('search_email_records'), json.dumps(payload), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_unknown_user(self):
+        make_folder('other@example.com', '9', self.today, suffix='-other')
+        data = self.search(email='nobody@example.com')
+        self.assertFalse(data['user_exists'])
+        self.assertTrue(data['has_current_year'])
+        self.assertEqual(data['year_folder_id'], 'year-other')
+
+    def test_user_without_folders(self):
+        data = self.search(email='acme@example.com')
+        self.assertTrue(data['user_exists'])
+        self.assertFalse(data['data_exists'])
+        self.assertEqual(data['length_of_today_records'], 1)
+
+    def test_folder_state_for_existing_user(self):
+        make_folder('first@example.com', '1', self.today.replace(year=2020), suffix='-first')
+        make_folder('acme@example.com', '2000', self.today, 'Acme_MC-1', suffix='-today')
+        make_folder('acme@example.com', '2000', self.today, 'Acme_MC-1', suffix='-today-2')
+
+        data = self.search(email='acme@example.com', phone_number='2000')
+        self.assertTrue(data['data_exists'])
+        self.assertTrue(data['has_current_month'])
+        self.assertEqual(data['month_folder_id'], 'month-today')
+        self.assertEqual(data['date_folder_id'], 'date-today')
+        self.assertEqual(data['year_folder_id'], 'year-today')
+        self.assertTrue(data['has_company_name_mc_number_name'])
+        self.assertEqual(data['company_name_folder_id'], 'company-today')
+        self.assertEqual(data['length_of_today_records'], 3)
+
+    def test_phone_lookup_and_company_fallback(self):
+        make_folder('first@example.com', '1', self.today.replace(year=2020), suffix='-first')
+        make_folder('', '2000', self.today.replace(year=2020), suffix='-phone')
+
+        data = self.search(phone_number='2000')
+        self.assertEqual(data['company_name'], 'Acme')
+        self.assertTrue(data['data_exists'])
+        self.assertFalse(data['has_today'])
+        self.assertFalse(data['has_company_name_mc_number_name'])
+        self.assertEqual(data['company_name_folder_id'], 'company-first')
+
+    def test_query_count_does_not_grow_with_folder_rows(self):
+        for i in range(50):
+            make_folder('acme@example.com', '2000', self.today, 'Acme_MC-1', suffix=f'-{i}')
+        # one query for the user, one for every folder flag, ID and count
+        with self.assertNumQueries(2):
+            data = self.search(email='acme@example.com')
+        self.assertEqual(data['length_of_today_records'], 51)
+        # the user comes from the resolver, the folders from the folder cache
+        with self.assertNumQueries(0):
+            self.search(email='acme@example.com')
+        self.assertFalse(DocumentSequence.objects.exists())
+
+    def test_new_folders_are_written_through(self):
+        make_folder('acme@example.com', '2000', self.today.replace(year=2020), suffix='-old')
+        data = self.search(email='acme@example.com')
+        self.assertFalse(data['has_today'])
+        self.assertEqual(data['length_of_today_records'], 1)
+
+        response = self.client.post(reverse('create_email_folder'), json.dumps({
+            'email': 'acme@example.com', 'phone_number': '2000',
+            'company_name_folder_id': 'company-new', 'company_name_mc_number': 'Acme_MC-1',
+            'year_folder_id': 'year-new', 'month_folder_id': 'month-new', 'date_folder_id': 'date-new',
+            'folder_year': self.today.year, 'folder_month': self.today.month,
+            'folder_date': self.today.isoformat(),
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+        with self.assertNumQueries(0):
+            data = self.search(email='acme@example.com')
+        self.assertEqual(data['date_folder_id'], 'date-new')
+        self.assertEqual(data['length_of_today_records'], 2)
+        self.assertTrue(data['has_company_name_mc_number_name'])
+        self.assertEqual(data['company_name_folder_id'], 'company-new')
+
+        EmailFolder.objects.filter(date_folder_id='date-new').get().delete()
+        data = self.search(email='acme@example.com')
+        self.assertFalse(data['has_today'])
+        self.assertEqual(data['length_of_today_records'], 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class FolderTreeTests(TestCase):
+    def setUp(self):
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+        self.day = datetime(2025, 11, 6).date()
+        caches['default'].clear()
+
+    def folder_path(self, **params):
+        response = self.client.get(reverse('folder_path'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_new_email_folders_extend_the_tree(self):
+        make_folder('acme@example.com', '2000', self.day, 'Acme_MC-1', suffix='-a')
+        make_folder('acme@example.com', '2000', self.day, 'Acme_MC-1', suffix='-b')
+        make_folder('acme@example.com', '2000', self.day.replace(day=7), 'Acme_MC-1', suffix='-c')
+
+        self.assertEqual(DriveFolder.objects.count(), 5)
+        day = DriveFolder.objects.get(kind='day', key='2025-11-06')
+        self.assertEqual(day.folder_id, 'date-a')
+        self.assertEqual(
+            [day.parent.folder_id, day.parent.parent.folder_id, day.parent.parent.parent.folder_id],
+            ['month-a', 'year-a', 'company-a'],
+        )
+        self.assertEqual(DriveFolder.objects.get(kind='day', key='2025-11-07').parent, day.parent)
+
+
+    def test_deleted_email_folders_leave_the_tree(self):
+        first = make_folder('acme@example.com', '2000', self.day, 'Acme_MC-1', suffix='-a')
+        second = make_folder('acme@example.com', '2000', self.day, 'Acme_MC-1', suffix='-b')
+        other_day = make_folder('acme@example.com', '2000', self.day.replace(day=7), 'Acme_MC-1', suffix='-c')
+
+        first.delete()
+        self.assertEqual(DriveFolder.objects.count(), 5)
+        second.delete()
+        self.assertEqual(sorted(DriveFolder.objects.values_list('kind', flat=True)), ['company', 'day', 'month', 'year'])
+        other_day.delete()
+        self.assertFalse(DriveFolder.objects.exists())
+
+    def test_get_or_create_reuses_existing_nodes(self):
+        keys = path_keys('Acme_MC-1', 2025, 11, self.day)
+        first = ensure_folder_path(keys, ['c1', 'y1', 'm1', 'd1'])
+        with self.assertNumQueries(1):
+            again = ensure_folder_path(keys, ['c2', 'y2', 'm2', 'd2'])
+        self.assertEqual([n.pk for n in again], [n.pk for n in first])
+
+        # a new day under an existing month only inserts the day
+        ensure_folder_path(path_keys('Acme_MC-1', 2025, 11, self.day.replace(day=8)), ['c3', 'y3', 'm3', 'd3'])
+        self.assertEqual(DriveFolder.objects.count(), 5)
+        self.assertEqual(DriveFolder.objects.get(key='2025-11-08').parent_id, first[2].pk)
+
+    def test_rebuild_matches_incremental_tree(self):
+        make_folder('acme@example.com', '2000', self.day, 'Acme_MC-1', suffix='-a')
+        make_folder('acme@example.com', '2000', self.day, 'Acme_MC-1', suffix='-b')
+        make_folder('old@example.com', '1', self.day.replace(year=2020), suffix='-old')
+        incremental = set(DriveFolder.objects.values_list('kind', 'key', 'folder_id', 'parent__key'))
+
+        out = StringIO()
+        call_command('rebuild_folder_tree', batch_size=2, stdout=out)
+        self.assertIn('removed 8 nodes, created 8 nodes', out.getvalue())
+        self.assertEqual(set(DriveFolder.objects.values_list('kind', 'key', 'folder_id', 'parent__key')), incremental)
+        # a row without company_name_mc_number is filed under its company folder ID
+        self.assertTrue(DriveFolder.objects.filter(parent=None, key='company-old').exists())
+
+    def test_folder_path_endpoint(self):
+        make_folder('acme@example.com', '2000', self.day, 'Acme_MC-1', suffix='-a')
+
+        # one query for the whole path, and no writes
+        with self.assertNumQueries(1):
+            data = self.folder_path(company_name_mc_number='Acme_MC-1', date='2025-11-06')
+        self.assertEqual(
+            [data['company_name_folder_id'], data['year_folder_id'], data['month_folder_id'], data['date_folder_id']],
+            ['company-a', 'year-a', 'month-a', 'date-a'],
+        )
+        self.assertEqual(data['missing'], [])
+
+        data = self.folder_path(email='acme@example.com', date='2025-12-01')
+        self.assertEqual(data['company_name_mc_number'], 'Acme_MC-1')
+        self.assertEqual(data['year_folder_id'], 'year-a')
+        self.assertEqual(data['missing'], ['month', 'day'])
+
+        self.assertEqual(self.folder_path(company_name_mc_number='Nobody_MC-0')['missing'], list(LEVELS))
+
+        response = self.client.get(reverse('folder_path'), {'email': 'nobody@example.com'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('folder_path'), {'company_name_mc_number': 'x', 'date': '06/11/2025'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class DocumentSequenceTests(TestCase):
+    def setUp(self):
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+        self.day = datetime(2025, 11, 6).date()
+        caches['default'].clear()
+
+    def reserve(self, **payload):
+        return self.client.post(
+            reverse('reserve_document_numbers'), json.dumps(payload), content_type='application/json'
+        )
+
+    def test_numbers_are_consecutive_and_start_after_existing_documents(self):
+        start_after = mock.Mock(return_value=4)
+        self.assertEqual(reserve_document_numbers(self.acme.id, self.day, 1, start_after), (5, 5))
+        self.assertEqual(reserve_document_numbers(self.acme.id, self.day, 10, start_after), (6, 15))
+        start_after.assert_called_once()
+        # a single UPDATE once the day's sequence exists, however high it is
+        with self.assertNumQueries(1):
+            self.assertEqual(reserve_document_numbers(self.acme.id, self.day), (16, 16))
+        self.assertEqual(reserve_document_numbers(self.acme.id, self.day.replace(day=7)), (1, 1))
+
+    def test_update_then_select_fallback(self):
+        reserve_document_numbers(self.acme.id, self.day, 3)
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(reserve_document_numbers(self.acme.id, self.day, 2), (4, 5))
+
+    def test_concurrent_creation_of_the_days_sequence(self):
+        def racing_request():
+            # another webhook creates the sequence between our UPDATE and INSERT
+            reserve_document_numbers(self.acme.id, self.day, 2)
+            return 0
+
+        self.assertEqual(reserve_document_numbers(self.acme.id, self.day, 1, racing_request), (3, 3))
+        self.assertEqual(DocumentSequence.objects.get().last_value, 3)
+
+    def test_reserve_endpoint(self):
+        make_folder('acme@example.com', '2000', self.day, 'Acme_MC-1', suffix='-a')
+        response = self.reserve(email='acme@example.com', count=3, date='2025-11-06', document_name='invoice')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['first'], data['last']), (2, 4))
+        self.assertEqual(data['filenames'], [
+            '002_invoice_2025-11-06', '003_invoice_2025-11-06', '004_invoice_2025-11-06',
+        ])
+        self.assertEqual(document_filename(12, 'bol', self.day), '012_bol_2025-11-06')
+
+        # matched by phone too; searching reserves nothing
+        today = timezone.now().date()
+        self.reserve(phone_number='2000', count=2)
+        self.client.get(reverse('search_email_records'), {'email': 'acme@example.com'})
+        self.assertEqual(DocumentSequence.objects.get(day=today).last_value, 2)
+
+    def test_reserve_endpoint_errors(self):
+        self.assertEqual(self.reserve(email='acme@example.com', count=0).status_code, 400)
+        self.assertEqual(self.reserve(email='acme@example.com', count='x').status_code, 400)
+        self.assertEqual(self.reserve(count=1).status_code, 400)
+        self.assertEqual(self.reserve(email='nobody@example.com').status_code, 404)
+        self.assertFalse(DocumentSequence.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class UserResolverTests(TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.resolver = UserResolver(max_entries=2, ttl=60, miss_ttl=5, clock=lambda: self.now)
+        self.admin = make_user('admin@example.com', '1000', is_superuser=True)
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+
+    def test_hits_misses_and_ttl(self):
+        with self.assertNumQueries(1):
+            first = self.resolver.webhook_user('acme@example.com', None)
+            second = self.resolver.webhook_user('acme@example.com', None)
+        self.assertEqual(first, second)
+        self.assertEqual((first.id, first.company_name, first.mc_number), (self.acme.pk, 'Acme', 'MC-1'))
+        self.assertEqual(self.resolver.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+        self.now = 61
+        with self.assertNumQueries(1):
+            self.resolver.webhook_user('acme@example.com', None)
+
+    def test_misses_are_cached_and_lru_evicts(self):
+        self.assertIsNone(self.resolver.record_user('nobody@example.com', None))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.resolver.record_user('nobody@example.com', None))
+
+        self.resolver.record_user(None, '2000')
+        self.resolver.superuser()
+        self.assertEqual(self.resolver.stats()['size'], 2)
+        with self.assertNumQueries(1):
+            self.resolver.record_user('nobody@example.com', None)
+
+    def test_misses_expire_quickly(self):
+        self.assertIsNone(self.resolver.record_user('new@example.com', None))
+        # signed up through another worker process, whose signals do not reach this cache
+        make_user('new@example.com', '3000')
+        self.now = 4
+        self.assertIsNone(self.resolver.record_user('new@example.com', None))
+        self.now = 6
+        self.assertEqual(self.resolver.record_user('new@example.com', None).email, 'new@example.com')
+
+        uncached = UserResolver(miss_ttl=0)
+        uncached.record_user('nobody@example.com', None)
+        self.assertEqual(uncached.stats()['size'], 0)
+
+    def test_model_changes_clear_the_shared_resolver(self):
+        self.assertEqual(user_resolver.webhook_user(None, '2000').company_name, 'Acme')
+        self.acme.user_data.company_name = 'Acme Logistics'
+        self.acme.user_data.save()
+        self.assertEqual(user_resolver.webhook_user(None, '2000').company_name, 'Acme Logistics')
+
+        self.admin.delete()
+        self.assertIsNone(user_resolver.superuser())
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class HotQueryPlanTests(TestCase):
+    """Fail if a webhook/dashboard hot path falls back to a full table scan."""
+
+    def setUp(self):
+        self.user = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+        self.today = timezone.now().date()
+
+    def assertNoFullScan(self, qs):
+        plan = qs.explain()
+        full_scans = [
+            line for line in plan.splitlines()
+            if re.search(r'\bSCAN\b', line) and 'USING' not in line
+        ]
+        self.assertEqual(full_scans, [], plan)
+
+    def test_dashboard_queries(self):
+        self.assertNoFullScan(Dashboard.objects.filter(user=self.user).order_by('-created_date')[:50])
+        self.assertNoFullScan(Dashboard.objects.order_by('-created_date')[:50])
+        self.assertNoFullScan(Dashboard.objects.filter(type='sms').order_by('-created_date')[:50])
+
+    def test_folder_lookups(self):
+        self.assertNoFullScan(EmailFolder.objects.filter(email='acme@example.com', folder_date=self.today))
+        self.assertNoFullScan(EmailFolder.objects.filter(email='acme@example.com', folder_month=1))
+        self.assertNoFullScan(EmailFolder.objects.filter(phone_number='2000', folder_date=self.today))
+        self.assertNoFullScan(EmailFolder.objects.filter(folder_year=2025))
+        self.assertNoFullScan(EmailFolder.objects.filter(company_name_mc_number='Acme_MC-1'))
+
+    def test_folder_tree_lookups(self):
+        keys = path_keys('Acme_MC-1', 2025, 11, self.today)
+        levels = [DriveFolder.objects.filter(**node_lookups(keys[:depth])) for depth in range(1, 5)]
+        for level in levels:
+            self.assertNoFullScan(level)
+        self.assertNoFullScan(levels[0].union(*levels[1:], all=True))
+
+    def test_user_and_log_lookups(self):
+        self.assertNoFullScan(User.objects.filter(user_data__phone_number='2000'))
+        self.assertNoFullScan(LogEntry.objects.order_by('-created_at')[:50])
+        self.assertNoFullScan(LogEntry.objects.filter(level='error').order_by('-created_at')[:50])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, AUDIT_LOG_BACKGROUND_FLUSH=False)
+class UploadCounterTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', '1000', is_superuser=True)
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme Freight')
+        self.addCleanup(audit_log.flush)
+
+    def counter_rows(self):
+        return sorted(UploadCounter.objects.values_list('user_id', 'company_name', 'type', 'day', 'count'))
+
+    def test_create_record_increments_bucket(self):
+        for _ in range(3):
+            response = self.client.post(
+                reverse('create_dashboard_record'),
+                json.dumps({'email': 'acme@example.com', 'phone_number': '2000', 'type': 'gmail'}),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 201)
+
+        bucket = UploadCounter.objects.get()
+        self.assertEqual((bucket.user, bucket.company_name, bucket.type, bucket.count),
+                         (self.acme, 'Acme Freight', 'gmail', 3))
+
+    def test_rebuild_matches_incremental_counters(self):
+        make_record(self.acme, 'sms', datetime(2025, 1, 1, 8, tzinfo=dt_timezone.utc))
+        make_record(self.acme, 'sms', datetime(2025, 1, 1, 9, tzinfo=dt_timezone.utc))
+        make_record(self.acme, 'gmail', datetime(2025, 1, 2, tzinfo=dt_timezone.utc))
+        make_record(self.admin, 'sms', datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        incremental = self.counter_rows()
+
+        UploadCounter.objects.all().delete()
+        call_command('rebuild_upload_counters', stdout=StringIO())
+
+        self.assertEqual(self.counter_rows(), incremental)
+        self.assertEqual(len(incremental), 3)
+
+    def test_deleted_records_leave_their_bucket(self):
+        day = datetime(2025, 1, 1, 8, tzinfo=dt_timezone.utc)
+        first = make_record(self.acme, 'sms', day)
+        make_record(self.acme, 'sms', day)
+        make_record(self.acme, 'sms', day)
+        make_record(self.acme, 'gmail', day)
+
+        first.delete()
+        Dashboard.objects.filter(type='gmail').delete()
+        self.assertEqual(
+            dict(UploadCounter.objects.values_list('type', 'count')), {'sms': 2, 'gmail': 0},
+        )
+        Dashboard.objects.all().delete()
+        self.assertEqual(UploadCounter.objects.aggregate(total=Sum('count'))['total'], 0)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, AUDIT_LOG_BACKGROUND_FLUSH=False)
+class BulkIngestTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', '1000', is_superuser=True)
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme Freight')
+        self.beta = make_user('beta@example.com', '3000')
+        self.addCleanup(audit_log.flush)
+
+    def test_per_item_results(self):
+        records = [
+            {'email': 'acme@example.com', 'phone_number': '2000', 'type': 'gmail'},
+            {'email': 'other@example.com', 'phone_number': '3000', 'type': 'sms'},
+            {'email': 'stranger@example.com', 'phone_number': '9999', 'type': 'whatsapp',
+             'google_drive_link': 'https://drive.google.com/file/d/x'},
+            {'phone_number': '3000', 'type': 'gmail'},
+            {'email': 'acme@example.com', 'phone_number': '2000', 'type': 'fax'},
+            {'type': 'sms'},
+            {'email': ['acme@example.com'], 'phone_number': '2000', 'type': 'sms'},
+            {'email': 'acme@example.com', 'phone_number': {'n': 2000}, 'type': 'sms'},
+            {'email': 'acme@example.com', 'type': 'sms', 'content_sha256': int('9' * 64)},
+            {'email': 'acme@example.com', 'type': 'sms', 'google_drive_link': ['https://drive.google.com']},
+        ]
+        response = self.client.post(
+            reverse('create_dashboard_records_bulk'), json.dumps(records), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (4, 6))
+        self.assertEqual([r['status'] for r in body['results']], ['created'] * 4 + ['error'] * 6)
+        # an unknown email is not matched by its phone number, as in /api/create-record/;
+        # a record with only a phone number is
+        self.assertEqual([r['user'] for r in body['results'][:4]],
+                         ['acme@example.com', 'admin@example.com', 'admin@example.com', 'beta@example.com'])
+        self.assertIn('Invalid type', body['results'][4]['message'])
+        self.assertIn('email or phone_number', body['results'][5]['message'])
+        self.assertEqual([r['message'] for r in body['results'][6:]], [
+            'Invalid email. Must be a string',
+            'Invalid phone_number. Must be a string',
+            'Invalid content_sha256. Must be a string',
+            'Invalid google_drive_link. Must be a string',
+        ])
+
+        self.assertEqual(Dashboard.objects.count(), 4)
+        audit_log.flush()
+        created_ids = {str(r['id']) for r in body['results'][:4]}
+        self.assertEqual(
+            set(LogEntry.objects.filter(event='dashboard_record_created').values_list('related_id', flat=True)),
+            created_ids,
+        )
+        self.assertEqual(UploadCounter.objects.aggregate(total=Sum('count'))['total'], 4)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def post_batch(size):
+            records = [{'email': 'acme@example.com', 'phone_number': '2000', 'type': 'sms'}] * size
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('create_dashboard_records_bulk'), json.dumps(records), content_type='application/json'
+                )
+            self.assertEqual(response.json()['created'], size)
+            return len(queries)
+
+        post_batch(1)  # creates the counter bucket
+        self.assertEqual(post_batch(2), post_batch(50))
+        self.assertEqual(self.acme.dashboards.count(), 53)
+
+    def test_ndjson_body(self):
+        body = '\n'.join(json.dumps({'email': 'acme@example.com', 'phone_number': '2000', 'type': 'sms'})
+                         for _ in range(4))
+        response = self.client.post(
+            reverse('create_dashboard_records_bulk'), body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.acme.dashboards.count(), 4)
+
+    def test_rejects_malformed_and_all_invalid_batches(self):
+        url = reverse('create_dashboard_records_bulk')
+        self.assertEqual(self.client.post(url, '{"email": ', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, '[]', content_type='application/json').status_code, 400)
+
+        response = self.client.post(url, json.dumps([{'type': 'sms'}]), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['failed'], 1)
+        self.assertFalse(Dashboard.objects.exists())
+
+
+class FakeMakeResponse:
+    def __init__(self, status_code, text='Accepted'):
+        self.status_code = status_code
+        self.text = text
+        self.ok = 200 <= status_code < 400
+
+
+class MakeForwarderTests(TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, ignore_errors=True)
+        overrides = override_settings(
+            MAKE_SPOOL_DIR=self.spool_dir,
+            BLOB_STORE_DIR=self.spool_dir,
+            MAKE_FORWARDER_MAX_ATTEMPTS=2,
+            MAKE_FORWARDER_CONCURRENCY=1,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def queue_upload(self, content=b'%PDF-1.4 test'):
+        response = self.client.post(reverse('send_to_make_webhook'), {
+            'email': 'acme@example.com',
+            'phone_number': '2000',
+            'filename': 'rate-con',
+            'type': 'whatsapp',
+            'data': SimpleUploadedFile('scan.pdf', content, content_type='application/pdf'),
+        })
+        self.assertEqual(response.status_code, 202)
+        return OutboundUpload.objects.get(pk=response.json()['upload_id'])
+
+    def test_several_files_are_rejected_unless_merged(self):
+        response = self.client.post(reverse('send_to_make_webhook'), {
+            'email': 'acme@example.com', 'phone_number': '2000', 'filename': 'rate-con', 'type': 'whatsapp',
+            'data': [
+                SimpleUploadedFile('page1.pdf', b'%PDF-1.4 one', content_type='application/pdf'),
+                SimpleUploadedFile('page2.pdf', b'%PDF-1.4 two', content_type='application/pdf'),
+            ],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('one file per request', response.json()['error'])
+        self.assertFalse(OutboundUpload.objects.exists())
+
+    def test_upload_is_spooled_not_forwarded_inline(self):
+        with mock.patch('automationApp.make_forwarder.get_session') as get_session:
+            upload = self.queue_upload()
+        get_session.assert_not_called()
+        self.assertEqual(upload.status, 'pending')
+        self.assertEqual(upload.size, 13)
+        with open(upload.spool_path, 'rb') as fh:
+            self.assertEqual(fh.read(), b'%PDF-1.4 test')
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_large_upload_temp_file_is_moved_into_spool(self):
+        moved = []
+        real_move = file_move_safe
+
+        def recording_move(old, new, *args, **kwargs):
+            moved.append(old)
+            return real_move(old, new, *args, **kwargs)
+
+        with mock.patch('automationApp.blob_store.file_move_safe', side_effect=recording_move):
+            upload = self.queue_upload()
+
+        self.assertEqual(len(moved), 1)
+        self.assertFalse(os.path.exists(moved[0]))
+        with open(upload.spool_path, 'rb') as fh:
+            self.assertEqual(fh.read(), b'%PDF-1.4 test')
+
+    def test_missing_file_is_rejected(self):
+        response = self.client.post(reverse('send_to_make_webhook'), {'email': 'acme@example.com'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_delivery_removes_spooled_file(self):
+        upload = self.queue_upload()
+        sent = {}
+
+        def fake_post(url, data, headers, timeout):
+            sent['length'] = len(data)
+            sent['body'] = data.read()
+            sent['content_type'] = headers['Content-Type']
+            return FakeMakeResponse(200)
+
+        session = mock.Mock()
+        session.post.side_effect = fake_post
+        with mock.patch('automationApp.make_forwarder.get_session', return_value=session):
+            forward_due_uploads()
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, 'delivered')
+        self.assertEqual(upload.attempts, 1)
+        # delivery drops the upload's blob reference; gc_blobs removes the file
+        self.assertEqual(StoredBlob.objects.get(sha256=upload.content_sha256).ref_count, 0)
+        call_command('gc_blobs', grace=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(upload.spool_path))
+        self.assertEqual(sent['length'], len(sent['body']))
+        self.assertTrue(sent['content_type'].startswith('multipart/form-data; boundary='))
+        self.assertIn(b'name="filename"\r\n\r\nrate-con\r\n', sent['body'])
+        self.assertIn(b'filename="scan.pdf"\r\nContent-Type: application/pdf\r\n\r\n%PDF-1.4 test\r\n', sent['body'])
+        self.assertTrue(LogEntry.objects.filter(event='make_forward_attempt', level='info').exists())
+
+    def test_failures_back_off_then_dead_letter(self):
+        upload = self.queue_upload()
+        session = mock.Mock()
+        session.post.return_value = FakeMakeResponse(503, 'Busy')
+        with mock.patch('automationApp.make_forwarder.get_session', return_value=session):
+            forward_due_uploads()
+            upload.refresh_from_db()
+            self.assertEqual(upload.status, 'pending')
+            self.assertGreater(upload.next_attempt_at, timezone.now())
+
+            # not due yet, so nothing is sent
+            self.assertEqual(forward_due_uploads(), [])
+
+            OutboundUpload.objects.filter(pk=upload.pk).update(next_attempt_at=timezone.now())
+            forward_due_uploads()
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, 'dead')
+        self.assertEqual(upload.attempts, 2)
+        self.assertEqual(upload.last_error, 'Make responded with HTTP 503')
+        self.assertTrue(os.path.exists(upload.spool_path))
+        self.assertEqual(LogEntry.objects.filter(event='make_forward_attempt').count(), 2)
+
+    def test_uploads_are_claimed_one_round_at_a_time(self):
+        for content in (b'%PDF-1.4 one', b'%PDF-1.4 two', b'%PDF-1.4 three'):
+            self.queue_upload(content)
+        statuses = []
+
+        def fake_post(url, data, headers, timeout):
+            statuses.append(sorted(OutboundUpload.objects.values_list('status', flat=True)))
+            return FakeMakeResponse(200)
+
+        session = mock.Mock()
+        session.post.side_effect = fake_post
+        with mock.patch('automationApp.make_forwarder.get_session', return_value=session):
+            self.assertEqual(len(forward_due_uploads(limit=50)), 3)
+        # with concurrency 1 no row is claimed while another one is being sent
+        self.assertEqual(statuses, [
+            ['pending', 'pending', 'sending'], ['delivered', 'pending', 'sending'], ['delivered', 'delivered', 'sending'],
+        ])
+
+    def test_admin_requeue_leaves_rows_being_sent_alone(self):
+        sending, dead = self.queue_upload(b'%PDF-1.4 one'), self.queue_upload(b'%PDF-1.4 two')
+        OutboundUpload.objects.filter(pk=sending.pk).update(status='sending')
+        OutboundUpload.objects.filter(pk=dead.pk).update(status='dead', attempts=6)
+        model_admin = OutboundUploadAdmin(OutboundUpload, AdminSite())
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.requeue(None, OutboundUpload.objects.all())
+        self.assertEqual(
+            dict(OutboundUpload.objects.values_list('pk', 'status')), {sending.pk: 'sending', dead.pk: 'pending'},
+        )
+
+
+RATE_CON = b"RATE CONFIRMATION\nLoad confirmation #881  Date: 11/06/2025\nShipper: Midwest Foods\n"
+
+
+def failing_ocr_engine(**options):
+    raise RuntimeError('engine crashed')
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS, OCR_ENABLED=True, OCR_WORKERS=0,
+    OCR_ENGINE='automationApp.ocr.PlainTextEngine', OCR_ENGINE_OPTIONS={},
+)
+class AutoNamingTests(TestCase):
+    def setUp(self):
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, ignore_errors=True)
+        overrides = override_settings(
+            MAKE_SPOOL_DIR=self.spool_dir, BLOB_STORE_DIR=self.spool_dir, MAKE_FORWARDER_CONCURRENCY=1,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        caches['default'].clear()
+        self.sent = []
+
+    def queue(self, content, name='scan.txt', content_type='text/plain', filename='rate-con'):
+        response = self.client.post(reverse('send_to_make_webhook'), {
+            'email': 'acme@example.com', 'phone_number': '2000', 'filename': filename, 'type': 'whatsapp',
+            'data': SimpleUploadedFile(name, content, content_type=content_type),
+        })
+        self.assertEqual(response.status_code, 202)
+        return response.json()['upload_id']
+
+    def forward(self):
+        def fake_post(url, data, headers, timeout):
+            body = data.read()
+            self.sent.append(re.search(rb'name="filename"\r\n\r\n([^\r]*)\r\n', body).group(1).decode())
+            return FakeMakeResponse(200)
+
+        session = mock.Mock()
+        session.post.side_effect = fake_post
+        with mock.patch('automationApp.make_forwarder.get_session', return_value=session):
+            return forward_due_uploads()
+
+    def test_keyword_extraction(self):
+        self.assertEqual(extract_keywords(RATE_CON.decode()), {
+            'document_type': 'rate_confirmation', 'document_date': '2025-11-06',
+        })
+        self.assertEqual(extract_keywords('Fuel receipt  Diesel 112.4 gallons  Nov 3rd, 2025'), {
+            'document_type': 'fuel_receipt', 'document_date': '2025-11-03',
+        })
+        self.assertEqual(extract_keywords('BILL OF LADING shipped 2025-10-30, consignee below')['document_type'],
+                         'bill_of_lading')
+        self.assertEqual(extract_keywords('nothing useful 13/45/2025'), {
+            'document_type': 'document', 'document_date': None,
+        })
+
+    def test_uploads_are_named_before_forwarding_and_results_cached_by_content(self):
+        first = self.queue(RATE_CON)
+        with mock.patch('automationApp.auto_naming.ocr_file', wraps=ocr_file) as run:
+            self.forward()
+            self.queue(RATE_CON, name='same-scan.TXT')
+            self.forward()
+        run.assert_called_once()
+
+        self.assertEqual(self.sent, [
+            '001_rate_confirmation_2025-11-06.txt', '002_rate_confirmation_2025-11-06.txt',
+        ])
+        self.assertEqual(OutboundUpload.objects.get(pk=first).generated_filename, self.sent[0])
+        result = OcrResult.objects.get()
+        self.assertEqual((result.engine, result.pages, result.document_date), ('plain_text', 1, datetime(2025, 11, 6).date()))
+
+    def test_number_continues_after_the_days_folder_records(self):
+        today = timezone.localdate()
+        make_folder('acme@example.com', '2000', today, 'Acme_MC-1', suffix='-a')
+        make_folder('acme@example.com', '2000', today, 'Acme_MC-1', suffix='-b')
+        # a number the scenario put in front of the name is not trusted
+        self.queue(RATE_CON, filename='002_rate-con')
+        self.forward()
+        self.assertEqual(self.sent, ['003_rate_confirmation_2025-11-06.txt'])
+        self.assertEqual(DocumentSequence.objects.get(day=today).last_value, 3)
+
+    def test_unreadable_and_failed_uploads_are_still_named(self):
+        today = timezone.localdate().isoformat()
+        self.queue(b'%PDF-1.4 test', name='scan.pdf', content_type='application/pdf')
+        self.forward()
+        self.assertEqual(self.sent, [f'001_document_{today}.pdf'])
+        self.assertFalse(LogEntry.objects.filter(event='ocr_failed').exists())
+
+        with override_settings(OCR_ENGINE='automationApp.tests.failing_ocr_engine'):
+            self.queue(b'receipt', name='note.txt')
+            self.forward()
+        self.assertEqual(self.sent[1], f'002_document_{today}.txt')
+        self.assertIn('engine crashed', LogEntry.objects.get(event='ocr_failed').message)
+        self.assertFalse(OcrResult.objects.exists())
+
+    def test_each_upload_is_named_right_before_its_send(self):
+        self.queue(RATE_CON)
+        self.queue(b'Fuel receipt  Diesel 112.4 gallons', name='fuel.txt')
+        named = []
+
+        def fake_post(url, data, headers, timeout):
+            named.append(OutboundUpload.objects.exclude(generated_filename='').count())
+            return FakeMakeResponse(200)
+
+        session = mock.Mock()
+        session.post.side_effect = fake_post
+        with mock.patch('automationApp.make_forwarder.get_session', return_value=session):
+            forward_due_uploads()
+        self.assertEqual(named, [1, 2])
+
+    @override_settings(OCR_WORKERS=1, OCR_TIMEOUT=0.5, MAKE_FORWARDER_TIMEOUT=0.05)
+    def test_slow_ocr_sends_heartbeats_and_times_out(self):
+        def slow_ocr(engine, options, path, content_type):
+            with open(path) as fh:
+                time.sleep(float(fh.read()))
+
+        paths = {}
+        for name, seconds in [('fast', '0.2'), ('hung', '2')]:
+            paths[name] = os.path.join(self.spool_dir, name)
+            with open(paths[name], 'w') as fh:
+                fh.write(seconds)
+        heartbeat = mock.Mock()
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown, cancel_futures=True)
+        with mock.patch('automationApp.auto_naming.get_ocr_pool', return_value=pool), \
+                mock.patch('automationApp.auto_naming.ocr_file', side_effect=slow_ocr):
+            results = run_ocr({name: (path, 'text/plain') for name, path in paths.items()}, heartbeat)
+        self.assertIsNone(results['fast'])
+        self.assertIsInstance(results['hung'], TimeoutError)
+        self.assertGreaterEqual(heartbeat.call_count, 3)
+
+    @override_settings(OCR_ENABLED=False)
+    def test_disabled(self):
+        self.queue(RATE_CON)
+        self.forward()
+        self.assertEqual(self.sent, ['rate-con'])
+
+    @override_settings(OCR_WORKERS=1)
+    def test_worker_pool(self):
+        self.addCleanup(shutdown_ocr_pool)
+        path = os.path.join(self.spool_dir, 'page.txt')
+        with open(path, 'wb') as fh:
+            fh.write(RATE_CON)
+        results = run_ocr({'a': (path, 'text/plain'), 'b': (path, 'image/png')})
+        self.assertEqual(results['a']['document_type'], 'rate_confirmation')
+        self.assertIsNone(results['b'])
+
+    def test_bench_ocr_smoke(self):
+        out = StringIO()
+        call_command('bench_ocr', pages=4, workers='1', engine='automationApp.ocr.PlainTextEngine', json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['engine'], 'plain_text')
+        self.assertEqual(report['results'][0]['pages'], 4)
+        self.assertGreater(report['results'][0]['pages_per_second_per_core'], 0)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, AUDIT_LOG_BACKGROUND_FLUSH=False)
+class BlobStoreTests(TestCase):
+    def setUp(self):
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+        self.other = make_user('other@example.com', '3000')
+        self.blob_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.blob_dir, ignore_errors=True)
+        overrides = override_settings(BLOB_STORE_DIR=self.blob_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        caches['default'].clear()
+        self.addCleanup(audit_log.flush)
+
+    def send(self, content, channel='whatsapp', **identity):
+        identity = identity or {'phone_number': '2000'}
+        return self.client.post(reverse('send_to_make_webhook'), {
+            **identity, 'filename': channel, 'type': channel,
+            'data': SimpleUploadedFile(f'{channel}.pdf', content, content_type='application/pdf'),
+        })
+
+    def test_copies_share_one_blob_and_known_content_short_circuits(self):
+        content = b'%PDF-1.4 rate confirmation'
+        sha256 = hashlib.sha256(content).hexdigest()
+        whatsapp = self.send(content)
+        gmail = self.send(content, 'gmail', email='acme@example.com')
+        self.assertEqual([whatsapp.status_code, gmail.status_code], [202, 202])
+        self.assertEqual(whatsapp.json()['content_sha256'], sha256)
+
+        blob = StoredBlob.objects.get()
+        self.assertEqual((blob.sha256, blob.size, blob.ref_count), (sha256, len(content), 2))
+        paths = set(OutboundUpload.objects.values_list('spool_path', flat=True))
+        self.assertEqual(paths, {os.path.join(self.blob_dir, sha256[:2], sha256[2:4], sha256)})
+
+        # the scenario uploaded it to Drive and recorded it with the hash it was sent
+        response = self.client.post(reverse('create_dashboard_record'), json.dumps({
+            'email': 'acme@example.com', 'phone_number': '2000', 'type': 'whatsapp',
+            'google_drive_link': 'https://drive.google.com/file/d/rc1', 'content_sha256': sha256.upper(),
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+        response = self.send(content, 'sms')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'duplicate')
+        self.assertEqual(response.json()['google_drive_link'], 'https://drive.google.com/file/d/rc1')
+        self.assertEqual(OutboundUpload.objects.count(), 2)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+        # another customer's copy is theirs to file
+        self.assertEqual(self.send(content, email='other@example.com').status_code, 202)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_streamed_hash_of_temporary_file_uploads(self):
+        content = b'%PDF-1.4 ' + os.urandom(4096)
+        response = self.send(content)
+        self.assertEqual(response.json()['content_sha256'], hashlib.sha256(content).hexdigest())
+        with open(OutboundUpload.objects.get().spool_path, 'rb') as fh:
+            self.assertEqual(fh.read(), content)
+        self.assertEqual(os.listdir(os.path.join(self.blob_dir, 'tmp')), [])
+
+    def test_garbage_collection(self):
+        self.send(b'kept')
+        self.send(b'released')
+        self.send(b'deleted')
+        released = OutboundUpload.objects.get(content_sha256=hashlib.sha256(b'released').hexdigest())
+        released.status = 'delivered'
+        released.save()
+        release_blob(released.content_sha256)
+        OutboundUpload.objects.get(content_sha256=hashlib.sha256(b'deleted').hexdigest()).delete()
+
+        out = StringIO()
+        call_command('gc_blobs', stdout=out)
+        self.assertIn('Removed 0 blobs', out.getvalue())
+
+        call_command('gc_blobs', grace=0, dry_run=True, stdout=out)
+        self.assertIn('Would remove 2 blobs (15 bytes)', out.getvalue())
+        self.assertEqual(StoredBlob.objects.count(), 3)
+
+        # a lost release is repaired by --recount
+        StoredBlob.objects.filter(sha256=hashlib.sha256(b'kept').hexdigest()).update(ref_count=5)
+        call_command('gc_blobs', grace=0, recount=True, stdout=out)
+        self.assertIn('Removed 2 blobs (15 bytes)', out.getvalue())
+        kept = StoredBlob.objects.get()
+        self.assertEqual((kept.sha256, kept.ref_count), (hashlib.sha256(b'kept').hexdigest(), 1))
+        self.assertFalse(os.path.exists(released.spool_path))
+        self.assertTrue(os.path.exists(OutboundUpload.objects.get(status='pending').spool_path))
+
+    def test_uploads_spooled_before_the_store_keep_their_own_file(self):
+        content = b'%PDF-1.4 legacy'
+        sha256 = hashlib.sha256(content).hexdigest()
+        self.send(content)
+        legacy_path = os.path.join(self.blob_dir, 'legacy-upload')
+        with open(legacy_path, 'wb') as fh:
+            fh.write(content)
+        # auto-naming fills in the hash of old spool files too
+        legacy = OutboundUpload.objects.create(
+            original_name='old.pdf', spool_path=legacy_path, size=len(content), content_sha256=sha256,
+        )
+
+        call_command('gc_blobs', grace=0, recount=True, stdout=StringIO())
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        release_upload_file(legacy)
+        self.assertFalse(os.path.exists(legacy_path))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_invalid_content_hash_is_rejected(self):
+        response = self.client.post(reverse('create_dashboard_record'), json.dumps({
+            'email': 'acme@example.com', 'phone_number': '2000', 'type': 'sms', 'content_sha256': 'abc',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(reverse('create_dashboard_records_bulk'), json.dumps([
+            {'email': 'acme@example.com', 'phone_number': '2000', 'type': 'sms', 'content_sha256': 'abc'},
+            {'email': 'acme@example.com', 'phone_number': '2000', 'type': 'sms', 'content_sha256': 'a' * 64},
+        ]), content_type='application/json')
+        self.assertEqual([r['status'] for r in response.json()['results']], ['error', 'created'])
+        self.assertEqual(Dashboard.objects.get().content_sha256, 'a' * 64)
+
+
+def photo(size=(1600, 1200), orientation=None):
+    """A noisy (so hard to compress) camera-style JPEG with EXIF, as phones send them."""
+    from PIL import Image
+
+    image = Image.merge('RGB', [Image.effect_noise(size, 60)] * 3)
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'
+    if orientation:
+        exif[0x0112] = orientation
+    out = BytesIO()
+    image.save(out, 'JPEG', quality=95, exif=exif)
+    return out.getvalue()
+
+
+@unittest.skipUnless(importlib.util.find_spec('PIL'), 'Pillow is an optional dependency')
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, PREPROCESS_ENABLED=True, PREPROCESS_WORKERS=0, PREPROCESS_MAX_DIMENSION=800)
+class PreprocessingTests(TestCase):
+    def setUp(self):
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+        self.blob_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.blob_dir, ignore_errors=True)
+        overrides = override_settings(BLOB_STORE_DIR=self.blob_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        caches['default'].clear()
+        self.addCleanup(audit_log.flush)
+
+    def send(self, *files, channel='whatsapp'):
+        return self.client.post(reverse('send_to_make_webhook'), {
+            'phone_number': '2000', 'filename': channel, 'type': channel, 'data': list(files),
+        })
+
+    def test_photo_is_downscaled_and_stripped(self):
+        from PIL import Image
+
+        content = photo(orientation=6)
+        with self.assertLogs('automationApp.preprocessing', 'INFO') as logs:
+            response = self.send(SimpleUploadedFile('IMG_0001.jpg', content, content_type='image/jpeg'))
+        self.assertEqual(response.status_code, 202)
+
+        upload = OutboundUpload.objects.get()
+        self.assertEqual((upload.original_name, upload.content_type), ('IMG_0001.jpg', 'image/jpeg'))
+        self.assertEqual(upload.original_size, len(content))
+        self.assertEqual(response.json()['bytes_saved'], len(content) - upload.size)
+        self.assertGreater(upload.bytes_saved, len(content) // 2)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['bytes_saved'], upload.bytes_saved)
+        with Image.open(upload.spool_path) as stored:
+            # turned upright from the EXIF orientation, which went with the rest of the EXIF
+            self.assertEqual(stored.size, (600, 800))
+            self.assertEqual(dict(stored.getexif()), {})
+
+        # the scenario is told the hash of what was sent, so the next copy is recognised
+        sha256 = hashlib.sha256(content).hexdigest()
+        self.assertEqual(response.json()['content_sha256'], sha256)
+        self.assertEqual(upload.source_sha256, sha256)
+        Dashboard.objects.create(
+            user=self.acme, email='acme@example.com', type='whatsapp', content_sha256=sha256,
+            google_drive_link='https://drive.google.com/file/d/img1',
+        )
+        response = self.send(SimpleUploadedFile('IMG_0001.jpg', content, content_type='image/jpeg'), channel='sms')
+        self.assertEqual(response.json()['status'], 'duplicate')
+
+    def test_compact_photo_keeps_its_pixels_and_loses_its_metadata(self):
+        from PIL import Image
+
+        small = Image.merge('RGB', [Image.effect_noise((256, 192), 60)] * 3)
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        exif[0x0112] = 6
+        exif.get_ifd(0x8825)[2] = (41.0, 52.0, 30.0)  # GPSLatitude
+        out = BytesIO()
+        small.save(out, 'JPEG', quality=20, exif=exif, comment=b'taken at home')
+        content = out.getvalue()
+
+        response = self.send(SimpleUploadedFile('small.jpeg', content, content_type='image/jpeg'))
+        self.assertEqual(response.status_code, 202)
+        upload = OutboundUpload.objects.get()
+        self.assertEqual((upload.original_name, upload.content_type), ('small.jpeg', 'image/jpeg'))
+        self.assertGreater(upload.bytes_saved, 0)
+        with open(upload.spool_path, 'rb') as fh:
+            stored = fh.read()
+        self.assertNotIn(b'PhoneMaker', stored)
+        self.assertNotIn(b'taken at home', stored)
+        with Image.open(BytesIO(stored)) as image, Image.open(BytesIO(content)) as original:
+            self.assertEqual(dict(image.getexif()), {0x0112: 6})
+            # the compressed image data itself is untouched, not re-encoded
+            self.assertEqual(image.tobytes(), original.tobytes())
+
+    def test_photo_set_becomes_one_pdf(self):
+        response = self.send(
+            SimpleUploadedFile('page1.jpg', photo(), content_type='image/jpeg'),
+            SimpleUploadedFile('page2.jpg', photo(), content_type='application/octet-stream'),
+        )
+        self.assertEqual(response.status_code, 202)
+        upload = OutboundUpload.objects.get()
+        self.assertEqual((upload.original_name, upload.content_type), ('page1.pdf', 'application/pdf'))
+        self.assertEqual(upload.source_sha256, '')
+        with open(upload.spool_path, 'rb') as fh:
+            self.assertEqual(fh.read(5), b'%PDF-')
+        self.assertEqual(StoredBlob.objects.get().sha256, upload.content_sha256)
+        self.assertEqual(os.listdir(os.path.join(self.blob_dir, 'tmp')), [])
+
+    def test_other_attachments_are_sent_as_they_came(self):
+        self.send(SimpleUploadedFile('rc.pdf', b'%PDF-1.4 rate confirmation', content_type='application/pdf'))
+        self.send(SimpleUploadedFile('broken.jpg', b'not really a jpeg', content_type='image/jpeg'))
+
+        for upload in OutboundUpload.objects.all():
+            self.assertEqual((upload.original_size, upload.bytes_saved, upload.source_sha256), (upload.size, 0, ''))
+        self.assertEqual(
+            OutboundUpload.objects.get(original_name='broken.jpg').content_sha256,
+            hashlib.sha256(b'not really a jpeg').hexdigest(),
+        )
+        self.assertTrue(LogEntry.objects.filter(event='preprocess_failed').exists())
+        self.assertEqual(os.listdir(os.path.join(self.blob_dir, 'tmp')), [])
+
+    @override_settings(PREPROCESS_WORKERS=1)
+    def test_worker_pool(self):
+        self.addCleanup(shutdown_preprocess_pool)
+        response = self.send(SimpleUploadedFile('IMG_0002.jpg', photo(), content_type='image/jpeg'))
+        self.assertGreater(response.json()['bytes_saved'], 0)
+
+
+class MultipartFileStreamTests(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        self.addCleanup(os.remove, self.path)
+        self.content = os.urandom(100_000)
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(self.content)
+
+    def test_body_round_trips_through_django_parser(self):
+        from django.http.multipartparser import MultiPartParser
+
+        fields = {'email': 'a@example.com', 'filename': 'x "quoted"', 'type': None}
+        with MultipartFileStream(fields, 'file', self.path, 'scan.jpg', 'image/jpeg') as body:
+            length = len(body)
+            # read in odd-sized blocks, like a socket writer would
+            raw = b''.join(iter(lambda: body.read(7919), b''))
+        self.assertEqual(len(raw), length)
+
+        parser = MultiPartParser(
+            {'CONTENT_TYPE': body.content_type, 'CONTENT_LENGTH': str(length)},
+            BytesIO(raw), [MemoryFileUploadHandler()],
+        )
+        post, files = parser.parse()
+        self.assertEqual(post['email'], 'a@example.com')
+        self.assertEqual(post['filename'], 'x "quoted"')
+        self.assertNotIn('type', post)
+        self.assertEqual(files['file'].name, 'scan.jpg')
+        self.assertEqual(files['file'].read(), self.content)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    LEAD_NOTIFICATION_RECIPIENT_EMAIL='sales@example.com',
+    LEAD_NOTIFICATION_DIGEST_THRESHOLD=3,
+    LEAD_NOTIFICATION_MAX_ATTEMPTS=2,
+)
+class LeadNotificationTests(TestCase):
+    def submit_lead(self, name):
+        response = self.client.post(reverse('create_lead_record'), json.dumps({
+            'fullName': name, 'companyName': 'Acme', 'phone': '555', 'email': f'{name}@example.com',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_lead_submission_only_queues_the_email(self):
+        self.submit_lead('ann')
+        self.assertEqual(len(mail.outbox), 0)
+        notification = LeadNotification.objects.get()
+        self.assertEqual(notification.status, 'pending')
+        self.assertTrue(notification.admin_url.endswith('/admin/automationApp/lead/'))
+
+        self.assertEqual(deliver_lead_notifications(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'New Lead Received: ann')
+        self.assertEqual(mail.outbox[0].to, ['sales@example.com'])
+        self.assertEqual(LeadNotification.objects.get().status, 'sent')
+
+    def test_burst_is_sent_as_one_digest_over_one_connection(self):
+        for name in ['ann', 'bob', 'cy']:
+            self.submit_lead(name)
+
+        with mock.patch('automationApp.notifications.get_connection', wraps=mail.get_connection) as get_connection:
+            self.assertEqual(deliver_lead_notifications(), (3, 0))
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, '3 New Leads Received')
+        self.assertIn('bob', mail.outbox[0].body)
+
+    def test_failures_are_retried_then_marked_failed(self):
+        self.submit_lead('ann')
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('smtp down')):
+            self.assertEqual(deliver_lead_notifications(), (0, 1))
+            notification = LeadNotification.objects.get()
+            self.assertEqual((notification.status, notification.attempts), ('pending', 1))
+
+            LeadNotification.objects.update(next_attempt_at=timezone.now())
+            deliver_lead_notifications()
+
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('failed', 2))
+        self.assertEqual(notification.last_error, 'OSError: smtp down')
+        self.assertEqual(len(mail.outbox), 0)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, AUDIT_LOG_BACKGROUND_FLUSH=False)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', '1000', is_superuser=True)
+        caches['default'].clear()
+        self.addCleanup(audit_log.flush)
+
+    async def test_create_record_through_async_client(self):
+        response = await self.async_client.post(
+            reverse('create_dashboard_record'),
+            json.dumps({'email': 'admin@example.com', 'phone_number': '1000', 'type': 'sms'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Dashboard.objects.filter(user=self.admin, type='sms').aexists())
+
+        response = await self.async_client.get(reverse('search_email_records'), {'email': 'admin@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['user_exists'])
+
+    def test_compare_command_smoke(self):
+        out = StringIO()
+        call_command('compare_wsgi_asgi', requests=3, concurrency=1, email='admin@example.com', json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual([r['label'] for r in results], ['wsgi', 'asgi'])
+        self.assertEqual([r['errors'] for r in results], [0, 0])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, AUDIT_LOG_BACKGROUND_FLUSH=False)
+class AuditLogBufferTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', '1000', is_superuser=True)
+        self.addCleanup(audit_log.flush)
+
+    def test_create_record_does_not_insert_a_log_row(self):
+        with self.assertNumQueries(0):
+            audit_log.log(event='probe', message='buffered')
+        response = self.client.post(
+            reverse('create_dashboard_record'),
+            json.dumps({'email': 'admin@example.com', 'phone_number': '1000', 'type': 'sms'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(LogEntry.objects.filter(event__in=['probe', 'dashboard_record_created']).exists())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(audit_log.flush(), 2)
+        entry = LogEntry.objects.get(event='dashboard_record_created')
+        self.assertEqual((entry.user, entry.related_model), (self.admin, 'Dashboard'))
+
+    def test_full_batches_flush_and_overflow_is_dropped(self):
+        buffer = LogEntryBuffer(flush_every=3, flush_interval=60, max_pending=3)
+        for i in range(2):
+            buffer.log(event='e', message=str(i))
+        self.assertFalse(LogEntry.objects.filter(event='e').exists())
+        buffer.log(event='e', message='2')
+        self.assertEqual(LogEntry.objects.filter(event='e').count(), 3)
+
+        # a failed batch is kept for a retry; only what does not fit in max_pending is dropped
+        with self.assertLogs('automationApp.audit_log', 'WARNING'):
+            with mock.patch.object(LogEntry.objects, 'bulk_create', side_effect=RuntimeError('table is locked')):
+                for i in range(4):
+                    buffer.log(event='e', message=str(i))
+        self.assertEqual(buffer.stats(), {'pending': 3, 'flushed': 3, 'dropped': 1})
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(
+            list(LogEntry.objects.filter(event='e').order_by('pk').values_list('message', flat=True)),
+            ['0', '1', '2', '0', '1', '2'],
+        )
+
+    def test_failed_batches_are_retried_a_bounded_number_of_times(self):
+        buffer = LogEntryBuffer(flush_every=100, flush_interval=60, max_retries=2)
+        buffer.log(event='e', message='stuck')
+        with self.assertLogs('automationApp.audit_log', 'WARNING') as logs:
+            with mock.patch.object(LogEntry.objects, 'bulk_create', side_effect=RuntimeError('db down')):
+                for _ in range(3):
+                    self.assertEqual(buffer.flush(), 0)
+        self.assertIn('Dropped 1 audit log entries after 2 retries', logs.output[-1])
+        self.assertEqual(buffer.stats(), {'pending': 0, 'flushed': 0, 'dropped': 1})
+
+    def test_background_thread_stops(self):
+        buffer = LogEntryBuffer(flush_every=100, flush_interval=60)
+        with override_settings(AUDIT_LOG_BACKGROUND_FLUSH=True):
+            buffer.log(event='e', message='0')
+            thread = buffer._thread
+            self.assertTrue(thread.is_alive())
+            self.assertEqual(buffer.stop(), 1)
+            self.assertFalse(thread.is_alive())
+
+            buffer.log(event='e', message='1')
+            thread = buffer._thread
+        # with the setting off the thread leaves flushing to the callers
+        buffer._wakeup.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(buffer.stats()['pending'], 1)
+        self.assertEqual(buffer.flush(), 1)
+
+    def test_logging_handler(self):
+        logging.getLogger('automationApp.audit').warning(
+            'Folder %s missing', 'x', extra={'event': 'folder_missing', 'related_id': 7}
+        )
+        audit_log.flush()
+        entry = LogEntry.objects.get(event='folder_missing')
+        self.assertEqual(
+            (entry.event, entry.level, entry.message, entry.related_id),
+            ('folder_missing', 'warning', 'Folder x missing', '7'),
+        )
+
+
+class LogRetentionTests(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        self.now = timezone.now()
+
+    def make_entry(self, level, age_days, event='evt', message='hello'):
+        entry = LogEntry.objects.create(level=level, event=event, message=message)
+        LogEntry.objects.filter(pk=entry.pk).update(created_at=self.now - timedelta(days=age_days))
+        return entry
+
+    @override_settings(LOG_RETENTION_DAYS={'info': 30, 'error': 365}, LOG_RETENTION_DEFAULT_DAYS=60)
+    def test_archive_respects_level_windows_and_can_be_searched(self):
+        old_info = self.make_entry('info', 40, message='old info')
+        kept_info = self.make_entry('info', 10)
+        kept_error = self.make_entry('error', 40)
+        old_error = self.make_entry('error', 400, event='parse_error', message='Bad PDF')
+        old_warning = self.make_entry('warning', 70)
+        kept_warning = self.make_entry('warning', 50)
+
+        out = StringIO()
+        call_command('archive_logs', batch_size=2, archive_dir=self.archive_dir, stdout=out)
+        self.assertIn('Archived and deleted 3 log entries', out.getvalue())
+        self.assertEqual(
+            set(LogEntry.objects.filter(event__in=['evt', 'parse_error']).values_list('pk', flat=True)),
+            {kept_info.pk, kept_error.pk, kept_warning.pk},
+        )
+
+        files = sorted(os.listdir(self.archive_dir))
+        self.assertTrue(all(re.fullmatch(r'logentries-\d{4}-\d{2}\.ndjson\.gz', f) for f in files))
+        rows = list(search_log_archive(archive_dir=self.archive_dir))
+        self.assertEqual({r['id'] for r in rows}, {old_info.pk, old_error.pk, old_warning.pk})
+
+        out = StringIO()
+        call_command('search_log_archive', level='error', contains='pdf', archive_dir=self.archive_dir, stdout=out)
+        found = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(r['id'], r['event']) for r in found], [(old_error.pk, 'parse_error')])
+
+    def test_interrupted_batches_are_not_duplicated_on_read(self):
+        entry = self.make_entry('info', 400)
+        archive_expired_logs(archive_dir=self.archive_dir)
+        # simulate a crash after writing but before deleting: the row is archived again
+        LogEntry.objects.create(id=entry.pk, level='info', event='evt')
+        LogEntry.objects.filter(pk=entry.pk).update(created_at=self.now - timedelta(days=400))
+        archive_expired_logs(archive_dir=self.archive_dir)
+        self.assertEqual(len(list(search_log_archive(archive_dir=self.archive_dir))), 1)
+
+    def test_dry_run_keeps_rows(self):
+        self.make_entry('info', 400)
+        out = StringIO()
+        call_command('archive_logs', dry_run=True, archive_dir=self.archive_dir, stdout=out)
+        self.assertIn('1 log entries are past retention', out.getvalue())
+        self.assertEqual(os.listdir(self.archive_dir), [])
+
+
+class DatabaseConfigurationTests(TestCase):
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite pragmas')
+    def test_new_sqlite_connections_get_wal_and_busy_timeout(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        conn = connections.create_connection('default')
+        conn.settings_dict = {**conn.settings_dict, 'NAME': os.path.join(tmp_dir, 'probe.sqlite3')}
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 5000)
+        finally:
+            conn.close()
+
+    def test_write_benchmark_smoke(self):
+        out = StringIO()
+        call_command('bench_db_writes', threads=1, writes=5, json=True, stdout=out)
+        result = json.loads(out.getvalue())
+        self.assertEqual((result['writes'], result['errors']), (5, 0))
+        self.assertFalse(LogEntry.objects.filter(event='bench_db_write').exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, AUDIT_LOG_BACKGROUND_FLUSH=False)
+class WebhookBenchmarkTests(TestCase):
+    """Runs the bench_webhooks harness small and guards its per-endpoint query budgets."""
+
+    # creating a folder is its INSERT plus one DriveFolder lookup; a company's first folder
+    # also inserts its 4 tree nodes, each in a savepoint (under TestCase's transaction)
+    QUERY_BUDGET = {'search': 2, 'create_record': 7, 'create_folder': 14, 'log_entry': 2}
+
+    def setUp(self):
+        make_user('admin@example.com', '1000', is_superuser=True)
+        for i in range(5):
+            make_user(f'carrier{i}@example.com', f'20{i}', company_name=f'Carrier {i}', mc_number=f'MC-{i}')
+        caches['default'].clear()
+        self.addCleanup(audit_log.flush)
+
+    def run_bench(self, **options):
+        out = StringIO()
+        call_command('bench_webhooks', requests=120, stdout=out, **options)
+        return json.loads(out.getvalue())
+
+    def test_report_shape_and_query_budgets(self):
+        report = self.run_bench()
+        self.assertEqual(report['requests'], 120)
+        self.assertEqual(set(report['endpoints']), set(self.QUERY_BUDGET))
+        for endpoint, stats in report['endpoints'].items():
+            self.assertEqual(stats['errors'], 0, endpoint)
+            self.assertLessEqual(stats['max_queries'], self.QUERY_BUDGET[endpoint], endpoint)
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        self.assertEqual(report['rows_written']['Dashboard'], report['endpoints']['create_record']['requests'])
+
+    def test_cleanup_and_json_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        call_command('bench_webhooks', requests=30, mix='create_record=1', cleanup=True, output=path, stdout=StringIO())
+        with open(path) as f:
+            self.assertEqual(json.load(f)['endpoints']['create_record']['requests'], 30)
+        self.assertFalse(Dashboard.objects.exists())
+        self.assertFalse(UploadCounter.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RequestMetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        self.acme = make_user('acme@example.com', '2000', company_name='Acme', mc_number='MC-1')
+        caches['default'].clear()
+
+    def search(self):
+        return self.client.get(reverse('search_email_records'), {'email': 'acme@example.com'})
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('automationApp.requests', 'INFO') as logs:
+            response = self.search()
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view_name'], 'search_email_records')
+        self.assertEqual(record['query_count'], 2)
+        self.assertEqual(record['instances'], 2)  # the user and its user_data
+        self.assertEqual(record['response_bytes'], len(response.content))
+        self.assertFalse(SlowRequestSample.objects.exists())
+
+    async def test_async_handler_counts_queries_from_sync_to_async_threads(self):
+        response = await self.async_client.get(reverse('search_email_records'), {'email': 'acme@example.com'})
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    @override_settings(REQUEST_METRICS_SLOW_MS=0.001, REQUEST_METRICS_MAX_SQL=1)
+    def test_slow_requests_are_sampled_with_their_sql(self):
+        self.search()
+        sample = SlowRequestSample.objects.get()
+        self.assertEqual((sample.method, sample.path, sample.query_count), ('GET', '/api/search-email/', 2))
+        self.assertEqual(len(sample.slowest_queries), 1)
+        self.assertIn('SELECT', sample.slowest_queries[0]['sql'])
+
+    @override_settings(REQUEST_METRICS_SLOW_MS=0.001, REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_sample_rate(self):
+        self.search()
+        self.assertFalse(SlowRequestSample.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SeedDataTests(TestCase):
+    def test_bulk_mode_volumes_and_schema(self):
+        call_command(
+            'seed_data', count=7, bulk=True, batch_size=3, workers=2,
+            dashboards_per_user='2', folders_per_user='1', logs_per_user='0-1', stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 7)
+        self.assertEqual(UserData.objects.count(), 7)
+        self.assertEqual(Dashboard.objects.count(), 14)
+        self.assertEqual(EmailFolder.objects.count(), 7)
+        self.assertLessEqual(LogEntry.objects.count(), 7)
+        self.assertEqual(UploadCounter.objects.aggregate(total=Sum('count'))['total'], 14)
+
+        user = User.objects.select_related('user_data').first()
+        self.assertTrue(user.check_password('password123'))
+        self.assertEqual(user.phone_number, user.user_data.phone_number)
+        folder = EmailFolder.objects.get(email=user.email)
+        self.assertEqual(
+            folder.company_name_mc_number, f'{user.user_data.company_name}_{user.user_data.mc_number}'
+        )
+
+    def test_invalid_volume(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_data', count=1, dashboards_per_user='5-1', stdout=StringIO())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, AUDIT_LOG_BACKGROUND_FLUSH=False)
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        make_user('admin@example.com', '1000', is_superuser=True)
+        self.addCleanup(audit_log.flush)
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, ignore_errors=True)
+
+    def create_record(self, link, key=None):
+        return self.client.post(
+            reverse('create_dashboard_record'),
+            json.dumps({'email': 'admin@example.com', 'phone_number': '1000', 'type': 'sms',
+                        'google_drive_link': link}),
+            content_type='application/json',
+            headers={'Idempotency-Key': key} if key else {},
+        )
+
+    def test_retry_with_same_key_replays_the_first_response(self):
+        first = self.create_record('https://drive.google.com/file/d/a', key='doc-1')
+        retry = self.create_record('https://drive.google.com/file/d/changed', key='doc-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.content), (first.status_code, first.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Dashboard.objects.count(), 1)
+
+        self.create_record('https://drive.google.com/file/d/a', key='doc-2')
+        self.assertEqual(Dashboard.objects.count(), 2)
+
+    def test_equal_bodies_without_a_key_are_separate_records(self):
+        for _ in range(2):
+            response = self.create_record('')
+            self.assertEqual(response.status_code, 201)
+            self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Dashboard.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_in_flight_expired_and_failed_requests(self):
+        with mock.patch('automationApp.views.Dashboard.objects.acreate', side_effect=RuntimeError('db down')):
+            self.assertEqual(self.create_record('https://drive.google.com/file/d/a', key='doc-1').status_code, 500)
+        self.assertFalse(IdempotencyKey.objects.exists())  # 5xx is not stored, the retry runs again
+        self.assertEqual(self.create_record('https://drive.google.com/file/d/a', key='doc-1').status_code, 201)
+
+        IdempotencyKey.objects.update(status='processing')
+        self.assertEqual(self.create_record('https://drive.google.com/file/d/a', key='doc-1').status_code, 409)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.create_record('https://drive.google.com/file/d/a', key='doc-1').status_code, 201)
+        self.assertEqual(Dashboard.objects.count(), 2)
+
+    def upload(self, content):
+        with override_settings(BLOB_STORE_DIR=self.spool_dir):
+            return self.client.post(reverse('send_to_make_webhook'), {
+                'email': 'acme@example.com', 'filename': 'rate-con', 'type': 'whatsapp',
+                'data': SimpleUploadedFile('scan.pdf', content, content_type='application/pdf'),
+            })
+
+    def test_uploads_are_deduplicated_by_file_content_for_a_short_window(self):
+        first = self.upload(b'%PDF-1.4 one')
+        self.assertEqual(self.upload(b'%PDF-1.4 one').json()['upload_id'], first.json()['upload_id'])
+        self.assertNotEqual(self.upload(b'%PDF-1.4 two').json()['upload_id'], first.json()['upload_id'])
+        self.assertEqual(OutboundUpload.objects.count(), 2)
+        self.assertEqual(StoredBlob.objects.count(), 2)
+
+        key = IdempotencyKey.objects.order_by('pk').first()
+        self.assertLessEqual(key.expires_at, timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_CONTENT_TTL))
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertNotEqual(self.upload(b'%PDF-1.4 one').json()['upload_id'], first.json()['upload_id'])
+
+    def test_client_errors_are_replayed_only_for_explicit_keys(self):
+        responses = iter([JsonResponse({'status': 'error'}, status=400), JsonResponse({'status': 'success'})])
+        view = idempotent('probe')(lambda request: next(responses))
+
+        def request(**headers):
+            return RequestFactory().post('/probe/', {
+                'data': SimpleUploadedFile('scan.pdf', b'%PDF-1.4', content_type='application/pdf'),
+            }, headers=headers)
+
+        self.assertEqual(view(request()).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(view(request()).status_code, 200)
+
+        responses = iter([JsonResponse({'status': 'error'}, status=400)])
+        view(request(**{'Idempotency-Key': 'doc-1'}))
+        self.assertEqual(view(request(**{'Idempotency-Key': 'doc-1'}))['Idempotent-Replayed'], 'true')
+
+    def test_purge_expired_keys(self):
+        self.create_record('https://drive.google.com/file/d/a', key='doc-1')
+        self.create_record('https://drive.google.com/file/d/b', key='doc-2')
+        IdempotencyKey.objects.filter(pk=IdempotencyKey.objects.first().pk).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1 expired', out.getvalue())
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
@@ -6,9 +6,14 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('api/insights/', views.insights_api, name='insights_api'),
+    path('api/export/', views.export_dashboard_records, name='export_dashboard_records'),
     path('api/create-record/', views.create_dashboard_record, name='create_dashboard_record'),
+    path('api/create-records/bulk/', views.create_dashboard_records_bulk, name='create_dashboard_records_bulk'),
     path('api/search-email/', views.search_email_records, name='search_email_records'),
     path('api/create-email-folder/', views.create_email_folder, name='create_email_folder'),
+    path('api/folder-path/', views.folder_path, name='folder_path'),
+    path('api/reserve-document-numbers/', views.reserve_document_numbers_view, name='reserve_document_numbers'),
     path('api/send-to-make-webhook/', views.send_to_make_webhook, name='send_to_make_webhook'),
     path('api/create-make-log-entry/', views.create_make_log_entry, name='create_make_log_entry'),
     path('api/create-lead-record/', views.create_lead_record, name='create_lead_record'),
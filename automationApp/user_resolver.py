@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+
+from .folders import find_webhook_user
+from .models import User
+
+ResolvedUser = namedtuple('ResolvedUser', 'id email company_name mc_number has_user_data')
+
+_MISSING = object()
+
+
+def _resolved(user):
+    if user is None:
+        return None
+    user_data = getattr(user, 'user_data', None)
+    return ResolvedUser(
+        id=user.pk,
+        email=user.email,
+        company_name=getattr(user_data, 'company_name', None),
+        mc_number=getattr(user_data, 'mc_number', None),
+        has_user_data=user_data is not None,
+    )
+
+
+class UserResolver:
+    """
+    Per-process LRU cache of the user lookups the Make.com webhooks repeat on
+    every call. Entries expire after `ttl` seconds; `post_save`/`post_delete`
+    on User and UserData clear this process's cache (see signals.py), and the
+    TTL bounds how long other worker processes can serve a stale entry.
+    Misses are cached only for `miss_ttl` seconds: enough to absorb a burst
+    from an unknown caller, short enough that a user signed up through another
+    worker process is found almost at once.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300, miss_ttl=5, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, load):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = load()
+        ttl = self.ttl if value is not None else self.miss_ttl
+        if ttl <= 0:
+            return value
+        with self._lock:
+            self._entries[key] = (now + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def webhook_user(self, email, phone_number):
+        """User by email, else by UserData.phone_number (search_email_records rules)."""
+        return self._lookup(
+            ('webhook', email or None, phone_number or None),
+            lambda: _resolved(find_webhook_user(email, phone_number)),
+        )
+
+    def record_user(self, email, phone_number):
+        """User by email if given, else by User.phone_number (create-record rules)."""
+        def load():
+            if email:
+                qs = User.objects.filter(email=email)
+            elif phone_number:
+                qs = User.objects.filter(phone_number=phone_number)
+            else:
+                return None
+            return _resolved(qs.select_related('user_data').first())
+
+        return self._lookup(('record', email or None, phone_number or None), load)
+
+    def superuser(self):
+        """The fallback owner for webhook writes: the first superuser."""
+        return self._lookup(
+            ('superuser',),
+            lambda: _resolved(User.objects.filter(is_superuser=True).select_related('user_data').first()),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+user_resolver = UserResolver(
+    max_entries=settings.USER_RESOLVER_MAX_ENTRIES,
+    ttl=settings.USER_RESOLVER_TTL,
+    miss_ttl=settings.USER_RESOLVER_MISS_TTL,
+)
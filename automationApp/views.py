@@ -3,22 +3,37 @@ from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
+from asgiref.sync import sync_to_async
 from django.core.paginator import Paginator
 from .models import User, Dashboard, EmailFolder, LogEntry, Lead
 from django.db import IntegrityError,transaction
-from django.db.models import Q
-import requests
+from django.db.models import Q, Sum
 import json
-import threading
 import logging
+import calendar
 from django.urls import reverse
-import os
 from django.conf import settings
 
 from django.contrib.auth import get_user_model
 from .models import UserData
+from .filters import parse_dashboard_filters, dashboard_records_for, apply_dashboard_filters
+from .counters import upload_counters_for, record_uploads
+from .insights import insight_buckets
+from .exports import export_rows, stream_csv, stream_ndjson
+from .folder_cache import cached_folder_state, cached_year_folder_id
+from .folder_tree import find_folder_path, path_keys
+from .folders import user_folder_records
+from .sequences import document_filename, reserve_document_numbers
+from .user_resolver import user_resolver
+from .audit_log import audit_log
+from .idempotency import idempotent
+from .blob_store import find_stored_copy, uploaded_file_sha256
+from .make_forwarder import spool_upload
+from .preprocessing import log_savings, preprocess_files
+from .notifications import queue_lead_notification
+from .ingest import SHA256_HEX, BulkPayloadError, parse_bulk_payload, create_dashboard_records
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -134,32 +149,45 @@ def logout_view(request):
 @login_required(login_url='login')
 def dashboard_view(request):
     is_admin = request.user.is_staff or request.user.is_superuser
-    
-    if is_admin:
-        dashboard_qs = (
-            Dashboard.objects
-            .select_related('user')
-            .order_by('-created_date')
-        )
-        email_folders_qs = EmailFolder.objects.all().order_by('-folder_date', '-created_at')
-    else:
-        dashboard_qs = (
-            Dashboard.objects
-            .filter(user=request.user)
-            .select_related('user')
-            .order_by('-created_date')
-        )
-        email_folders_qs = EmailFolder.objects.filter(
-            Q(email=request.user.email) | Q(phone_number=request.user.phone_number)
-        ).order_by('-folder_date', '-created_at')
 
     user_data = getattr(request.user, 'user_data', None)
     company_name = getattr(user_data, 'company_name', None)
     mc_number = getattr(user_data, 'mc_number', None)
     number_of_trucks = getattr(user_data, 'number_of_trucks', None)
 
-    records = list(dashboard_qs)
-    for r in records:
+    # Metrics cover every visible record and are read from the UploadCounter
+    # rollup, so they cost O(buckets) instead of O(records).
+    counters_qs = upload_counters_for(request.user)
+    counts = counters_qs.aggregate(
+        total=Sum('count', default=0),
+        whatsapp=Sum('count', filter=Q(type='whatsapp'), default=0),
+        gmail=Sum('count', filter=Q(type='gmail'), default=0),
+        sms=Sum('count', filter=Q(type='sms'), default=0),
+    )
+
+    base_qs = dashboard_records_for(request.user)
+    filters = parse_dashboard_filters(request.GET)
+    dashboard_qs = (
+        apply_dashboard_filters(base_qs, filters)
+        .select_related('user__user_data')
+        .order_by('-created_date', '-id')
+    )
+
+    try:
+        per_page = int(request.GET.get('per_page', 50))
+    except (TypeError, ValueError):
+        per_page = 50
+    if per_page not in [10, 50, 100]:
+        per_page = 50
+
+    # Paginating the queryset issues a COUNT plus a LIMIT/OFFSET query,
+    # so only the rows of the current page are ever instantiated.
+    paginator = Paginator(dashboard_qs, per_page)
+    page_number = request.GET.get('page', 1)
+    page_obj = paginator.get_page(page_number)
+    page_obj.object_list = list(page_obj.object_list)
+
+    for r in page_obj.object_list:
         if is_admin:
             r_user_data = getattr(r.user, 'user_data', None)
             r.company_name = getattr(r_user_data, 'company_name', None) if r_user_data else None
@@ -170,55 +198,74 @@ def dashboard_view(request):
             r.mc_number = mc_number
             r.number_of_trucks = number_of_trucks
 
-    total_records = len(records)
-    whatsapp_count = sum(1 for r in records if r.type == 'whatsapp')
-    gmail_count = sum(1 for r in records if r.type == 'gmail')
-    sms_count = sum(1 for r in records if r.type == 'sms')
-
-    per_page = int(request.GET.get('per_page', 50))
-    if per_page not in [10, 50, 100]:
-        per_page = 50
-    
-    paginator = Paginator(records, per_page)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-
-    if is_admin:
-        years = Dashboard.objects.datetimes('created_date', 'year', order='DESC')
-    else:
-        years = Dashboard.objects.filter(user=request.user).datetimes('created_date', 'year', order='DESC')
+    years = counters_qs.dates('day', 'year', order='DESC')
     year_options = [d.year for d in years]
+    month_options = [(f"{m:02d}", calendar.month_abbr[m]) for m in range(1, 13)]
 
     total_clients = User.objects.filter(is_staff=False, is_superuser=False).count()
 
     recent_logs = LogEntry.objects.all().order_by('-created_at')[:50]
 
-    email_folders = list(email_folders_qs)
-
     context = {
         'dashboard_records': page_obj,
-        'all_records': records,
-        'total_records': total_records,
-        'whatsapp_count': whatsapp_count,
-        'gmail_count': gmail_count,
-        'sms_count': sms_count,
+        'total_records': counts['total'],
+        'whatsapp_count': counts['whatsapp'],
+        'gmail_count': counts['gmail'],
+        'sms_count': counts['sms'],
         'total_clients': total_clients,
         'recent_logs': recent_logs,
-        'email_folders': email_folders,
         'is_admin': is_admin,
         'company_name': company_name,
         'mc_number': mc_number,
         'number_of_trucks': number_of_trucks,
         'year_options': year_options,
+        'month_options': month_options,
+        'filters': filters,
+        'selected_month': f"{filters['month']:02d}" if 'month' in filters else '',
         'page_obj': page_obj,
         'per_page': per_page,
     }
     return render(request, 'dashboard.html', context)
 
 
+@login_required(login_url='login')
+@require_http_methods(["GET"])
+def insights_api(request):
+    filters = parse_dashboard_filters(request.GET)
+    return JsonResponse({
+        'status': 'success',
+        'filters': filters,
+        'data': insight_buckets(request.user, filters),
+    })
+
+
+@login_required(login_url='login')
+@require_http_methods(["GET"])
+def export_dashboard_records(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ['csv', 'ndjson']:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Invalid format. Must be: csv or ndjson'
+        }, status=400)
+
+    filters = parse_dashboard_filters(request.GET)
+    rows = export_rows(apply_dashboard_filters(dashboard_records_for(request.user), filters))
+
+    if export_format == 'ndjson':
+        response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+        filename = 'automation-records.ndjson'
+    else:
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv; charset=utf-8')
+        filename = 'automation-records.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
-def create_dashboard_record(request):
+@idempotent("create_dashboard_record")
+async def create_dashboard_record(request):
     try:
         if request.content_type == 'application/json':
             data = json.loads(request.body)
@@ -229,6 +276,7 @@ def create_dashboard_record(request):
         phone_number = data.get('phone_number')
         record_type = data.get('type')
         google_drive_link = data.get('google_drive_link', '')
+        content_sha256 = (data.get('content_sha256') or '').lower() or None
         
         # if not all([email, phone_number, record_type]):
         #     return JsonResponse({
@@ -241,14 +289,17 @@ def create_dashboard_record(request):
                 'status': 'error',
                 'message': 'Invalid type. Must be: whatsapp, gmail, or sms'
             }, status=400)
+
+        if content_sha256 and not SHA256_HEX.fullmatch(content_sha256):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Invalid content_sha256. Must be 64 hexadecimal characters'
+            }, status=400)
         
-        if email:
-            user = User.objects.filter(email=email).first()
-        elif phone_number:
-            user = User.objects.filter(phone_number=phone_number).first()
+        user = await sync_to_async(user_resolver.record_user)(email, phone_number)
         # Fallback to superuser
         if not user:
-            user = User.objects.filter(is_superuser=True).first()
+            user = await sync_to_async(user_resolver.superuser)()
 
         # if user_email:
         #     try:
@@ -267,24 +318,24 @@ def create_dashboard_record(request):
                 'message': 'No admin user found. Please create an admin user first.'
             }, status=400)
         
-        dashboard_record = Dashboard.objects.create(
-            user=user,
+        dashboard_record = await Dashboard.objects.acreate(
+            user_id=user.id,
             email=email,
             phone_number=phone_number,
             type=record_type,
-            google_drive_link=google_drive_link
+            google_drive_link=google_drive_link,
+            content_sha256=content_sha256,
+        )
+        await sync_to_async(record_uploads)([dashboard_record])
+        # buffered: written in a batch by the audit-log flusher, not on this request
+        await sync_to_async(audit_log.log)(
+            user_id=user.id,
+            level='info',
+            event='dashboard_record_created',
+            message=f'Created {record_type} record for {email}',
+            related_model='Dashboard',
+            related_id=dashboard_record.id,
         )
-        try:
-            LogEntry.objects.create(
-                user=user,
-                level='info',
-                event='dashboard_record_created',
-                message=f'Created {record_type} record for {email}',
-                related_model='Dashboard',
-                related_id=str(dashboard_record.id)
-            )
-        except Exception:
-            pass
         
         return JsonResponse({
             'status': 'success',
@@ -296,7 +347,7 @@ def create_dashboard_record(request):
                 'type': dashboard_record.type,
                 'google_drive_link': dashboard_record.google_drive_link,
                 'created_date': dashboard_record.created_date.isoformat(),
-                'user': dashboard_record.user.email
+                'user': user.email
             }
         }, status=201)
         
@@ -312,9 +363,43 @@ def create_dashboard_record(request):
         }, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+async def create_dashboard_records_bulk(request):
+    """
+    Create many dashboard records in one request. The body is a JSON array
+    (or {"records": [...]}) or NDJSON with one record per line; each record
+    takes the same fields as /api/create-record/.
+    """
+    try:
+        items = parse_bulk_payload(request.body, request.content_type)
+    except BulkPayloadError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+
+    try:
+        results = await sync_to_async(create_dashboard_records)(items)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+    created = sum(1 for r in results if r['status'] == 'created')
+    return JsonResponse({
+        'status': 'success' if created else 'error',
+        'message': f'Created {created} of {len(results)} dashboard records',
+        'created': created,
+        'failed': len(results) - created,
+        'results': results,
+    }, status=201 if created else 400)
+
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
-def search_email_records(request):
+async def search_email_records(request):
     try:
         if request.method == 'POST':
             if request.content_type == 'application/json':
@@ -325,61 +410,34 @@ def search_email_records(request):
             phone_number = data.get('phone_number')
         else:
             email = request.GET.get('email')
+            phone_number = request.GET.get('phone_number')
 
-        from datetime import datetime
         from django.utils import timezone
-        
-        now = timezone.now()
-        current_year = now.year
-        current_month = now.month
-        current_date = now.date()
-        all_records = EmailFolder.objects.all()
-        user_records = None
-        
-        print(f"Email: {email}, Phone Number: {phone_number}")
-        if email:
-            user_records = EmailFolder.objects.filter(email=email)
-        elif phone_number:
-            user_records = EmailFolder.objects.filter(phone_number=phone_number)
-        
-        data_exists = user_records.exists()
-
-        year_records = all_records.filter(folder_year=current_year)
-        has_current_year = year_records.exists()
-        year_folder_id = None
-        if has_current_year:
-            year_record = year_records.first()
-            year_folder_id = year_record.year_folder_id
-        
+
+        current_date = timezone.now().date()
+
+        logger.debug(f"Email: {email}, Phone Number: {phone_number}")
+
         # ---------------------------------------------------
-        # 🔍 ADDED: Fetch company_name and mc_number
+        # 🔍 Fetch company_name and mc_number (user by email, else by UserData.phone_number)
         # ---------------------------------------------------
         company_name = None
         mc_number = None
 
-        from .models import User, UserData
+        user_obj = await sync_to_async(user_resolver.webhook_user)(email, phone_number)
 
-        user_obj = None
-
-        # Match User by email
-        if email:
-            user_obj = User.objects.filter(email=email).select_related("user_data").first()
-
-        # If not found by email, try matching phone number inside UserData.phone_number
-        if not user_obj and phone_number:
-            user_obj = User.objects.filter(user_data__phone_number=phone_number).select_related("user_data").first()
-
-        if user_obj and hasattr(user_obj, "user_data") and user_obj.user_data:
-            company_name = user_obj.user_data.company_name
-            mc_number = user_obj.user_data.mc_number
+        if user_obj and user_obj.has_user_data:
+            company_name = user_obj.company_name
+            mc_number = user_obj.mc_number
         else:
+            year_folder_id = await sync_to_async(cached_year_folder_id)(current_date)
             return JsonResponse({
                 'status': 'success',
                 'email': email,
                 'phone_number': phone_number,
                 'user_exists': False,
                 'data_exists': False,
-                'has_current_year': has_current_year,
+                'has_current_year': year_folder_id is not None,
                 "year_folder_id":year_folder_id,
                 'has_current_month': False,
                 'has_today': False,
@@ -388,16 +446,19 @@ def search_email_records(request):
                 'message': 'No user Found'
             }, status=200)
         # ---------------------------------------------------
-        
-        if not data_exists:
+
+        # All folder flags, IDs and today's count: one cache read, or one query on a miss
+        folders = await sync_to_async(cached_folder_state)(user_obj, email, phone_number, current_date)
+
+        if not folders['data_exists']:
             return JsonResponse({
                 'status': 'success',
                 'email': email,
                 'phone_number': phone_number,
                 'user_exists': True,
                 'data_exists': False,
-                'has_current_year': has_current_year,
-                "year_folder_id":year_folder_id,
+                'has_current_year': folders['has_current_year'],
+                "year_folder_id":folders['year_folder_id'],
                 'has_current_month': False,
                 'has_today': False,
                 'company_name': company_name,
@@ -407,54 +468,34 @@ def search_email_records(request):
                 "has_company_name_mc_number_name":False
             }, status=200)
 
-        company_name_mc_number_name = f"{company_name}_{mc_number}"
-        # year_records = all_records.filter(folder_year=current_year)
-
-        month_records = user_records.filter(folder_month=current_month)
-        today_records = user_records.filter(folder_date=current_date)
-        company_name_mc_number_name = all_records.filter(company_name_mc_number=company_name_mc_number_name)
-        
-        # has_current_year = year_records.exists()
-        has_current_month = month_records.exists()
-        has_today = today_records.exists()
-        has_company_name_mc_number_name = company_name_mc_number_name.exists()
-        length_of_today_records = len(today_records) +1
-        
         response_data = {
             'status': 'success',
             'email': email,
             'phone_number': phone_number,
             'user_exists': True,
             'data_exists': True,
-            'has_current_year': has_current_year,
-            "year_folder_id":year_folder_id,
-            'has_current_month': has_current_month,
-            'has_company_name_mc_number_name': has_company_name_mc_number_name,
-            'has_today': has_today,
+            'has_current_year': folders['has_current_year'],
+            "year_folder_id":folders['year_folder_id'],
+            'has_current_month': folders['has_current_month'],
+            'has_company_name_mc_number_name': folders['has_company_name_mc_number_name'],
+            'has_today': folders['has_today'],
             'company_name': company_name,
             'mc_number': mc_number,
-            'length_of_today_records': length_of_today_records,
+            'length_of_today_records': folders['today_count'] + 1,
             'message': 'Folder records found for this email'
         }
-        
-        latest_record = all_records.first()
-        if latest_record:
-            response_data['company_name_folder_id'] = latest_record.company_name_folder_id
-        
-        if has_current_month:
-            month_record = month_records.first()
-            response_data['month_folder_id'] = month_record.month_folder_id
-        
-        if has_today:
-            today_record = today_records.first()
-            response_data['date_folder_id'] = today_record.date_folder_id
-        
-        if has_company_name_mc_number_name:
-            company_name_mc_number_name_record = company_name_mc_number_name.first()
-            response_data['company_name_folder_id'] = company_name_mc_number_name_record.company_name_folder_id
-        
+
+        if folders['company_name_folder_id'] is not None:
+            response_data['company_name_folder_id'] = folders['company_name_folder_id']
+
+        if folders['has_current_month']:
+            response_data['month_folder_id'] = folders['month_folder_id']
+
+        if folders['has_today']:
+            response_data['date_folder_id'] = folders['date_folder_id']
+
         return JsonResponse(response_data, status=200)
-        
+
     except json.JSONDecodeError:
         return JsonResponse({
             'status': 'error',
@@ -469,7 +510,8 @@ def search_email_records(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def create_email_folder(request):
+@idempotent("create_email_folder")
+async def create_email_folder(request):
     try:
         if request.content_type == 'application/json':
             data = json.loads(request.body)
@@ -505,7 +547,7 @@ def create_email_folder(request):
                 'message': f'Invalid date format. folder_year and folder_month must be integers, folder_date must be YYYY-MM-DD format'
             }, status=400)
         
-        email_folder = EmailFolder.objects.create(
+        email_folder = await EmailFolder.objects.acreate(
             email=email,
             phone_number=phone_number,
             company_name_folder_id=company_name_folder_id,
@@ -552,9 +594,156 @@ def create_email_folder(request):
             'message': str(e)
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+async def folder_path(request):
+    """
+    The Drive folder IDs of the company -> year -> month -> day path for one
+    date, from the DriveFolder tree. The company is given as
+    company_name_mc_number, or looked up from email / phone_number.
+    """
+    try:
+        if request.method == 'POST':
+            if request.content_type == 'application/json':
+                data = json.loads(request.body)
+            else:
+                data = request.POST
+        else:
+            data = request.GET
+
+        from datetime import datetime
+        from django.utils import timezone
+
+        try:
+            folder_date = data.get('date')
+            folder_date = datetime.strptime(folder_date, '%Y-%m-%d').date() if folder_date else timezone.now().date()
+        except (ValueError, TypeError):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Invalid date format. date must be YYYY-MM-DD format'
+            }, status=400)
+
+        company_key = data.get('company_name_mc_number')
+        if not company_key:
+            email = data.get('email')
+            phone_number = data.get('phone_number')
+            if not (email or phone_number):
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Missing required fields: company_name_mc_number, or email / phone_number'
+                }, status=400)
+            user_obj = await sync_to_async(user_resolver.webhook_user)(email, phone_number)
+            if not (user_obj and user_obj.has_user_data):
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'No user Found'
+                }, status=404)
+            company_key = f"{user_obj.company_name}_{user_obj.mc_number}"
+
+        keys = path_keys(company_key, folder_date.year, folder_date.month, folder_date)
+        path = await sync_to_async(find_folder_path)(keys)
+
+        return JsonResponse({
+            'status': 'success',
+            'company_name_mc_number': company_key,
+            'date': folder_date.isoformat(),
+            'company_name_folder_id': path['company'],
+            'year_folder_id': path['year'],
+            'month_folder_id': path['month'],
+            'date_folder_id': path['day'],
+            'missing': [level for level, folder_id in path.items() if folder_id is None],
+        }, status=200)
+
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Invalid JSON format'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def reserve_document_numbers_view(request):
+    """
+    Reserve a block of consecutive document numbers for a batch upload.
+    The user is matched like search_email_records (email, else phone).
+    """
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body)
+        else:
+            data = request.POST
+
+        email = data.get('email')
+        phone_number = data.get('phone_number')
+        name = data.get('document_name')
+
+        from datetime import datetime
+        from django.utils import timezone
+
+        try:
+            count = int(data.get('count', 1))
+            day = data.get('date')
+            day = datetime.strptime(day, '%Y-%m-%d').date() if day else timezone.now().date()
+        except (ValueError, TypeError):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'count must be an integer, date must be YYYY-MM-DD format'
+            }, status=400)
+        if not 1 <= count <= settings.DOCUMENT_NUMBER_MAX_BLOCK:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'count must be between 1 and {settings.DOCUMENT_NUMBER_MAX_BLOCK}'
+            }, status=400)
+        if not (email or phone_number):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Missing required fields: email or phone_number'
+            }, status=400)
+
+        user_obj = await sync_to_async(user_resolver.webhook_user)(email, phone_number)
+        if user_obj is None:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'No user Found'
+            }, status=404)
+
+        first, last = await sync_to_async(reserve_document_numbers)(
+            user_obj.id, day, count, lambda: user_folder_records(email, phone_number).filter(folder_date=day).count()
+        )
+
+        response_data = {
+            'status': 'success',
+            'message': f'Reserved {count} document numbers',
+            'date': day.isoformat(),
+            'first': first,
+            'last': last,
+        }
+        if name:
+            response_data['filenames'] = [document_filename(n, name, day) for n in range(first, last + 1)]
+        return JsonResponse(response_data, status=200)
+
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Invalid JSON format'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
-def send_to_make_webhook(request):
+@idempotent("send_to_make_webhook")
+async def send_to_make_webhook(request):
     # ✅ Extract query params
     email = request.POST.get("email")
     phone_number = request.POST.get("phone_number")
@@ -563,36 +752,73 @@ def send_to_make_webhook(request):
     filename = request.POST.get("filename")
     media_type = request.POST.get("type")
 
-    # ✅ Extract the file uploaded as binary
-    file_obj = request.FILES.get("data")
-
-    # ✅ Prepare multipart/form-data
-    files = {
-        "file": (file_obj.name, file_obj.read(), file_obj.content_type),
-    }
-
-    payload = {
-        "email": email,
-        "phone_number": phone_number,
-        "filename": filename,
-        "type": media_type
-    }
+    # ✅ Extract the file uploaded as binary (several photos may be posted as `data` together)
+    files = request.FILES.getlist("data")
+    if not files:
+        return JsonResponse({"success": False, "error": "Missing file field: data"}, status=400)
+    file_obj = files[0]
 
-    url = "https://hook.us2.make.com/43p8rg1tinkdvygclzv2e3wkjf57u9qm"
+    # ✅ Hashed while the request was parsed; a copy this customer already has in Drive is not sent again
+    sha256 = uploaded_file_sha256(request, "data") if len(files) == 1 else None
 
+    # ✅ Spool it; `manage.py run_make_forwarder` delivers it to Make with retries
     try:
-        response = requests.post(url, data=payload, files=files)
+        if sha256:
+            user = await sync_to_async(user_resolver.record_user)(email, phone_number)
+            stored = await sync_to_async(find_stored_copy)(user.id, sha256) if user else None
+            if stored:
+                return JsonResponse({
+                    "success": True,
+                    "status": "duplicate",
+                    "dashboard_id": stored["id"],
+                    "google_drive_link": stored["google_drive_link"],
+                    "content_sha256": sha256,
+                }, status=200)
+
+        # ✅ Photos are downscaled and stripped (several become one PDF) on the worker pool
+        processed = await preprocess_files(files) if settings.PREPROCESS_ENABLED else None
+        if len(files) > 1 and not processed:
+            # only merged photos make one upload out of several parts; never drop the rest silently
+            return JsonResponse({
+                "success": False,
+                "error": "Several files were posted as data; only photos can be combined (with PREPROCESS_ENABLED). Post one file per request",
+            }, status=400)
+        if processed:
+            try:
+                upload = await sync_to_async(spool_upload)(
+                    processed,
+                    email=email,
+                    phone_number=phone_number,
+                    filename=filename,
+                    media_type=media_type,
+                    original_size=processed.original_size,
+                    source_sha256=sha256 or '',
+                )
+            finally:
+                processed.close()
+            log_savings(upload, processed)
+        else:
+            upload = await sync_to_async(spool_upload)(
+                file_obj,
+                email=email,
+                phone_number=phone_number,
+                filename=filename,
+                media_type=media_type,
+                sha256=sha256,
+            )
         return JsonResponse({
             "success": True,
-            "status_code": response.status_code,
-            "response": response.text
-        })
+            "status": "queued",
+            "upload_id": upload.id,
+            "content_sha256": upload.source_sha256 or upload.content_sha256,
+            "bytes_saved": upload.bytes_saved,
+        }, status=202)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def create_make_log_entry(request):
+async def create_make_log_entry(request):
     try:
         if request.content_type == 'application/json':
             data = json.loads(request.body)
@@ -603,9 +829,9 @@ def create_make_log_entry(request):
         level = data.get('level')
         related_model = ""
         related_id = ""
-        user = User.objects.filter(is_superuser=True).first()
-        log_entry = LogEntry.objects.create(
-            user=user,
+        user = await sync_to_async(user_resolver.superuser)()
+        log_entry = await LogEntry.objects.acreate(
+            user_id=user.id if user else None,
             event=event,
             message=message,
             level=level,
@@ -639,7 +865,7 @@ def create_make_log_entry(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def create_lead_record(request):
+async def create_lead_record(request):
     try:
         if request.content_type == 'application/json':
             data = json.loads(request.body)
@@ -662,7 +888,7 @@ def create_lead_record(request):
                 'message': 'Missing required fields: full_name, phone, email'
             }, status=400)
 
-        lead = Lead.objects.create(
+        lead = await Lead.objects.acreate(
             full_name=full_name,
             company_name=company_name,
             mc_number=mc_number,
@@ -673,56 +899,13 @@ def create_lead_record(request):
             status=status
         )
 
-        # --- Email Notification  ---
+        # --- Email Notification (queued, sent by `manage.py send_lead_notifications`) ---
         try:
             admin_relative_url = reverse('admin:automationApp_lead_changelist')
             admin_full_link = request.build_absolute_uri(admin_relative_url)
-
-            subject = f"New Lead Received: {lead.full_name}"
-            message = (
-                f"A new lead has been submitted.\n\n"
-                f"Name: {lead.full_name}\n"
-                f"Company: {lead.company_name or 'N/A'}\n"
-                f"Phone: {lead.phone}\n"
-                f"Help Needed: {lead.help_needed}\n\n"
-                f"Click the link below to view all leads in the Admin Panel:\n"
-                f"{admin_full_link}"
-            )
-
-            recipient_email = os.environ.get('LEAD_NOTIFICATION_RECIPIENT_EMAIL', "truckingpilot1@gmail.com")
-
-            if recipient_email:
-                recipient_list = [recipient_email]
-                from_email = settings.DEFAULT_FROM_EMAIL
-                
-                # Define a wrapper to send email asynchronously
-                # def send_email_thread(subject, message, from_email, recipient_list):
-                print(f"From {from_email}, recipient: {recipient_list}, message: {message}")
-                logger.info(f"From {from_email}, recipient: {recipient_list}, message: {message}")
-                try:
-                    from django.core.mail import send_mail # Import send_mail inside thread or ensure global import 
-                    send_mail(
-                        subject=subject,
-                        message=message,
-                        from_email=from_email, 
-                        recipient_list=recipient_list,
-                        fail_silently=False 
-                    )
-                except Exception as e:
-                    print(f"Error: {e}")
-                    logger.error(f"Error sending lead notification email in background: {e}")
-
-                
-                # email_thread = threading.Thread(
-                #     target=send_email_thread, 
-                #     args=(subject, message, from_email, recipient_list)
-                # )
-                # email_thread.start()
-            else:
-                logger.warning("LEAD_NOTIFICATION_RECIPIENT_EMAIL not set in .env")
-
+            await sync_to_async(queue_lead_notification)(lead, admin_full_link)
         except Exception as e:
-            logger.error(f"Error preparing lead notification email: {e}")
+            logger.error(f"Error queueing lead notification email: {e}")
         # ---  ---
 
         return JsonResponse({
@@ -11,7 +11,10 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
+import json
 import os
+import warnings
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -49,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'automationApp.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -83,11 +87,50 @@ WSGI_APPLICATION = 'automationProject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres switches to PostgreSQL (needs `psycopg[binary,pool]`).
+# Persistent connections (DB_CONN_MAX_AGE) and the psycopg pool (DB_POOL)
+# are alternatives: Django refuses CONN_MAX_AGE > 0 together with a pool.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'automation'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
+    if os.environ.get('DB_POOL', 'False') == 'True':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # take the write lock at BEGIN so concurrent writers queue on
+                # busy_timeout instead of failing with "database is locked"
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# Applied to every new SQLite connection (automationApp/signals.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
 }
 
 
@@ -131,6 +174,21 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# File uploads
+# https://docs.djangoproject.com/en/5.0/ref/settings/#file-upload-max-memory-size
+# Larger uploads are streamed to a temporary file instead of being held in memory.
+# Keep FILE_UPLOAD_TEMP_DIR on the same filesystem as BLOB_STORE_DIR so queued
+# uploads are moved into the blob store with a rename rather than copied.
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_MEMORY_SIZE', 2621440))  # 2.5 MB
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR') or None
+# the hashing handler only observes chunks; the default handlers still store the file
+FILE_UPLOAD_HANDLERS = [
+    'automationApp.blob_store.HashingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -151,3 +209,156 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL')
+EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', 20))
+
+# Lead notifications are queued by create_lead_record and sent by `manage.py send_lead_notifications`
+LEAD_NOTIFICATION_RECIPIENT_EMAIL = os.environ.get('LEAD_NOTIFICATION_RECIPIENT_EMAIL', "truckingpilot1@gmail.com")
+# this many queued leads for one recipient are sent as a single digest email
+LEAD_NOTIFICATION_DIGEST_THRESHOLD = int(os.environ.get('LEAD_NOTIFICATION_DIGEST_THRESHOLD', 3))
+LEAD_NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('LEAD_NOTIFICATION_MAX_ATTEMPTS', 5))
+LEAD_NOTIFICATION_RETRY_DELAY = int(os.environ.get('LEAD_NOTIFICATION_RETRY_DELAY', 60))  # seconds, doubled per attempt
+
+# ----------------------------------
+# Cache (Redis when REDIS_URL is set, per-process memory otherwise)
+# Redis is optional and needs `pip install redis`; without it the cache stays
+# in memory (with a warning) instead of failing on first use.
+# ----------------------------------
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL and importlib.util.find_spec('redis') is None:
+    warnings.warn("REDIS_URL is set but the redis package is not installed; using the per-process memory cache")
+    REDIS_URL = None
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Folder-ID bundles served to search_email_records (see automationApp/folder_cache.py)
+FOLDER_CACHE_ALIAS = os.environ.get('FOLDER_CACHE_ALIAS', 'default')
+FOLDER_CACHE_TIMEOUT = int(os.environ.get('FOLDER_CACHE_TIMEOUT', 3600))  # seconds
+
+# ----------------------------------
+# Webhook user lookups (per-process cache)
+# ----------------------------------
+USER_RESOLVER_MAX_ENTRIES = int(os.environ.get('USER_RESOLVER_MAX_ENTRIES', 1024))
+USER_RESOLVER_TTL = int(os.environ.get('USER_RESOLVER_TTL', 300))  # seconds
+# "No such user" is kept briefly, so a user created by another process is seen soon; 0 disables it
+USER_RESOLVER_MISS_TTL = int(os.environ.get('USER_RESOLVER_MISS_TTL', 5))  # seconds
+
+# ----------------------------------
+# Audit log (LogEntry rows written in batches, see automationApp/audit_log.py)
+# ----------------------------------
+AUDIT_LOG_BACKGROUND_FLUSH = os.environ.get('AUDIT_LOG_BACKGROUND_FLUSH', 'True') == 'True'
+AUDIT_LOG_FLUSH_EVERY = int(os.environ.get('AUDIT_LOG_FLUSH_EVERY', 100))  # events
+AUDIT_LOG_FLUSH_INTERVAL_MS = int(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL_MS', 500))
+AUDIT_LOG_MAX_PENDING = int(os.environ.get('AUDIT_LOG_MAX_PENDING', 10000))
+# failed inserts are retried with backoff this many times before the batch is dropped
+AUDIT_LOG_MAX_RETRIES = int(os.environ.get('AUDIT_LOG_MAX_RETRIES', 5))
+
+# Days a LogEntry stays in the table per level; `manage.py archive_logs` moves
+# older rows to LOG_ARCHIVE_DIR (one gzip NDJSON file per month)
+LOG_RETENTION_DAYS = {
+    'info': int(os.environ.get('LOG_RETENTION_INFO_DAYS', 30)),
+    'warning': int(os.environ.get('LOG_RETENTION_WARNING_DAYS', 90)),
+    'error': int(os.environ.get('LOG_RETENTION_ERROR_DAYS', 365)),
+}
+LOG_RETENTION_DEFAULT_DAYS = int(os.environ.get('LOG_RETENTION_DEFAULT_DAYS', 30))
+LOG_ARCHIVE_DIR = os.environ.get('LOG_ARCHIVE_DIR', os.path.join(BASE_DIR, 'log_archive'))
+
+# ----------------------------------
+# Request metrics (automationApp/middleware.py)
+# ----------------------------------
+REQUEST_METRICS_SLOW_MS = int(os.environ.get('REQUEST_METRICS_SLOW_MS', 1000))  # 0 disables sampling
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 1.0))
+REQUEST_METRICS_MAX_SQL = int(os.environ.get('REQUEST_METRICS_MAX_SQL', 5))  # slowest statements kept per sample
+REQUEST_METRICS_COUNT_INSTANCES = os.environ.get('REQUEST_METRICS_COUNT_INSTANCES', 'True') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'audit_log': {'class': 'automationApp.audit_log.LogEntryHandler'},
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # logging.getLogger('automationApp.audit').info(..., extra={'event': ...}) -> LogEntry
+        'automationApp.audit': {'handlers': ['audit_log'], 'level': 'INFO', 'propagate': False},
+        # one JSON line per request when set to INFO
+        'automationApp.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# ----------------------------------
+# Webhook idempotency (Idempotency-Key header or request content hash)
+# ----------------------------------
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 3600))  # seconds a response is replayed
+# uploads sent without an Idempotency-Key are matched by content only this long
+IDEMPOTENCY_CONTENT_TTL = int(os.environ.get('IDEMPOTENCY_CONTENT_TTL', 300))
+IDEMPOTENCY_PROCESSING_TIMEOUT = int(os.environ.get('IDEMPOTENCY_PROCESSING_TIMEOUT', 300))  # abandoned claims
+
+# ----------------------------------
+# Bulk record ingestion
+# ----------------------------------
+BULK_INGEST_MAX_RECORDS = int(os.environ.get('BULK_INGEST_MAX_RECORDS', 5000))
+
+# ----------------------------------
+# Document numbering (001_documentname_date)
+# ----------------------------------
+DOCUMENT_NUMBER_MAX_BLOCK = int(os.environ.get('DOCUMENT_NUMBER_MAX_BLOCK', 1000))  # numbers per reservation
+
+# ----------------------------------
+# Make.com upload forwarding
+# ----------------------------------
+MAKE_WEBHOOK_URL = os.environ.get('MAKE_WEBHOOK_URL', 'https://hook.us2.make.com/43p8rg1tinkdvygclzv2e3wkjf57u9qm')
+
+# Uploads are written here by send_to_make_webhook and forwarded by `manage.py run_make_forwarder`
+MAKE_SPOOL_DIR = os.environ.get('MAKE_SPOOL_DIR', os.path.join(BASE_DIR, 'spool'))
+
+# Content-addressed store the spooled uploads live in (blob_store.py), one file per SHA-256
+BLOB_STORE_DIR = os.environ.get('BLOB_STORE_DIR', os.path.join(MAKE_SPOOL_DIR, 'blobs'))
+# `manage.py gc_blobs` keeps unreferenced blobs this many seconds after their last use
+BLOB_GC_GRACE_SECONDS = int(os.environ.get('BLOB_GC_GRACE_SECONDS', 24 * 3600))
+
+MAKE_FORWARDER_CONCURRENCY = int(os.environ.get('MAKE_FORWARDER_CONCURRENCY', 4))
+MAKE_FORWARDER_TIMEOUT = float(os.environ.get('MAKE_FORWARDER_TIMEOUT', 30))
+MAKE_FORWARDER_MAX_ATTEMPTS = int(os.environ.get('MAKE_FORWARDER_MAX_ATTEMPTS', 6))
+# seconds; doubled after every failed attempt up to MAKE_FORWARDER_BACKOFF_MAX
+MAKE_FORWARDER_BACKOFF_BASE = float(os.environ.get('MAKE_FORWARDER_BACKOFF_BASE', 10))
+MAKE_FORWARDER_BACKOFF_MAX = float(os.environ.get('MAKE_FORWARDER_BACKOFF_MAX', 3600))
+
+# ----------------------------------
+# OCR auto-naming of forwarded uploads (001_documentname_date)
+# ----------------------------------
+# Needs an engine: the default wants `pip install pytesseract Pillow` plus the
+# tesseract binary (and pdf2image + poppler for PDFs).
+OCR_ENABLED = os.environ.get('OCR_ENABLED', 'False') == 'True'
+OCR_ENGINE = os.environ.get('OCR_ENGINE', 'automationApp.ocr.TesseractEngine')
+OCR_ENGINE_OPTIONS = json.loads(os.environ.get('OCR_ENGINE_OPTIONS', '{}'))  # e.g. {"languages": "eng+spa"}
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))  # processes; 0 runs OCR inline
+OCR_TIMEOUT = float(os.environ.get('OCR_TIMEOUT', 120))  # seconds per attachment
+OCR_TEXT_MAX_CHARS = int(os.environ.get('OCR_TEXT_MAX_CHARS', 20000))  # text kept in OcrResult
+
+# ----------------------------------
+# Attachment pre-processing in send_to_make_webhook (images.py)
+# ----------------------------------
+# Needs `pip install Pillow`. Photos are turned upright, downscaled and
+# re-encoded as JPEG without EXIF/GPS metadata; several photos posted in one
+# request become one PDF. A JPEG/PNG whose re-encoded copy is not smaller keeps its
+# pixels and only loses its metadata.
+PREPROCESS_ENABLED = os.environ.get('PREPROCESS_ENABLED', 'False') == 'True'
+PREPROCESS_MAX_DIMENSION = int(os.environ.get('PREPROCESS_MAX_DIMENSION', 2200))  # pixels, longest side
+PREPROCESS_JPEG_QUALITY = int(os.environ.get('PREPROCESS_JPEG_QUALITY', 80))  # 1-95, also used for PDF pages
+PREPROCESS_WORKERS = int(os.environ.get('PREPROCESS_WORKERS', os.cpu_count() or 1))  # processes; 0 runs inline
+PREPROCESS_TIMEOUT = float(os.environ.get('PREPROCESS_TIMEOUT', 60))  # seconds per request